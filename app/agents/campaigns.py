@@ -0,0 +1,320 @@
+# app/agents/campaigns.py
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+
+from app.agents.carry_forward import carried_answers, carried_response
+from app.agents.simple_graph import simple_audit_graph
+from app.services import analytics
+from app.services.audit_engine import CLAUSE_METADATA
+from app.services.circuit_breaker import llm_breaker
+from app.services.guidance_fallback import guidance_fallback
+from app.services.llm_gateway import llm_gateway
+from app.services.mongo_client import db
+from app.services.prompts import NODE_QUERY, prompt_registry
+from app.services.search import KIND_ANSWER, search_service
+from app.services.tenancy import current_tenant, tenant_filter, tenant_of, tenant_scope
+from app.services.usage_ledger import usage_scope
+from app.config import settings
+
+logger = logging.getLogger("uvicorn")
+
+SCHEDULED = "scheduled"
+LAUNCHING = "launching"
+ACTIVE = "active"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Asked once per clause during warm-up; the reply seeds the fallback guidance
+WARMUP_QUERY = "What evidence do I need for this clause?"
+
+
+async def prior_sessions(units: List[str], before: datetime) -> Dict[str, str]:
+    """Latest session of each business unit created before ``before``, live or archived, for the calling tenant"""
+    if not units:
+        return {}
+    pipeline = [
+        {"$match": {**tenant_filter(), "unit": {"$in": units}, "created_at": {"$lt": before}}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": "$unit", "session_id": {"$first": "$_id"}, "created_at": {"$first": "$created_at"}}},
+    ]
+    latest: Dict[str, Dict[str, Any]] = {}
+    for collection in (db.sessions, db.sessions_archive):
+        async for row in collection.aggregate(pipeline):
+            if row["_id"] not in latest or row["created_at"] > latest[row["_id"]]["created_at"]:
+                latest[row["_id"]] = row
+    return {unit: row["session_id"] for unit, row in latest.items()}
+
+
+async def known_sessions(session_ids: List[str]) -> Set[str]:
+    """Which of ``session_ids`` exist for the calling tenant, live or archived"""
+    found: Set[str] = set()
+    if not session_ids:
+        return found
+    query = {"_id": {"$in": session_ids}, **tenant_filter()}
+    for collection in (db.sessions, db.sessions_archive):
+        found.update([doc["_id"] async for doc in collection.find(query, {"_id": 1})])
+    return found
+
+
+class CampaignService:
+    """
+    Audit campaigns: one session per business unit, created together.
+
+    A campaign is stored in ``db.campaigns`` and launched immediately or, with
+    ``starts_at`` in the future, by the scheduler loop once it is due. Launching
+    creates every session with batched ``insert_many`` (``start_audits``),
+    tagged with ``campaign_id``, ``unit`` and the merged campaign and unit
+    metadata. With ``carry_forward`` each unit's latest earlier session (or
+    its explicit ``prior_session_id``), live or archived, seeds the new one.
+    Its answers are copied into the state and ``db.responses`` together with
+    their scores and grades, so nothing is graded again. Units left without
+    a prior session are listed in ``units_without_prior``. A background warm-up then asks the
+    standard evidence question once per clause and keeps the replies as
+    fallback guidance.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._task: Optional[asyncio.Task] = None
+        self._warmups: Set[asyncio.Task] = set()
+
+    # ─── API ──────────────────────────────────────────────────────
+
+    async def create(
+        self,
+        name: str,
+        units: List[Dict[str, Any]],
+        metadata: Optional[Dict[str, Any]] = None,
+        carry_forward: bool = True,
+        starts_at: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Create a campaign and launch it unless it is scheduled for later"""
+        names = [unit["name"] for unit in units]
+        if not names:
+            raise ValueError("A campaign needs at least one unit")
+        if len(names) > settings.campaign_max_units:
+            raise ValueError(f"A campaign can have at most {settings.campaign_max_units} units")
+        if len(set(names)) != len(names):
+            raise ValueError("Unit names must be unique within a campaign")
+        now = datetime.utcnow()
+        scheduled = starts_at is not None and starts_at > now
+        campaign = {
+            "_id": str(uuid.uuid4()),
+            "tenant_id": current_tenant(),
+            "name": name,
+            "metadata": metadata or {},
+            "units": units,
+            "carry_forward": carry_forward,
+            "status": SCHEDULED if scheduled else LAUNCHING,
+            "starts_at": starts_at or now,
+            "created_at": now,
+        }
+        await db.campaigns.insert_one(campaign)
+        if not scheduled:
+            campaign = await self.launch(campaign)
+        return _public(campaign)
+
+    async def get(self, campaign_id: str) -> Dict[str, Any]:
+        """A campaign with its sessions counted by status"""
+        campaign = await db.campaigns.find_one({"_id": campaign_id})
+        if not campaign or tenant_of(campaign) != current_tenant():
+            raise ValueError("Campaign not found")
+        progress = {
+            row["_id"]: row["count"]
+            async for row in db.sessions.aggregate([
+                {"$match": {"campaign_id": campaign_id}},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ])
+        }
+        return {**_public(campaign), "progress": progress}
+
+    async def list_campaigns(self, limit: int = 100) -> List[Dict[str, Any]]:
+        cursor = db.campaigns.find(tenant_filter(), {"units": 0}).sort("created_at", -1).limit(limit)
+        return [_public(campaign) async for campaign in cursor]
+
+    async def sessions(self, campaign_id: str) -> List[Dict[str, Any]]:
+        """Unit, session id, status and clause position of every session in a campaign"""
+        await self.get(campaign_id)
+        cursor = db.sessions.find(
+            {"campaign_id": campaign_id},
+            {"unit": 1, "status": 1, "clause_index": 1, "carried_from": 1}
+        ).sort("unit", 1)
+        return [
+            {
+                "session_id": doc["_id"],
+                "unit": doc.get("unit"),
+                "status": doc.get("status"),
+                "clause_index": doc.get("clause_index", 0),
+                "carried_from": doc.get("carried_from"),
+            }
+            async for doc in cursor
+        ]
+
+    async def cancel(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a campaign that has not launched yet; None if it already has"""
+        await self.get(campaign_id)
+        campaign = await db.campaigns.find_one_and_update(
+            {"_id": campaign_id, "status": SCHEDULED},
+            {"$set": {"status": CANCELLED}},
+            return_document=ReturnDocument.AFTER
+        )
+        return _public(campaign) if campaign else None
+
+    # ─── Launch ───────────────────────────────────────────────────
+
+    async def launch(self, campaign: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the campaign's sessions and seed carried-forward answers"""
+        started = datetime.utcnow()
+        try:
+            with tenant_scope(campaign.get("tenant_id")):
+                created, carried, unseeded = await self._create_sessions(campaign)
+        except Exception as e:
+            logger.warning(f"Campaign {campaign['_id']} failed to launch: {e}")
+            await db.campaigns.update_one({"_id": campaign["_id"]}, {"$set": {"status": FAILED, "error": str(e)}})
+            raise
+        update = {
+            "status": ACTIVE,
+            "launched_at": datetime.utcnow(),
+            "session_count": created,
+            "carried_answers": carried,
+            "units_without_prior": unseeded,
+            "launch_ms": round((datetime.utcnow() - started).total_seconds() * 1000, 1),
+        }
+        await db.campaigns.update_one({"_id": campaign["_id"]}, {"$set": update})
+        logger.info(f"Campaign {campaign['_id']} launched {created} sessions ({carried} carried answers)")
+        if unseeded:
+            logger.info(f"Campaign {campaign['_id']}: no prior session found for {len(unseeded)} units")
+        if settings.campaign_warmup:
+            self._warm_up(campaign)
+        return {**campaign, **update}
+
+    async def _create_sessions(self, campaign: Dict[str, Any]):
+        units = campaign["units"]
+        priors: Dict[str, str] = {}
+        if campaign.get("carry_forward"):
+            priors = await prior_sessions(
+                [unit["name"] for unit in units if not unit.get("prior_session_id")],
+                campaign["created_at"]
+            )
+            explicit = {unit["name"]: unit["prior_session_id"] for unit in units if unit.get("prior_session_id")}
+            known = await known_sessions(list(set(explicit.values())))
+            priors.update({name: session_id for name, session_id in explicit.items() if session_id in known})
+        answers = await carried_answers(list(set(priors.values())))
+
+        specs = []
+        for unit in units:
+            prior = priors.get(unit["name"])
+            specs.append({
+                "fields": {
+                    "campaign_id": campaign["_id"],
+                    "unit": unit["name"],
+                    "metadata": {**campaign.get("metadata", {}), **(unit.get("metadata") or {})},
+                    "carried_from": prior,
+                },
+                "user_answers": {idx: row["answer"] for idx, row in answers.get(prior, {}).items()},
+            })
+        session_ids = await self.graph.start_audits(specs)
+
+        now = datetime.utcnow()
+        tenant_id = current_tenant()
+        responses = [
+            carried_response(session_id, tenant_id, row, now)
+            for session_id, spec in zip(session_ids, specs)
+            for row in answers.get(spec["fields"]["carried_from"], {}).values()
+        ]
+        for start in range(0, len(responses), settings.campaign_batch_size):
+            batch = responses[start:start + settings.campaign_batch_size]
+            await db.responses.insert_many(batch, ordered=False)
+            search_service.index_many(KIND_ANSWER, [
+                {"ref": doc["_id"], "session_id": doc["session_id"], "clause_index": doc["clause_index"]}
+                for doc in batch
+            ], [doc["answer"] for doc in batch])
+        await analytics.record_answers((doc["clause_index"], doc["answer"]) for doc in responses)
+        unseeded = [unit["name"] for unit in units if unit["name"] not in priors] if campaign.get("carry_forward") else []
+        return len(session_ids), len(responses), unseeded
+
+    # ─── Guidance warm-up ─────────────────────────────────────────
+
+    def _warm_up(self, campaign: Dict[str, Any]) -> None:
+        task = asyncio.create_task(self._run_warm_up(campaign))
+        self._warmups.add(task)
+        task.add_done_callback(self._warmups.discard)
+
+    async def _run_warm_up(self, campaign: Dict[str, Any]) -> None:
+        """Ask the standard evidence question per clause, once, so fallback guidance is a real reply"""
+        warmed = 0
+        prompt = prompt_registry.get(NODE_QUERY)
+        with tenant_scope(campaign.get("tenant_id")), usage_scope(endpoint="background:campaign_warmup"):
+            for idx in range(len(CLAUSE_METADATA)):
+                if guidance_fallback.has(idx, WARMUP_QUERY):
+                    continue
+                if not llm_breaker.available:
+                    break
+                messages = prompt.messages(clause=prompt_registry.clause_block(idx), query=WARMUP_QUERY)
+                try:
+                    with usage_scope(clause_index=idx):
+                        reply = await llm_gateway.chat(self.graph.llm, prompt, messages, enforce_quota=False)
+                except Exception as e:
+                    logger.info(f"Campaign warm-up stopped at clause {idx}: {e}")
+                    break
+                guidance_fallback.remember(idx, WARMUP_QUERY, reply)
+                warmed += 1
+        await db.campaigns.update_one({"_id": campaign["_id"]}, {"$set": {"warmed_clauses": warmed}})
+
+    # ─── Scheduler ────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        for task in [self._task, *self._warmups]:
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.campaign_poll_seconds)
+            try:
+                await self.launch_due()
+            except Exception as e:
+                logger.warning(f"Campaign scheduler failed: {e}")
+
+    async def launch_due(self) -> int:
+        """Launch every scheduled campaign whose start time has passed; returns how many"""
+        launched = 0
+        while True:
+            campaign = await db.campaigns.find_one_and_update(
+                {"status": SCHEDULED, "starts_at": {"$lte": datetime.utcnow()}},
+                {"$set": {"status": LAUNCHING}},
+                sort=[("starts_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if campaign is None:
+                return launched
+            try:
+                await self.launch(campaign)
+                launched += 1
+            except Exception:
+                continue
+
+
+def _public(campaign: Dict[str, Any]) -> Dict[str, Any]:
+    data = {k: v for k, v in campaign.items() if k not in ("_id", "tenant_id")}
+    return {"campaign_id": campaign["_id"], **data}
+
+
+# Global instance
+campaign_service = CampaignService(simple_audit_graph)
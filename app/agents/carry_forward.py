@@ -0,0 +1,120 @@
+# app/agents/carry_forward.py
+
+import difflib
+import hashlib
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import DESCENDING
+
+from app.agents.side_store import ANALYSIS_DONE
+from app.services.audit_engine import CLAUSE_METADATA
+from app.services.mongo_client import db
+from app.services.scoring import SCORING_VERSION, SKIP_ANSWER, score_answer
+from app.services.tenancy import tenant_filter
+from app.config import settings
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+MAX_DIFF_FRAGMENTS = 10
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def answer_diff(previous: str, answer: str) -> Dict[str, Any]:
+    """
+    Word-level diff of a revised answer against the one it replaces. Case,
+    punctuation and whitespace are ignored; ``changed`` is False when the
+    similarity is at least ``carry_forward_unchanged_ratio``.
+    """
+    before, after = _words(previous), _words(answer)
+    matcher = difflib.SequenceMatcher(None, before, after, autojunk=False)
+    added, removed = [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.append(" ".join(before[i1:i2]))
+        if tag in ("replace", "insert"):
+            added.append(" ".join(after[j1:j2]))
+    ratio = matcher.ratio() if before or after else 1.0
+    return {
+        "ratio": round(ratio, 3),
+        "changed": ratio < settings.carry_forward_unchanged_ratio,
+        "added": added[:MAX_DIFF_FRAGMENTS],
+        "removed": removed[:MAX_DIFF_FRAGMENTS],
+    }
+
+
+def text_fingerprint(text: Optional[str]) -> Optional[str]:
+    """Hash of a document's extracted words, so re-exported files with the same text match"""
+    words = _words(text or "")
+    return hashlib.sha256(" ".join(words).encode()).hexdigest() if words else None
+
+
+# ─── Reuse of earlier LLM work ───────────────────────────────────
+
+async def previous_grade(session_id: str, clause_index: int) -> Optional[Dict[str, Any]]:
+    """Grade of the latest answer to a clause in a session, if it has been graded"""
+    row = await db.responses.find_one(
+        {"session_id": session_id, "clause_index": clause_index},
+        {"grade": 1},
+        sort=[("answered_at", DESCENDING)]
+    )
+    return row.get("grade") if row else None
+
+
+async def reusable_analysis(clause_index: int, fingerprint: Optional[str], prompt_version: str) -> Optional[Dict[str, Any]]:
+    """A finished analysis of the same text for the same clause and prompt version, within the tenant"""
+    if not fingerprint:
+        return None
+    return await db.documents.find_one(
+        {
+            **tenant_filter(),
+            "clause_index": clause_index,
+            "text_fingerprint": fingerprint,
+            "prompt_version": prompt_version,
+            "analysis_status": ANALYSIS_DONE,
+        },
+        {"analysis_summary": 1},
+        sort=[("uploaded_at", DESCENDING)]
+    )
+
+
+# ─── Seeding from an earlier session ─────────────────────────────
+
+async def carried_answers(session_ids: List[str]) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """Latest non-skipped response per clause for each session, live or archived, with its score and grade"""
+    carried: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    if not session_ids:
+        return carried
+    query = {"session_id": {"$in": session_ids}, **tenant_filter()}
+    projection = {"session_id": 1, "clause_index": 1, "answer": 1, "score": 1, "scoring_version": 1, "grade": 1, "answered_at": 1}
+    rows: List[Dict[str, Any]] = []
+    for collection in (db.responses, db.responses_archive):
+        rows.extend(await collection.find(query, projection).to_list(length=None))
+    rows.sort(key=lambda row: row.get("answered_at") or datetime.min)
+    for row in rows:
+        carried.setdefault(row["session_id"], {})[row["clause_index"]] = row
+    for answers in carried.values():
+        for idx in [idx for idx, row in answers.items() if row["answer"] == SKIP_ANSWER]:
+            del answers[idx]
+    return carried
+
+
+def carried_response(session_id: str, tenant_id: str, row: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """``responses`` document copying an earlier answer, score and grade into another session"""
+    idx = row["clause_index"]
+    current = row.get("scoring_version") == SCORING_VERSION and row.get("score") is not None
+    return {
+        "session_id": session_id,
+        "tenant_id": tenant_id,
+        "clause_index": idx,
+        "clause": CLAUSE_METADATA[idx]["question"] if idx < len(CLAUSE_METADATA) else None,
+        "answer": row["answer"],
+        "score": row["score"] if current else score_answer(row["answer"]),
+        "scoring_version": SCORING_VERSION,
+        **({"grade": row["grade"]} if row.get("grade") else {}),
+        "carried_from": row["session_id"],
+        "answered_at": now,
+    }
@@ -7,6 +7,7 @@ import uuid
 from datetime import datetime
 
 from app.agents.state import AuditState, AuditStatus, create_initial_state
+from app.agents.side_store import side_store
 from app.agents.nodes import AuditNodes
 from app.agents.tools import AUDIT_TOOLS
 from app.services.mongo_client import db
@@ -175,8 +176,7 @@ class AuditGraph:
             raise ValueError("Session not found")
         
         # Create a new state with the query
-        from app.agents.state import AuditState
-        new_state = AuditState(**current_state)
+        new_state = AuditState.from_snapshot(current_state)
         new_state.current_query = query
         
         # Run the graph
@@ -199,8 +199,7 @@ class AuditGraph:
             raise ValueError("Session not found")
         
         # Create a new state with the answer
-        from app.agents.state import AuditState
-        new_state = AuditState(**current_state)
+        new_state = AuditState.from_snapshot(current_state)
         new_state.pending_answer = answer
         
         # Run the graph
@@ -223,17 +222,17 @@ class AuditGraph:
             raise ValueError("Session not found")
         
         # Create a new state with the document
-        from app.agents.state import AuditState
-        new_state = AuditState(**current_state)
+        new_state = AuditState.from_snapshot(current_state)
         if document_key not in new_state.uploaded_documents:
             new_state.uploaded_documents.append(document_key)
         
         # Run the graph to analyze documents
         result = await self.graph.ainvoke(new_state, config)
+        analyses = await side_store.load_analyses(session_id, result.current_clause_index)
         
         return {
             "success": True,
-            "document_analysis": result.document_analysis.get(result.current_clause_index, []),
+            "document_analysis": analyses.get(result.current_clause_index, []),
             "status": result.status.value
         }
     
@@ -248,8 +247,7 @@ class AuditGraph:
             raise ValueError("Session not found")
         
         # Convert to AuditState object
-        from app.agents.state import AuditState
-        state = AuditState(**current_state)
+        state = AuditState.from_snapshot(current_state)
         
         return {
             "session_id": session_id,
@@ -273,8 +271,7 @@ class AuditGraph:
             raise ValueError("Session not found")
         
         # Convert to AuditState object
-        from app.agents.state import AuditState
-        state = AuditState(**current_state)
+        state = AuditState.from_snapshot(current_state)
         
         if state.status != AuditStatus.COMPLETED:
             raise ValueError("Audit not completed")
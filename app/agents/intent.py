@@ -0,0 +1,148 @@
+# app/agents/intent.py
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List
+
+INTENT_NEXT = "next"
+INTENT_PREVIOUS = "previous"
+INTENT_OTHER = "other"
+NAVIGATION_INTENTS = (INTENT_NEXT, INTENT_PREVIOUS)
+
+# Exact commands, matched after normalisation
+NEXT_COMMANDS = {
+    "next", "skip", "advance", "continue", "move on", "next clause", "skip this",
+    "skip clause", "skip this clause", "move to next clause", "go to next clause",
+    "move to the next clause", "go to the next clause", "next one", "go next",
+}
+PREVIOUS_COMMANDS = {
+    "previous", "back", "go back", "prev", "previous clause",
+    "move to previous clause", "go to previous clause", "move to the previous clause",
+    "go to the previous clause", "back one", "previous one",
+}
+
+# Seed data for the fallback model; "other" holds near-misses on purpose
+TRAINING_EXAMPLES: Dict[str, List[str]] = {
+    INTENT_NEXT: [
+        "next please", "skip this one", "lets move on", "let's move on to the next one",
+        "continue to the next clause", "proceed to the next clause", "take me to the next clause",
+        "skip it", "skip for now", "move forward", "go to the next question", "next question",
+        "ok next", "we can skip this", "move ahead", "on to the next one",
+    ],
+    INTENT_PREVIOUS: [
+        "go back please", "take me back", "back to the previous clause", "return to the previous clause",
+        "go back one clause", "previous question", "show me the previous clause", "go to the previous one",
+        "back up one", "return to previous", "let's go back", "revisit the previous clause",
+    ],
+    INTENT_OTHER: [
+        "what does this clause mean", "how do we comply with this", "what evidence do i need",
+        "we have a documented policy for this", "can you explain this requirement", "hello",
+        "what is the scope of the isms", "who should approve the policy", "what are interested parties",
+        "is a risk register enough", "explain the next steps for compliance", "what happens next in the audit",
+        "should we go back to the board for approval", "i don't know", "thanks", "help me draft a scope statement",
+        "what should the next version of our policy include", "we moved our backups to the cloud",
+        "our previous auditor said this was fine", "what is the next review date requirement",
+        # Re-display requests and "last" (final or preceding?) stay with the LLM
+        "show me that clause", "show me this clause again", "show me the clause", "repeat the clause",
+        "show it again", "the last one", "go to the last clause", "take me to the last clause",
+        "the last clause", "show me the current clause",
+    ],
+}
+
+MODEL_MAX_TOKENS = 8        # longer messages always go to the LLM
+MODEL_MIN_CONFIDENCE = 0.85
+
+# A model hit only navigates when the message is a bare command: no question,
+# and every word is one of these. Anything else ("explain the previous
+# clause", "the next one is hard", "back up") is left to the LLM. "last" and
+# "that" are left out: "the last one" may mean the final clause, "that
+# clause" usually the current one.
+COMMAND_WORDS = frozenset(
+    "next skip move moving on forward ahead advance continue proceed go going back previous prev "
+    "return revisit take me us to the this it one clause question please ok okay now for let's lets "
+    "we can show".split()
+)
+INTERROGATIVES = frozenset(
+    "what why how when where who which whose is are was were do does did can could should would will may".split()
+)
+
+_NORMALIZE_RE = re.compile(r"[^a-z0-9' ]+")
+
+
+def normalize(message: str) -> str:
+    return " ".join(_NORMALIZE_RE.sub(" ", message.lower()).split())
+
+
+def _features(text: str) -> List[str]:
+    tokens = text.split()
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class NaiveBayesIntentModel:
+    """Tiny multinomial naive Bayes over word unigrams and bigrams"""
+
+    def __init__(self, examples: Dict[str, List[str]], alpha: float = 0.5):
+        self.alpha = alpha
+        self.labels = list(examples)
+        self.counts = {label: Counter() for label in self.labels}
+        for label, texts in examples.items():
+            for text in texts:
+                self.counts[label].update(_features(normalize(text)))
+        self.vocab = set().union(*self.counts.values())
+        self.totals = {label: sum(c.values()) for label, c in self.counts.items()}
+        n = sum(len(texts) for texts in examples.values())
+        self.priors = {label: math.log(len(examples[label]) / n) for label in self.labels}
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        features = [f for f in _features(text) if f in self.vocab]
+        v = len(self.vocab)
+        scores = {}
+        for label in self.labels:
+            denom = self.totals[label] + self.alpha * v
+            scores[label] = self.priors[label] + sum(
+                math.log((self.counts[label][f] + self.alpha) / denom) for f in features
+            )
+        top = max(scores.values())
+        exp = {label: math.exp(s - top) for label, s in scores.items()}
+        total = sum(exp.values())
+        return {label: e / total for label, e in exp.items()}
+
+
+@dataclass
+class IntentResult:
+    intent: str
+    confidence: float
+    source: str     # "rule", "model" or "default"
+
+    @property
+    def is_navigation(self) -> bool:
+        return self.intent in NAVIGATION_INTENTS
+
+
+_model = NaiveBayesIntentModel(TRAINING_EXAMPLES)
+
+
+def is_bare_command(message: str, text: str) -> bool:
+    """True when a message only asks to move: not a question, no words beyond ``COMMAND_WORDS``"""
+    tokens = text.split()
+    if not tokens or "?" in message or tokens[0] in INTERROGATIVES:
+        return False
+    return all(token in COMMAND_WORDS for token in tokens)
+
+
+def classify(message: str) -> IntentResult:
+    """Classify a chat message as next / previous navigation or anything else"""
+    text = normalize(message)
+    if text in NEXT_COMMANDS:
+        return IntentResult(INTENT_NEXT, 1.0, "rule")
+    if text in PREVIOUS_COMMANDS:
+        return IntentResult(INTENT_PREVIOUS, 1.0, "rule")
+
+    if text and len(text.split()) <= MODEL_MAX_TOKENS and is_bare_command(message, text):
+        proba = _model.predict_proba(text)
+        label = max(proba, key=proba.get)
+        if label in NAVIGATION_INTENTS and proba[label] >= MODEL_MIN_CONFIDENCE:
+            return IntentResult(label, proba[label], "model")
+    return IntentResult(INTENT_OTHER, 1.0, "default")
@@ -2,13 +2,17 @@
 
 from typing import Dict, Any, List
 from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
 import asyncio
 from datetime import datetime
 
 from app.agents.state import AuditState, AuditStatus
+from app.agents.side_store import side_store, make_message
 from app.agents.tools import AUDIT_TOOLS
 from app.services.audit_engine import CLAUSE_METADATA
+from app.services.guidance_fallback import guidance_fallback
+from app.services.llm_gateway import LLMUnavailable, llm_gateway
+from app.services.model_router import model_router
+from app.services.prompts import NODE_QUERY, REPORT_NARRATIVE, prompt_registry
 
 
 class AuditNodes:
@@ -28,9 +32,6 @@ class AuditNodes:
         state.current_clause_index = 0
         state.total_clauses = len(CLAUSE_METADATA)
         
-        if state.current_clause_index < len(CLAUSE_METADATA):
-            state.current_clause = CLAUSE_METADATA[state.current_clause_index]
-        
         return state
     
     async def get_current_clause(self, state: AuditState) -> AuditState:
@@ -39,7 +40,6 @@ class AuditNodes:
             state.status = AuditStatus.COMPLETED
             return state
         
-        state.current_clause = CLAUSE_METADATA[state.current_clause_index]
         state.updated_at = datetime.utcnow()
         
         return state
@@ -49,43 +49,29 @@ class AuditNodes:
         if not state.current_query or not state.current_clause:
             return state
         
-        system_prompt = """You are an expert ISO 27001 internal auditor. Your role is to:
-        1. Answer questions about ISO 27001 clauses clearly and accurately
-        2. Provide guidance on compliance requirements
-        3. Help users understand what they need to implement
-        4. Be helpful but maintain professional audit standards
-        
-        If the query is not related to ISO 27001, politely redirect the conversation."""
-        
-        user_prompt = f"""
-        Current Clause: {state.current_clause['question']}
-        Description: {state.current_clause['description']}
-        Key Attributes: {', '.join(state.current_clause['attributes'])}
-        
-        User Query: {state.current_query}
-        
-        Please provide a clear, helpful response.
-        """
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+        prompt = prompt_registry.get(NODE_QUERY)
+        messages = prompt.messages(
+            clause=prompt_registry.clause_block(state.current_clause_index),
+            query=state.current_query
+        )
         
-        response = await self.llm.ainvoke(messages)
-        state.agent_response = response.content
+        route = model_router.decide(NODE_QUERY, state.current_query)
+        try:
+            state.agent_response = await llm_gateway.chat(model_router.llm_for(route, self.llm), prompt, messages)
+        except LLMUnavailable:
+            state.agent_response = guidance_fallback.reply(state.current_clause_index, state.current_query)
+        else:
+            model_router.shadow(
+                route,
+                lambda: llm_gateway.chat(model_router.fast_llm, prompt, messages, enforce_quota=False),
+                state.agent_response
+            )
         
         # Add to conversation history
-        state.conversation_history.append({
-            "role": "user",
-            "content": state.current_query,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        state.conversation_history.append({
-            "role": "assistant", 
-            "content": state.agent_response,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await side_store.append_messages(state.session_id, [
+            make_message("user", state.current_query),
+            make_message("assistant", state.agent_response)
+        ])
         
         state.updated_at = datetime.utcnow()
         return state
@@ -101,11 +87,9 @@ class AuditNodes:
             state.user_answers[state.current_clause_index] = state.pending_answer
             
             # Add to conversation history
-            state.conversation_history.append({
-                "role": "user",
-                "content": f"Answer for {state.current_clause['question']}: {state.pending_answer}",
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            await side_store.append_messages(state.session_id, [
+                make_message("user", f"Answer for {state.current_clause['question']}: {state.pending_answer}")
+            ])
             
             # Clear pending answer
             state.pending_answer = None
@@ -118,7 +102,6 @@ class AuditNodes:
         if not state.uploaded_documents or not state.current_clause:
             return state
         
-        analysis_results = []
         for doc_key in state.uploaded_documents:
             # Use the document analysis tool
             analyze_tool = next(t for t in AUDIT_TOOLS if t.name == "analyze_document")
@@ -126,9 +109,13 @@ class AuditNodes:
                 document_key=doc_key,
                 clause_context=state.current_clause['question']
             )
-            analysis_results.append(result)
+            await side_store.record_analysis(
+                state.session_id,
+                state.current_clause_index,
+                result,
+                clause=state.current_clause['question']
+            )
         
-        state.document_analysis[state.current_clause_index] = analysis_results
         state.updated_at = datetime.utcnow()
         
         return state
@@ -139,9 +126,6 @@ class AuditNodes:
         
         if state.current_clause_index >= len(CLAUSE_METADATA):
             state.status = AuditStatus.COMPLETED
-            state.current_clause = None
-        else:
-            state.current_clause = CLAUSE_METADATA[state.current_clause_index]
         
         state.updated_at = datetime.utcnow()
         return state
@@ -184,39 +168,21 @@ class AuditNodes:
         if state.status != AuditStatus.COMPLETED:
             return state
         
-        system_prompt = """You are an expert ISO 27001 auditor creating a final audit report. 
-        Create a comprehensive, professional report based on the audit findings."""
-        
-        user_prompt = f"""
-        Create an ISO 27001 audit report with the following information:
-        
-        Session ID: {state.session_id}
-        Compliance Score: {state.compliance_score}%
-        Total Clauses Audited: {state.total_clauses}
-        Recommendations: {state.recommendations}
-        
-        User Answers Summary:
-        {self._format_answers_summary(state.user_answers)}
-        
-        Please create a professional audit report with:
-        1. Executive Summary
-        2. Compliance Assessment
-        3. Key Findings
-        4. Recommendations
-        5. Next Steps
-        """
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+        prompt = prompt_registry.get(REPORT_NARRATIVE)
+        messages = prompt.messages(
+            session_id=state.session_id,
+            score=state.compliance_score,
+            total_clauses=state.total_clauses,
+            recommendations=state.recommendations,
+            answers=self._format_answers_summary(state.user_answers)
+        )
         
-        response = await self.llm.ainvoke(messages)
+        report = await llm_gateway.chat(self.llm, prompt, messages)
         
         # Store the report in audit findings
         state.audit_findings.append({
             "type": "final_report",
-            "content": response.content,
+            "content": report,
             "generated_at": datetime.utcnow().isoformat()
         })
         
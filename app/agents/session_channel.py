@@ -0,0 +1,165 @@
+# app/agents/session_channel.py
+
+import asyncio
+import logging
+from typing import Any, Dict
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, ValidationError
+
+from app.agents.simple_graph import simple_audit_graph
+from app.models.audit import AnswerRequest, DocumentUploadRequest, QueryRequest, SetClauseRequest
+from app.services.session_events import session_events
+from app.services.tenant_scheduler import TenantQuotaExceeded
+from app.services.usage_ledger import usage_scope
+
+logger = logging.getLogger("uvicorn")
+
+SNAPSHOT = "snapshot"
+OUTBOUND_FRAMES = 256    # frames buffered for a slow client before token streaming waits
+CLOSE_NOT_FOUND = 4404
+
+
+class _Status(BaseModel):
+    """A status request has no fields"""
+
+
+class SessionChannel:
+    """
+    One WebSocket carrying everything the chat UI does for a session.
+
+    Client frames are ``{"id": ..., "type": ..., **fields}`` where ``type`` is
+    ``query``, ``answer``, ``set_clause``, ``upload_document``,
+    ``map_document`` or ``status`` and the fields match the REST request
+    bodies. The server answers each with a ``result`` (or ``error``) frame
+    carrying the same ``id``, streams the agent's reply as ``token`` frames
+    before the ``result`` of a query, and pushes ``event`` frames for state
+    changes from any source: a ``snapshot`` on connect, then
+    ``clause_changed``, ``answer_recorded``, ``audit_completed``,
+    ``document_analyzed``, ``score_updated`` and ``report_ready``.
+
+    Frames from one client are handled in order. All writes go through one
+    queue and writer task so tokens, results and events never interleave
+    mid-frame.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str):
+        self.websocket = websocket
+        self.session_id = session_id
+        self._outbound: asyncio.Queue = asyncio.Queue(maxsize=OUTBOUND_FRAMES)
+        self._actions = {
+            "query": (QueryRequest, self._query, "process query"),
+            "answer": (AnswerRequest, self._answer, "record answer"),
+            "set_clause": (SetClauseRequest, self._set_clause, "set clause index"),
+            "upload_document": (DocumentUploadRequest, self._upload_document, "upload document"),
+            "map_document": (DocumentUploadRequest, self._map_document, "map document"),
+            "status": (_Status, self._status, "get status"),
+        }
+
+    async def serve(self) -> None:
+        await self.websocket.accept()
+        try:
+            status = await simple_audit_graph.get_audit_status(self.session_id)
+        except ValueError as e:
+            await self.websocket.close(code=CLOSE_NOT_FOUND, reason=str(e))
+            return
+
+        # Subscribe before the snapshot so no change slips in between
+        async with session_events.subscribe(self.session_id) as events:
+            await self._outbound.put({"type": "event", "event": SNAPSHOT, "session_id": self.session_id, "data": status})
+            tasks = [
+                asyncio.create_task(self._read()),
+                asyncio.create_task(self._write()),
+                asyncio.create_task(self._forward(events)),
+            ]
+            try:
+                # Whichever side stops first (client left, send failed) ends the channel
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                for result in await asyncio.gather(*tasks, return_exceptions=True):
+                    if isinstance(result, Exception) and not isinstance(result, WebSocketDisconnect):
+                        logger.warning(f"Session channel {self.session_id} closed: {result}")
+
+    # ─── Transport ────────────────────────────────────────────────
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                message = await self.websocket.receive_json()
+            except WebSocketDisconnect:
+                return
+            except (ValueError, KeyError):
+                await self._error(None, 400, "Frames must be JSON text")
+                continue
+            await self._handle(message)
+
+    async def _write(self) -> None:
+        while True:
+            frame = await self._outbound.get()
+            await self.websocket.send_json(jsonable_encoder(frame))
+
+    async def _forward(self, events: asyncio.Queue) -> None:
+        while True:
+            await self._outbound.put(await events.get())
+
+    async def _error(self, request_id: Any, status_code: int, detail: str) -> None:
+        await self._outbound.put({"type": "error", "id": request_id, "status": status_code, "detail": detail})
+
+    # ─── Requests ─────────────────────────────────────────────────
+
+    async def _handle(self, message: Any) -> None:
+        request_id = message.get("id") if isinstance(message, dict) else None
+        action = self._actions.get(message.get("type")) if isinstance(message, dict) else None
+        if action is None:
+            await self._error(request_id, 400, "Unknown message type")
+            return
+        model, handler, label = action
+        try:
+            req = model.model_validate(message)
+        except ValidationError as e:
+            await self._error(request_id, 422, str(e))
+            return
+        try:
+            with usage_scope(endpoint=f"ws:{message['type']}"):
+                data = await handler(request_id, req)
+        except ValueError as e:
+            await self._error(request_id, 404, str(e))
+            return
+        except TenantQuotaExceeded as e:
+            await self._error(request_id, 429, str(e))
+            return
+        except Exception as e:
+            await self._error(request_id, 500, f"Failed to {label}: {str(e)}")
+            return
+        await self._outbound.put({"type": "result", "id": request_id, "action": message["type"], "data": data})
+
+    async def _query(self, request_id: Any, req: QueryRequest) -> Dict[str, Any]:
+        async def on_token(text: str) -> None:
+            await self._outbound.put({"type": "token", "id": request_id, "text": text})
+
+        result = await simple_audit_graph.process_query(self.session_id, req.query, on_token=on_token)
+        return {
+            "response": result["response"],
+            "advance_clause": result["advance_clause"],
+            "previous_clause": result["previous_clause"],
+            "degraded": result["degraded"]
+        }
+
+    async def _answer(self, request_id: Any, req: AnswerRequest) -> Dict[str, Any]:
+        result = await simple_audit_graph.record_answer(self.session_id, req.answer)
+        return {"success": result["success"], "next_clause": result["next_clause"], "status": result["status"]}
+
+    async def _set_clause(self, request_id: Any, req: SetClauseRequest) -> Dict[str, Any]:
+        return await simple_audit_graph.set_clause_index(self.session_id, req.index)
+
+    async def _upload_document(self, request_id: Any, req: DocumentUploadRequest) -> Dict[str, Any]:
+        return await simple_audit_graph.upload_document(self.session_id, req.document_key)
+
+    async def _map_document(self, request_id: Any, req: DocumentUploadRequest) -> Dict[str, Any]:
+        return await simple_audit_graph.map_document(self.session_id, req.document_key)
+
+    async def _status(self, request_id: Any, req: _Status) -> Dict[str, Any]:
+        return await simple_audit_graph.get_audit_status(self.session_id)
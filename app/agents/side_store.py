@@ -0,0 +1,93 @@
+# app/agents/side_store.py
+
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+
+from app.services.mongo_client import db
+from app.services.tenancy import current_tenant
+
+# analysis_status of db.documents rows
+ANALYSIS_DONE = "done"
+ANALYSIS_DEFERRED = "deferred"   # queued while the LLM was unavailable
+
+
+class SessionSideStore:
+    """Bulky per-session data kept out of ``AuditState``.
+
+    Conversation turns are appended to ``db.conversations`` and document
+    analyses to ``db.documents``. Nothing is held in memory; readers load
+    what they need on demand.
+    """
+
+    async def append_messages(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """Append conversation turns for a session"""
+        if not messages:
+            return
+        await db.conversations.insert_many([
+            {"session_id": session_id, **message} for message in messages
+        ])
+
+    async def load_history(self, session_id: str, limit: int = 200) -> List[Dict[str, str]]:
+        """Return the most recent ``limit`` turns in chronological order"""
+        cursor = db.conversations.find(
+            {"session_id": session_id},
+            {"_id": 0, "session_id": 0}
+        ).sort("_id", -1).limit(limit)
+        messages = await cursor.to_list(length=limit)
+        messages.reverse()
+        return messages
+
+    async def record_analysis(
+        self,
+        session_id: str,
+        clause_index: int,
+        analysis: Dict[str, Any],
+        clause: Optional[str] = None,
+        answer: Optional[str] = None
+    ) -> Any:
+        """Persist one document analysis for a clause and return its id"""
+        result = await db.documents.insert_one({
+            "session_id": session_id,
+            "tenant_id": current_tenant(),
+            "clause_index": clause_index,
+            "clause": clause,
+            "document_key": analysis.get("document_key"),
+            "analysis_summary": analysis.get("analysis_summary"),
+            "analysis_status": analysis.get("analysis_status"),
+            "sha256": analysis.get("sha256"),
+            "text_fingerprint": analysis.get("text_fingerprint"),
+            "prompt_version": analysis.get("prompt_version"),
+            "reused_from": analysis.get("reused_from"),
+            "match_score": analysis.get("match_score"),
+            "answer": answer,
+            "uploaded_at": datetime.utcnow()
+        })
+        return result.inserted_id
+
+    async def load_analyses(
+        self,
+        session_id: str,
+        clause_index: Optional[int] = None
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Load document analyses grouped by clause index"""
+        query: Dict[str, Any] = {"session_id": session_id}
+        if clause_index is not None:
+            query["clause_index"] = clause_index
+        docs = await db.documents.find(query, {"_id": 0}).to_list(length=None)
+        grouped: Dict[int, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            grouped.setdefault(doc["clause_index"], []).append(doc)
+        return grouped
+
+
+def make_message(role: str, content: str) -> Dict[str, str]:
+    """Build a conversation turn in the stored format"""
+    return {
+        "role": role,
+        "content": content,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+# Global instance
+side_store = SessionSideStore()
@@ -1,27 +1,100 @@
 # app/agents/simple_graph.py
 
+import asyncio
+import logging
+import time
 import uuid
-from datetime import datetime
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Any, List, Optional
 from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from pymongo import ReturnDocument
 from app.services.mongo_client import db
 from app.services.audit_engine import CLAUSE_METADATA
 from app.agents.state import AuditState, AuditStatus, create_initial_state
+from app.agents.carry_forward import (
+    answer_diff, carried_answers, carried_response, previous_grade, reusable_analysis, text_fingerprint
+)
+from app.agents.side_store import ANALYSIS_DEFERRED, ANALYSIS_DONE, side_store, make_message
+from app.agents.intent import INTENT_NEXT, classify
+from app.agents.structured_output import AgentReply, JsonFieldStream, invoke_structured
+from app.services.report_pipeline import ReportPipeline
+from app.services.evidence_mapper import ClauseMatch, evidence_mapper
+from app.services.guidance_fallback import guidance_fallback
+from app.services.llm_gateway import llm_gateway
+from app.services.model_router import model_router
+from app.services.prompts import AGENT_QUERY, DOCUMENT_ANALYSIS, prompt_registry
+from app.services import analytics, profiler
+from app.services.scoring import SCORING_VERSION, score_answer
+from app.services.grading import answer_grader
+from app.services.ingestion import STATUS_READY, ingestion_pipeline
+from app.services.search import search_service, KIND_ANSWER, KIND_DOCUMENT
+from app.services.session_lifecycle import find_archived_session, restore_session
+from app.services.event_bus import RESYNC
+from app.services.session_events import (
+    ANSWER_RECORDED, AUDIT_COMPLETED, CLAUSE_CHANGED, DOCUMENT_ANALYZED, SCORE_UPDATED, session_events
+)
+from app.services.tenancy import current_tenant, owns_key, tenant_of, tenant_scope
+from app.services.tenant_scheduler import TenantQuotaExceeded
+from app.services.usage_ledger import tag_usage, usage_scope
 from app.config import settings
 
+logger = logging.getLogger("uvicorn")
+
+
+FOLLOW_UP_QUESTION = "Would you like to record your answer for this clause or upload supporting documents?"
+DEFERRED_SUMMARY = "Document received. The assistant is temporarily unavailable, so its analysis is queued and will be added automatically."
+DEFERRED_CLAIM_MINUTES = 10   # a claimed analysis not finished by then is retried
+
+
+def _describe_clause(clause: Dict[str, Any]) -> str:
+    return f"**{clause['question']}**\n{clause['description']}"
+
+
+def _session_document(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Mongo document for a new session from its initial state snapshot"""
+    return {
+        "_id": snapshot["session_id"],
+        "tenant_id": snapshot.get("tenant_id"),
+        "clause_index": 0,
+        "created_at": snapshot["created_at"],
+        "last_active_at": snapshot["created_at"],
+        "status": snapshot["status"],
+        "state": snapshot,
+        "state_version": 0
+    }
+
+
+def _document_details(ingested: Dict[str, Any]) -> str:
+    details = [ingested.get("mime_type") or "type unknown"]
+    if ingested.get("page_count"):
+        details.append(f"{ingested['page_count']} pages")
+    return ", ".join(details)
+
+
+def _document_excerpt(ingested: Dict[str, Any]) -> str:
+    text = ingested.get("text")
+    if not text:
+        return f"(not available: extraction status is {ingested.get('status', 'unknown')})"
+    limit = settings.document_prompt_chars
+    return text if len(text) <= limit else text[:limit] + "\n[... truncated]"
+
 
 class SimpleAuditGraph:
     """Simplified audit graph that works with current LangGraph version"""
     
     def __init__(self):
-        self.sessions = {}  # In-memory session storage
+        self.sessions: "OrderedDict[str, AuditState]" = OrderedDict()  # LRU in-memory session cache
+        self._last_access: Dict[str, float] = {}
         self.llm = ChatOpenAI(
             model="gpt-4",
             temperature=0,
             max_tokens=1000,
             api_key=settings.openai_api_key
         )
+        self.grader = answer_grader
+        self.reports = ReportPipeline(self.llm, self.grader)
+        session_events.on_remote(self.apply_change)
     
     async def start_audit(self, session_id: Optional[str] = None) -> str:
         """Start a new audit session"""
@@ -29,107 +102,295 @@ class SimpleAuditGraph:
             session_id = str(uuid.uuid4())
         
         # Create initial state
-        initial_state = create_initial_state(session_id)
+        tenant_id = current_tenant()
+        initial_state = create_initial_state(session_id, tenant_id)
         
         # Save session to MongoDB
-        await db.sessions.insert_one({
-            "_id": session_id,
-            "clause_index": 0,
-            "created_at": initial_state.created_at,
-            "status": initial_state.status.value
-        })
+        await db.sessions.insert_one(_session_document(initial_state.to_snapshot()))
         
         # Store in memory
-        self.sessions[session_id] = initial_state
-        
-        # Set current clause
-        if initial_state.current_clause_index < len(CLAUSE_METADATA):
-            initial_state.current_clause = CLAUSE_METADATA[initial_state.current_clause_index]
+        await self._cache_state(initial_state)
         
         return session_id
-    
-    async def process_query(self, session_id: str, query: str) -> Dict[str, Any]:
-        """Process a user query"""
-        if session_id not in self.sessions:
+
+    async def start_audits(self, specs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Create one session per spec with batched ``insert_many``. A spec may
+        carry extra session document ``fields`` and pre-seeded
+        ``user_answers``. The sessions are not cached; they load on first use.
+        """
+        template = create_initial_state("", current_tenant()).to_snapshot()
+        session_ids: List[str] = []
+        docs: List[Dict[str, Any]] = []
+        for spec in specs:
+            session_id = str(uuid.uuid4())
+            snapshot = {**template, "session_id": session_id}
+            if spec.get("user_answers"):
+                snapshot["user_answers"] = {str(k): v for k, v in spec["user_answers"].items()}
+            docs.append({**_session_document(snapshot), **(spec.get("fields") or {})})
+            session_ids.append(session_id)
+            if len(docs) >= settings.campaign_batch_size:
+                await db.sessions.insert_many(docs, ordered=False)
+                docs = []
+        if docs:
+            await db.sessions.insert_many(docs, ordered=False)
+        return session_ids
+
+    async def _get_state(self, session_id: str) -> AuditState:
+        """
+        Return the cached state, rehydrating it from the Mongo checkpoint if
+        evicted, or restoring it from the archive if it has been archived.
+        Sessions of other tenants are reported as not found.
+        """
+        state = self.sessions.get(session_id)
+        if state is not None:
+            if (state.tenant_id or settings.default_tenant) != current_tenant():
+                raise ValueError("Session not found")
+            self.sessions.move_to_end(session_id)
+            self._last_access[session_id] = time.monotonic()
+            profiler.annotate(session_id=session_id, clause_index=state.current_clause_index)
+            tag_usage(session_id=session_id, clause_index=state.current_clause_index)
+            return state
+        
+        sess = await db.sessions.find_one({"_id": session_id})
+        if sess is None:
+            archived = await find_archived_session(session_id)
+            if archived and tenant_of(archived) == current_tenant():
+                sess = await restore_session(session_id)
+        if not sess or tenant_of(sess) != current_tenant():
             raise ValueError("Session not found")
         
-        state = self.sessions[session_id]
-        state.current_query = query
-        
-        # New system prompt: always return JSON with response, advance_clause, and previous_clause
-        system_prompt = '''
-You are an expert ISO 27001 internal auditor chatbot. For every user message, you must return a JSON object with three fields:
-- response: your answer to the user's question (string)
-- advance_clause: true if the user wants to move to the next clause, false otherwise (boolean)
-- previous_clause: true if the user wants to move to the previous clause, false otherwise (boolean)
+        if sess.get("state"):
+            state = AuditState.from_snapshot(sess["state"])
+            state.version = sess.get("state_version", 0)
+            await self._cache_state(state)
+        else:
+            # Sessions created before checkpointing: rebuild from responses
+            state = create_initial_state(session_id, sess.get("tenant_id"))
+            state.created_at = sess.get("created_at", state.created_at)
+            state.current_clause_index = sess.get("clause_index", 0)
+            responses = await db.responses.find(
+                {"session_id": session_id},
+                {"_id": 0, "clause_index": 1, "answer": 1}
+            ).sort("answered_at", 1).to_list(length=None)
+            state.user_answers = {r["clause_index"]: r["answer"] for r in responses}
+            if state.current_clause_index >= len(CLAUSE_METADATA):
+                state.status = AuditStatus.COMPLETED
+            state.version = sess.get("state_version", 0)
+            # Write-throughs update fields of the stored snapshot, so it must be complete
+            await self._cache_state(state)
+            await self.checkpoint(session_id)
+        
+        profiler.annotate(session_id=session_id, clause_index=state.current_clause_index)
+        tag_usage(session_id=session_id, clause_index=state.current_clause_index)
+        return state
 
-If the user message is a request to move to the next clause (e.g., "next", "skip", "move to next clause", "advance", etc.), set advance_clause to true.
-If the user message is a request to move to the previous clause (e.g., "previous", "back", "go back", "move to previous clause", etc.), set previous_clause to true.
-If neither, set both to false.
+    async def _cache_state(self, state: AuditState) -> None:
+        """Insert into the LRU cache, evicting the least recently used sessions over the cap"""
+        self.sessions[state.session_id] = state
+        self.sessions.move_to_end(state.session_id)
+        self._last_access[state.session_id] = time.monotonic()
+        while len(self.sessions) > settings.max_in_memory_sessions:
+            oldest = next(iter(self.sessions))
+            await self.evict(oldest)
 
-At the end of every response, always ask: "Would you like to record your answer for this clause or upload supporting documents?"
-If the user answers 'No' or expresses intent not to record or upload, respond with: "Are you facing any issues or challenges related to this clause? I can help clarify or provide guidance."
+    async def checkpoint(self, session_id: str) -> None:
+        """
+        Write the in-memory state for a session to its Mongo document. Skipped
+        (and the cached copy dropped) if another worker has changed the session
+        since this copy was loaded.
+        """
+        state = self.sessions.get(session_id)
+        if state is None:
+            return
+        idle_for = time.monotonic() - self._last_access.get(session_id, time.monotonic())
+        current = state.version if state.version else {"$in": [0, None]}
+        result = await db.sessions.update_one(
+            {"_id": session_id, "state_version": current},
+            {"$set": {
+                "state": state.to_snapshot(),
+                "clause_index": state.current_clause_index,
+                "status": state.status.value,
+                "last_active_at": datetime.utcnow() - timedelta(seconds=idle_for)
+            }}
+        )
+        if result.matched_count == 0:
+            self.forget(session_id)
 
-Always return a valid JSON object. Example:
-{"response": "Here is my answer... Would you like to record your answer for this clause or upload supporting documents?", "advance_clause": false, "previous_clause": false}
-'''
-        
-        user_prompt = f'''
-Current Clause: {state.current_clause['question'] if state.current_clause else ''}
-Description: {state.current_clause['description'] if state.current_clause else ''}
-Key Attributes: {', '.join(state.current_clause['attributes']) if state.current_clause else ''}
+    async def evict(self, session_id: str) -> None:
+        """Checkpoint a session and drop it from memory"""
+        await self.checkpoint(session_id)
+        self.forget(session_id)
 
-User Message: {query}
-'''
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+    def forget(self, session_id: str) -> None:
+        """Drop a session from memory without writing it; the next access reloads it"""
+        self.sessions.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+
+    # ─── Cross-worker consistency ─────────────────────────────────
+
+    async def _commit(self, state: AuditState, update: Dict[str, Any]) -> int:
+        """
+        Write a mutation through to the session document, bump its version
+        and mark it active, so workers that load the session later see it and
+        the archive job does not treat it as abandoned. Returns the
+        new version; if it skipped one, another worker changed the session
+        in between and this worker's copy is dropped after the request.
+        """
+        touched = {**update.get("$set", {}), "last_active_at": datetime.utcnow()}
+        doc = await db.sessions.find_one_and_update(
+            {"_id": state.session_id},
+            {**update, "$set": touched, "$inc": {"state_version": 1}},
+            projection={"state_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        version = doc["state_version"] if doc else state.version + 1
+        if version != state.version + 1:
+            self.forget(state.session_id)
+        state.version = version
+        return version
+
+    def apply_change(self, message: Dict[str, Any]) -> None:
+        """
+        Bring this worker's cached state in line with a mutation published by
+        another worker: apply its patch when it is the next version, drop the
+        cached copy when versions were skipped.
+        """
+        if message.get("event") == RESYNC:
+            for session_id in list(self.sessions):
+                self.forget(session_id)
+            return
+        state = self.sessions.get(message["session_id"])
+        version = message.get("version")
+        if state is None or version is None or version <= state.version:
+            return
+        patch = message.get("patch")
+        if version != state.version + 1 or patch is None:
+            self.forget(state.session_id)
+            return
+        for index, answer in (patch.get("user_answers") or {}).items():
+            state.user_answers[int(index)] = answer
+        if "current_clause_index" in patch:
+            state.current_clause_index = patch["current_clause_index"]
+        if "status" in patch:
+            state.status = AuditStatus(patch["status"])
+        document_key = patch.get("uploaded_document")
+        if document_key and document_key not in state.uploaded_documents:
+            state.uploaded_documents.append(document_key)
+        state.version = version
+
+    async def evict_idle(self, idle_timeout: Optional[float] = None) -> int:
+        """Evict every session idle for longer than ``idle_timeout`` seconds"""
+        if idle_timeout is None:
+            idle_timeout = settings.session_idle_timeout_seconds
+        cutoff = time.monotonic() - idle_timeout
+        idle = [sid for sid, seen in self._last_access.items() if seen < cutoff]
+        for session_id in idle:
+            await self.evict(session_id)
+        return len(idle)
+    
+    async def process_query(
+        self,
+        session_id: str,
+        query: str,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Process a user query; ``on_token`` receives the reply text as it streams"""
+        state = await self._get_state(session_id)
+        
+        # Navigation commands are handled locally, without an LLM round-trip
+        intent = classify(query)
+        if intent.is_navigation:
+            return await self._navigate(session_id, query, intent.intent)
+        
+        prompt = prompt_registry.get(AGENT_QUERY)
+        messages = prompt.messages(
+            clause=prompt_registry.clause_block(state.current_clause_index),
+            query=query
+        )
         
-        import json
+        route = model_router.decide(AGENT_QUERY, query)
         try:
-            llm_response = await self.llm.ainvoke(messages)
-            # Try to parse the LLM output as JSON
-            try:
-                result = json.loads(llm_response.content)
-                response_text = result.get('response', llm_response.content)
-                advance_clause = result.get('advance_clause', False)
-                previous_clause = result.get('previous_clause', False)
-            except Exception:
-                response_text = llm_response.content
+            # Validate against the reply schema, with one bounded repair retry
+            stream = JsonFieldStream("response", on_token).feed if on_token else None
+            llm = model_router.llm_for(route, self.llm)
+            reply, raw = await invoke_structured(llm, prompt, messages, AgentReply, max_repairs=1, on_token=stream)
+            model_router.shadow(
+                route,
+                lambda: llm_gateway.chat(model_router.fast_llm, prompt, messages, enforce_quota=False),
+                raw
+            )
+            if reply is not None:
+                response_text = reply.response
+                advance_clause = reply.advance_clause
+                previous_clause = reply.previous_clause
+                guidance_fallback.remember(state.current_clause_index, query, response_text)
+            else:
+                response_text = raw
                 advance_clause = False
                 previous_clause = False
+            degraded = False
+        except TenantQuotaExceeded:
+            raise
         except Exception as e:
-            response_text = f"I apologize, but I encountered an error while processing your query. Please try again. Error: {str(e)}"
+            # Provider errors stay in the log; the user gets cached or precomputed guidance
+            logger.warning(f"Agent query for {session_id} fell back to clause guidance: {e}")
+            response_text = guidance_fallback.reply(state.current_clause_index, query)
             advance_clause = False
             previous_clause = False
+            degraded = True
         
-        # If LLM says to advance, call record_answer with skip
-        if advance_clause:
-            await self.record_answer(session_id, '__skip__')
-            # Update state after advancing
-            state = self.sessions[session_id]
+        # If LLM says to advance, skip the clause (keeping any answer it already has)
+        if advance_clause and state.current_clause_index < len(CLAUSE_METADATA):
+            await self._advance(session_id)
         # If LLM says to go to previous, set clause index to previous (if possible)
         elif previous_clause:
             if state.current_clause_index > 0:
                 await self.set_clause_index(session_id, state.current_clause_index - 1)
-                state = self.sessions[session_id]
 
-        state.agent_response = response_text
         state.updated_at = datetime.utcnow()
         
-        # Add to conversation history
-        state.conversation_history.append({
-            "role": "user",
-            "content": query,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        state.conversation_history.append({
-            "role": "assistant",
-            "content": response_text,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        # Add to conversation history (side collection, not held in memory)
+        await side_store.append_messages(session_id, [
+            make_message("user", query),
+            make_message("assistant", response_text)
+        ])
+        
+        return {
+            "response": response_text,
+            "advance_clause": advance_clause,
+            "previous_clause": previous_clause,
+            "current_clause": state.current_clause,
+            "status": state.status.value,
+            "degraded": degraded
+        }
+    
+    async def _navigate(self, session_id: str, query: str, intent: str) -> Dict[str, Any]:
+        """Move to the next/previous clause and reply from templates"""
+        state = await self._get_state(session_id)
+        advance_clause = previous_clause = False
+        
+        if intent == INTENT_NEXT:
+            if state.current_clause_index < len(CLAUSE_METADATA):
+                await self._advance(session_id)
+                advance_clause = True
+            if state.current_clause:
+                response_text = f"Moving on to the next clause.\n\n{_describe_clause(state.current_clause)}\n\n{FOLLOW_UP_QUESTION}"
+            else:
+                response_text = "That was the last clause - the audit is complete. You can now view the final report."
+        else:
+            if state.current_clause_index > 0:
+                await self.set_clause_index(session_id, min(state.current_clause_index, len(CLAUSE_METADATA)) - 1)
+                previous_clause = True
+                response_text = f"Going back to the previous clause.\n\n{_describe_clause(state.current_clause)}\n\n{FOLLOW_UP_QUESTION}"
+            else:
+                response_text = f"You are already on the first clause.\n\n{FOLLOW_UP_QUESTION}"
+        
+        state.updated_at = datetime.utcnow()
+        await side_store.append_messages(session_id, [
+            make_message("user", query),
+            make_message("assistant", response_text)
+        ])
         
         return {
             "response": response_text,
@@ -139,60 +400,181 @@ User Message: {query}
             "status": state.status.value
         }
     
+    async def _advance(self, session_id: str) -> None:
+        """
+        Move past the current clause. An unanswered clause is recorded as
+        skipped; one that already has an answer (e.g. carried forward) keeps
+        it and its score and grade, and only the position moves.
+        """
+        state = await self._get_state(session_id)
+        if state.current_clause_index not in state.user_answers:
+            await self.record_answer(session_id, analytics.SKIP_ANSWER)
+            return
+        if state.current_clause_index + 1 < len(CLAUSE_METADATA):
+            await self.set_clause_index(session_id, state.current_clause_index + 1)
+            return
+
+        # Past the last clause: complete the audit as record_answer would
+        state.current_clause_index = len(CLAUSE_METADATA)
+        state.status = AuditStatus.COMPLETED
+        version = await self._commit(state, {"$set": {
+            "clause_index": state.current_clause_index,
+            "status": state.status.value,
+            "state.current_clause_index": state.current_clause_index,
+            "state.status": state.status.value
+        }})
+        state.updated_at = datetime.utcnow()
+        await self.checkpoint(session_id)
+        await self.reports.invalidate(session_id)
+        self.reports.schedule(state)
+        self._publish_status(state, AUDIT_COMPLETED, version=version, patch={
+            "current_clause_index": state.current_clause_index,
+            "status": state.status.value
+        })
+
     async def record_answer(self, session_id: str, answer: str) -> Dict[str, Any]:
         """Record a user answer"""
-        if session_id not in self.sessions:
-            raise ValueError("Session not found")
-        
-        state = self.sessions[session_id]
+        state = await self._get_state(session_id)
         
         if state.current_clause_index >= len(CLAUSE_METADATA):
             raise ValueError("No more clauses to answer")
         
         # Record the answer
+        previous_answer = state.user_answers.get(state.current_clause_index)
         state.user_answers[state.current_clause_index] = answer
         
-        # Save to MongoDB
-        await db.responses.insert_one({
+        # A revision that leaves the previous (often carried-forward) answer
+        # essentially unchanged keeps its grade instead of being graded again
+        response = {
             "session_id": session_id,
+            "tenant_id": state.tenant_id or settings.default_tenant,
             "clause_index": state.current_clause_index,
             "clause": state.current_clause["question"],
             "answer": answer,
+            "score": score_answer(answer),
+            "scoring_version": SCORING_VERSION,
             "answered_at": datetime.utcnow()
-        })
+        }
+        kept_grade = None
+        if previous_answer is not None and analytics.SKIP_ANSWER not in (previous_answer, answer):
+            response["diff"] = answer_diff(previous_answer, answer)
+            if not response["diff"]["changed"]:
+                kept_grade = await previous_grade(session_id, state.current_clause_index)
+                if kept_grade:
+                    response["grade"] = kept_grade
+        
+        # Save to MongoDB
+        inserted = await db.responses.insert_one(response)
+        await analytics.record_answer(state.current_clause_index, answer, previous_answer)
+        if kept_grade:
+            session_events.publish(session_id, SCORE_UPDATED, {
+                "clause_index": state.current_clause_index,
+                "score": kept_grade["score"],
+                "verdict": kept_grade["verdict"]
+            })
+        else:
+            self.grader.submit(inserted.inserted_id, session_id, state.current_clause_index, answer)
+        if answer != analytics.SKIP_ANSWER:
+            search_service.index_text(KIND_ANSWER, inserted.inserted_id, session_id, state.current_clause_index, answer)
         
         # Advance to next clause
         state.current_clause_index += 1
         
         if state.current_clause_index >= len(CLAUSE_METADATA):
             state.status = AuditStatus.COMPLETED
-            state.current_clause = None
-        else:
-            state.current_clause = CLAUSE_METADATA[state.current_clause_index]
         
-        # Update MongoDB
-        await db.sessions.update_one(
-            {"_id": session_id},
-            {"$inc": {"clause_index": 1}}
-        )
+        # Write through to MongoDB so other workers and later loads see it
+        answered_index = state.current_clause_index - 1
+        patch = {
+            "user_answers": {str(answered_index): answer},
+            "current_clause_index": state.current_clause_index,
+            "status": state.status.value
+        }
+        version = await self._commit(state, {"$set": {
+            "clause_index": state.current_clause_index,
+            "status": state.status.value,
+            f"state.user_answers.{answered_index}": answer,
+            "state.current_clause_index": state.current_clause_index,
+            "state.status": state.status.value
+        }})
         
         state.updated_at = datetime.utcnow()
         
+        # Persist completion right away so the archive job sees it, and
+        # (re)build the report off the request path
+        if state.status == AuditStatus.COMPLETED:
+            await self.checkpoint(session_id)
+            await self.reports.invalidate(session_id)
+            self.reports.schedule(state)
+        
+        session_events.publish(session_id, ANSWER_RECORDED, {
+            "clause_index": answered_index,
+            "answer": answer,
+            "skipped": answer == analytics.SKIP_ANSWER
+        }, version=version, patch=patch)
+        self._publish_status(state, AUDIT_COMPLETED if state.status == AuditStatus.COMPLETED else CLAUSE_CHANGED)
+        
         return {
             "success": True,
             "next_clause": state.current_clause,
             "status": state.status.value
         }
     
+    async def carry_forward(self, session_id: str, from_session_id: str) -> Dict[str, Any]:
+        """
+        Seed a session with another session's answers (e.g. last year's audit
+        of the same unit) for every clause it has not answered yet. Scores and
+        grades come along, so only answers the user later changes are graded.
+        """
+        state = await self._get_state(session_id)
+        source = await db.sessions.find_one({"_id": from_session_id}, {"tenant_id": 1}) or await find_archived_session(from_session_id)
+        if not source or tenant_of(source) != current_tenant() or from_session_id == session_id:
+            raise ValueError("Session not found")
+
+        rows = (await carried_answers([from_session_id])).get(from_session_id, {})
+        rows = {idx: row for idx, row in rows.items() if idx not in state.user_answers and idx < len(CLAUSE_METADATA)}
+        if not rows:
+            return {"carried": 0, "clauses": []}
+
+        now = datetime.utcnow()
+        tenant_id = state.tenant_id or settings.default_tenant
+        responses = [carried_response(session_id, tenant_id, row, now) for row in rows.values()]
+        await db.responses.insert_many(responses, ordered=False)
+        await analytics.record_answers((doc["clause_index"], doc["answer"]) for doc in responses)
+        search_service.index_many(KIND_ANSWER, [
+            {"ref": doc["_id"], "session_id": session_id, "clause_index": doc["clause_index"]} for doc in responses
+        ], [doc["answer"] for doc in responses])
+
+        answers = {idx: row["answer"] for idx, row in rows.items()}
+        state.user_answers.update(answers)
+        state.updated_at = now
+        patch = {"user_answers": {str(idx): answer for idx, answer in answers.items()}}
+        version = await self._commit(state, {"$set": {
+            "carried_from": from_session_id,
+            **{f"state.user_answers.{idx}": answer for idx, answer in answers.items()}
+        }})
+        await self._invalidate_report(state)
+        # One event per clause for the UI; only the last carries the version for other workers
+        clauses = sorted(answers)
+        for idx in clauses:
+            last = idx == clauses[-1]
+            session_events.publish(session_id, ANSWER_RECORDED, {
+                "clause_index": idx,
+                "answer": answers[idx],
+                "skipped": False,
+                "carried": True
+            }, version=version if last else None, patch=patch if last else None)
+        return {"carried": len(clauses), "clauses": clauses}
+
     async def get_audit_status(self, session_id: str) -> Dict[str, Any]:
         """Get audit status"""
-        if session_id not in self.sessions:
-            raise ValueError("Session not found")
-        
-        state = self.sessions[session_id]
-        
+        state = await self._get_state(session_id)
+        return self._status(state)
+
+    @staticmethod
+    def _status(state: AuditState) -> Dict[str, Any]:
         return {
-            "session_id": session_id,
+            "session_id": state.session_id,
             "status": state.status.value,
             "current_clause": state.current_clause,
             "current_clause_index": state.current_clause_index,
@@ -201,72 +583,69 @@ User Message: {query}
             "recommendations": state.recommendations,
             "uploaded_documents": state.uploaded_documents
         }
+
+    async def _invalidate_report(self, state: AuditState) -> None:
+        """Drop a completed session's cached report after a change, so the next request rebuilds it"""
+        if state.status == AuditStatus.COMPLETED:
+            await self.reports.invalidate(state.session_id)
+
+    def _publish_status(self, state: AuditState, event: str, **change) -> None:
+        """Push a status snapshot to the session's subscribers on every worker"""
+        session_events.publish(state.session_id, event, self._status(state), **change)
     
     async def upload_document(self, session_id: str, document_key: str) -> Dict[str, Any]:
         """Upload document for analysis"""
-        if session_id not in self.sessions:
-            raise ValueError("Session not found")
+        state = await self._get_state(session_id)
         
-        state = self.sessions[session_id]
+        if not owns_key(document_key, state.tenant_id):
+            raise ValueError("Document not found")
         
+        version = patch = None
         if document_key not in state.uploaded_documents:
             state.uploaded_documents.append(document_key)
-        
-        # Generate LLM-based document analysis
+            version = await self._commit(state, {"$addToSet": {"state.uploaded_documents": document_key}})
+            patch = {"uploaded_document": document_key}
+        
+        # Text was extracted when the upload completed; only the LLM call happens here
+        ingested = await ingestion_pipeline.document_text(document_key) or {}
+        
+        # Generate LLM-based document analysis, or queue it while the provider is down.
+        # Text already analyzed for this clause (last year's policy, re-uploaded) reuses that analysis.
+        analysis_status = ANALYSIS_DONE
+        fingerprint = text_fingerprint(ingested.get("text"))
+        prompt_version = prompt_registry.get(DOCUMENT_ANALYSIS).version
+        reused = None
         if state.current_clause:
-            system_prompt = """You are an expert ISO 27001 auditor analyzing uploaded documents for compliance. 
-            
-            First check if the document is related to ISO 27001. If it is not, politely tell the user that you can only analyze documents related to ISO 27001.
-            
-            If it is related to ISO 27001, then:
-            Provide a detailed, structured analysis of how well the document addresses the current clause requirements.
-            Be specific, professional, and actionable in your assessment."""
-            
-            user_prompt = f"""
-            **Current Clause Analysis Request**
-            
-            **Clause:** {state.current_clause['question']}
-            **Description:** {state.current_clause['description']}
-            **Key Requirements:** {', '.join(state.current_clause['attributes'])}
-            
-            **Document to Analyze:** {document_key}
-            
-            Please provide a comprehensive analysis covering:
-            
-            1. **Compliance Assessment:** Does this document adequately address the current clause requirements?
-            2. **Key Findings:** What specific evidence of compliance or non-compliance did you identify?
-            3. **Strengths:** What aspects of the document demonstrate good compliance practices?
-            4. **Gaps/Concerns:** What areas need improvement or are missing?
-            5. **Recommendations:** What specific actions should be taken to improve compliance?
-            6. **Confidence Level:** How confident are you in this assessment (High/Medium/Low)?
-            
-            Format your response in a clear, structured manner that an auditor would find useful.
-            
-            .
-            """
-            
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-            
+            reused = await reusable_analysis(state.current_clause_index, fingerprint, prompt_version)
+        if reused is not None:
+            analysis_summary = reused["analysis_summary"]
+        elif state.current_clause:
             try:
-                response = await self.llm.ainvoke(messages)
-                analysis_summary = response.content
+                analysis_summary = await self._analyze_document(state.current_clause_index, document_key, ingested)
+            except TenantQuotaExceeded:
+                raise
             except Exception as e:
-                analysis_summary = f"Document analysis completed. Note: LLM analysis encountered an error: {str(e)}"
+                logger.warning(f"Deferring analysis of {document_key} for {session_id}: {e}")
+                analysis_summary = DEFERRED_SUMMARY
+                analysis_status = ANALYSIS_DEFERRED
         else:
             analysis_summary = "Document uploaded successfully."
         
         analysis = {
             "document_key": document_key,
+            "sha256": ingested.get("sha256"),
+            "mime_type": ingested.get("mime_type"),
+            "page_count": ingested.get("page_count"),
             "compliance_found": True,
             "relevant_sections": ["Document analysis completed"],
             "confidence_score": 0.85,
-            "analysis_summary": analysis_summary
+            "analysis_summary": analysis_summary,
+            "analysis_status": analysis_status,
+            "text_fingerprint": fingerprint,
+            "prompt_version": prompt_version if state.current_clause else None,
+            "reused_from": str(reused["_id"]) if reused is not None else None
         }
         
-        state.document_analysis[state.current_clause_index] = [analysis]
         state.updated_at = datetime.utcnow()
 
         # Store document upload in MongoDB with clause and answer
@@ -276,17 +655,22 @@ User Message: {query}
             user_answer = state.user_answers[state.current_clause_index]
         elif state.user_answers.get(state.current_clause_index - 1) is not None and state.current_clause_index > 0:
             user_answer = state.user_answers[state.current_clause_index - 1]
-        doc_to_insert = {
-            "session_id": session_id,
+        document_id = await side_store.record_analysis(
+            session_id,
+            state.current_clause_index,
+            analysis,
+            clause=state.current_clause["question"] if state.current_clause else None,
+            answer=user_answer
+        )
+        await analytics.record_document(session_id, state.current_clause_index)
+        await self._invalidate_report(state)
+        if analysis_status == ANALYSIS_DONE:
+            search_service.index_text(KIND_DOCUMENT, document_id, session_id, state.current_clause_index, analysis_summary)
+        session_events.publish(session_id, DOCUMENT_ANALYZED, {
             "clause_index": state.current_clause_index,
-            "clause": state.current_clause["question"] if state.current_clause else None,
-            "document_key": document_key,
-            "analysis_summary": analysis_summary,
-            "answer": user_answer,
-            "uploaded_at": datetime.utcnow()
-        }
-        print(f"[DEBUG] Inserting document into db.documents: {doc_to_insert}")
-        await db.documents.insert_one(doc_to_insert)
+            "analysis": analysis,
+            "uploaded_documents": state.uploaded_documents
+        }, version=version, patch=patch)
         
         return {
             "success": True,
@@ -294,55 +678,206 @@ User Message: {query}
             "status": state.status.value
         }
     
+    async def map_document(self, session_id: str, document_key: str) -> Dict[str, Any]:
+        """
+        Link one upload to every clause it gives evidence for. The text is
+        extracted once and scored against the whole catalog by the evidence
+        mapper; only the best-matching clauses get an LLM analysis, of their
+        matching excerpt rather than the whole document, run concurrently.
+        """
+        state = await self._get_state(session_id)
+        
+        if not owns_key(document_key, state.tenant_id):
+            raise ValueError("Document not found")
+        
+        version = patch = None
+        if document_key not in state.uploaded_documents:
+            state.uploaded_documents.append(document_key)
+            version = await self._commit(state, {"$addToSet": {"state.uploaded_documents": document_key}})
+            patch = {"uploaded_document": document_key}
+        
+        ingested = await ingestion_pipeline.document_text(document_key) or {}
+        matches = evidence_mapper.map(ingested.get("text"))
+        fingerprint = text_fingerprint(ingested.get("text"))
+        prompt_version = prompt_registry.get(DOCUMENT_ANALYSIS).version
+        slots = asyncio.Semaphore(settings.evidence_analysis_concurrency)
+        
+        async def analyze(match: ClauseMatch):
+            reused = await reusable_analysis(match.clause_index, fingerprint, prompt_version)
+            if reused is not None:
+                return reused["analysis_summary"], ANALYSIS_DONE, str(reused["_id"])
+            async with slots:
+                try:
+                    with usage_scope(clause_index=match.clause_index):
+                        summary = await self._analyze_document(
+                            match.clause_index, document_key, {**ingested, "text": match.excerpt}
+                        )
+                    return summary, ANALYSIS_DONE, None
+                except TenantQuotaExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Deferring analysis of {document_key} for clause {match.clause_index}: {e}")
+                    return DEFERRED_SUMMARY, ANALYSIS_DEFERRED, None
+        
+        results = await asyncio.gather(*(analyze(match) for match in matches))
+        
+        analyses = []
+        for match, (summary, status, reused_from) in zip(matches, results):
+            analysis = {
+                "document_key": document_key,
+                "clause_index": match.clause_index,
+                "match_score": match.score,
+                "sha256": ingested.get("sha256"),
+                "mime_type": ingested.get("mime_type"),
+                "page_count": ingested.get("page_count"),
+                "analysis_summary": summary,
+                "analysis_status": status,
+                "text_fingerprint": fingerprint,
+                "prompt_version": prompt_version,
+                "reused_from": reused_from
+            }
+            document_id = await side_store.record_analysis(
+                session_id,
+                match.clause_index,
+                analysis,
+                clause=CLAUSE_METADATA[match.clause_index]["question"],
+                answer=state.user_answers.get(match.clause_index)
+            )
+            await analytics.record_document(session_id, match.clause_index)
+            if status == ANALYSIS_DONE:
+                search_service.index_text(KIND_DOCUMENT, document_id, session_id, match.clause_index, summary)
+            # Only the first event carries the document link for other workers
+            session_events.publish(session_id, DOCUMENT_ANALYZED, {
+                "clause_index": match.clause_index,
+                "analysis": analysis,
+                "uploaded_documents": state.uploaded_documents
+            }, version=version if not analyses else None, patch=patch if not analyses else None)
+            analyses.append(analysis)
+        if not analyses and version is not None:
+            self._publish_status(state, CLAUSE_CHANGED, version=version, patch=patch)
+        if analyses or version is not None:
+            await self._invalidate_report(state)
+        
+        state.updated_at = datetime.utcnow()
+        return {
+            "success": True,
+            "matches": [
+                {"clause_index": m.clause_index, "clause": CLAUSE_METADATA[m.clause_index]["question"], "score": m.score}
+                for m in matches
+            ],
+            "document_analysis": analyses,
+            "status": state.status.value
+        }
+    
+    async def _analyze_document(
+        self,
+        clause_index: int,
+        document_key: str,
+        ingested: Dict[str, Any],
+        enforce_quota: bool = True
+    ) -> str:
+        prompt = prompt_registry.get(DOCUMENT_ANALYSIS)
+        messages = prompt.messages(
+            clause=prompt_registry.clause_block(clause_index),
+            document=document_key,
+            details=_document_details(ingested),
+            text=_document_excerpt(ingested)
+        )
+        return await llm_gateway.chat(self.llm, prompt, messages, enforce_quota=enforce_quota)
+
+    async def analyze_deferred(self, limit: int) -> int:
+        """
+        Run document analyses queued while the provider was unavailable,
+        oldest first, and push each result to the session's clients. Stops at
+        the first failure so a provider that is still down is not hammered.
+        """
+        done = 0
+        while done < limit:
+            now = datetime.utcnow()
+            doc = await db.documents.find_one_and_update(
+                {
+                    "analysis_status": ANALYSIS_DEFERRED,
+                    "$or": [
+                        {"claimed_at": None},
+                        {"claimed_at": {"$lt": now - timedelta(minutes=DEFERRED_CLAIM_MINUTES)}}
+                    ]
+                },
+                {"$set": {"claimed_at": now}},
+                sort=[("uploaded_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                break
+            session_id, clause_index = doc["session_id"], doc["clause_index"]
+            try:
+                with tenant_scope(doc.get("tenant_id")), usage_scope(
+                    endpoint="background:deferred_analysis", session_id=session_id, clause_index=clause_index
+                ):
+                    ingested = await ingestion_pipeline.document_text(doc["document_key"]) or {}
+                    summary = await self._analyze_document(clause_index, doc["document_key"], ingested, enforce_quota=False)
+            except Exception as e:
+                await db.documents.update_one({"_id": doc["_id"]}, {"$unset": {"claimed_at": ""}})
+                logger.info(f"Deferred document analysis still failing: {e}")
+                break
+            await db.documents.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "analysis_summary": summary,
+                        "analysis_status": ANALYSIS_DONE,
+                        "prompt_version": prompt_registry.get(DOCUMENT_ANALYSIS).version
+                    },
+                    "$unset": {"claimed_at": ""}
+                }
+            )
+            search_service.index_text(KIND_DOCUMENT, doc["_id"], session_id, clause_index, summary)
+            # The session is not loaded here; a report only exists once it is completed
+            await self.reports.invalidate(session_id)
+            session_events.publish(session_id, DOCUMENT_ANALYZED, {
+                "clause_index": clause_index,
+                "analysis": {
+                    "document_key": doc["document_key"],
+                    "analysis_summary": summary,
+                    "analysis_status": ANALYSIS_DONE
+                },
+                "deferred": True
+            })
+            done += 1
+        return done
+
     async def get_audit_report(self, session_id: str) -> Dict[str, Any]:
         """Get final audit report"""
-        if session_id not in self.sessions:
-            raise ValueError("Session not found")
-        
-        state = self.sessions[session_id]
+        state = await self._get_state(session_id)
         
         if state.status != AuditStatus.COMPLETED:
             raise ValueError("Audit not completed")
         
-        # Calculate compliance score
-        total_responses = len(state.user_answers)
-        positive_keywords = ["yes", "implemented", "compliant", "adequate", "sufficient"]
-        
-        positive_count = 0
-        for answer in state.user_answers.values():
-            answer_lower = answer.lower()
-            if any(keyword in answer_lower for keyword in positive_keywords):
-                positive_count += 1
-        
-        compliance_score = (positive_count / total_responses) * 100 if total_responses > 0 else 0
-        
-        # Generate recommendations
-        recommendations = []
-        if compliance_score < 70:
-            recommendations.append("Implement comprehensive ISMS framework")
-            recommendations.append("Conduct staff training on information security")
+        report = await self.reports.ensure(state)
         
         return {
             "session_id": session_id,
-            "compliance_score": compliance_score,
-            "recommendations": recommendations,
-            "user_answers": state.user_answers,
-            "final_report": f"Audit completed with {compliance_score}% compliance score.",
-            "generated_at": datetime.utcnow().isoformat()
+            "compliance_score": report["compliance_score"],
+            "recommendations": report["recommendations"],
+            "user_answers": {int(k): v for k, v in report["user_answers"].items()},
+            "final_report": report["narrative"],
+            "generated_at": report["generated_at"].isoformat(),
+            "artifacts": report.get("artifacts", {})
         }
 
+    async def get_conversation(self, session_id: str, limit: int = 200) -> list:
+        """Load conversation history from the side collection"""
+        await self._get_state(session_id)
+        return await side_store.load_history(session_id, limit=limit)
+
     async def set_clause_index(self, session_id: str, index: int) -> dict:
         """Set the current clause index for navigation (e.g., previous/next clause)"""
-        if session_id not in self.sessions:
-            raise ValueError("Session not found")
         if not (0 <= index < len(CLAUSE_METADATA)):
             raise ValueError("Invalid clause index")
-        state = self.sessions[session_id]
+        state = await self._get_state(session_id)
         state.current_clause_index = index
-        state.current_clause = CLAUSE_METADATA[index]
-        # Optionally update MongoDB as well
-        await db.sessions.update_one({"_id": session_id}, {"$set": {"clause_index": index}})
+        version = await self._commit(state, {"$set": {"clause_index": index, "state.current_clause_index": index}})
         state.updated_at = datetime.utcnow()
+        self._publish_status(state, CLAUSE_CHANGED, version=version, patch={"current_clause_index": index})
         return {"current_clause_index": state.current_clause_index}
 
 
@@ -1,7 +1,7 @@
 # app/agents/state.py
 
 from typing import Dict, Any, List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from enum import Enum
 
@@ -14,47 +14,86 @@ class AuditStatus(str, Enum):
 
 
 class AuditState(BaseModel):
-    """State for the ISO 27001 audit agent"""
-    
+    """Compact core state for the ISO 27001 audit agent.
+
+    Only the clause index is stored; ``current_clause`` is resolved from
+    ``CLAUSE_METADATA`` on access. Conversation history and document analyses
+    are kept in side collections (see ``app.agents.side_store``) and loaded
+    only when an endpoint asks for them.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     # Session management
     session_id: str
+    tenant_id: Optional[str] = None     # None for sessions created before tenancy (default tenant)
     status: AuditStatus = AuditStatus.INITIALIZED
     created_at: datetime
     updated_at: datetime
-    
+    version: int = 0                    # mirrors sessions.state_version; bumped by every write-through
+
     # Current audit progress
     current_clause_index: int = 0
     total_clauses: int = 0
-    
+
     # Audit data
-    current_clause: Optional[Dict[str, Any]] = None
-    user_answers: Dict[int, str] = {}
-    audit_findings: List[Dict[str, Any]] = []
-    
-    # Agent context
-    conversation_history: List[Dict[str, str]] = []
+    user_answers: Dict[int, str] = Field(default_factory=dict)
+    audit_findings: List[Dict[str, Any]] = Field(default_factory=list)
+
+    # Agent context (transient, for the LangGraph workflow)
     current_query: Optional[str] = None
     agent_response: Optional[str] = None
     pending_answer: Optional[str] = None
-    
+
     # Analysis results
     compliance_score: Optional[float] = None
     risk_assessment: Optional[Dict[str, Any]] = None
-    recommendations: List[str] = []
-    
-    # Document analysis
-    uploaded_documents: List[str] = []
-    document_analysis: Dict[str, Any] = {}
-    
-    class Config:
-        arbitrary_types_allowed = True
+    recommendations: List[str] = Field(default_factory=list)
+
+    # Document keys only; analyses live in db.documents
+    uploaded_documents: List[str] = Field(default_factory=list)
+
+    @property
+    def current_clause(self) -> Optional[Dict[str, Any]]:
+        """Clause metadata for the current index, or None once the audit is done"""
+        if 0 <= self.current_clause_index < len(CLAUSE_METADATA):
+            return CLAUSE_METADATA[self.current_clause_index]
+        return None
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Serialize to a BSON-friendly dict, omitting default values"""
+        data = self.model_dump(exclude_defaults=True, exclude={"version"})
+        data["status"] = self.status.value
+        if self.user_answers:
+            data["user_answers"] = {str(k): v for k, v in self.user_answers.items()}
+        return data
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "AuditState":
+        """Rebuild a state from a trusted snapshot without re-running validation"""
+        data = {k: v for k, v in dict(data).items() if k in cls.model_fields}
+        if data.get("user_answers"):
+            data["user_answers"] = {int(k): v for k, v in data["user_answers"].items()}
+        if "status" in data:
+            data["status"] = AuditStatus(data["status"])
+        return cls.model_construct(**data)
+
+    def to_json(self) -> bytes:
+        """Serialize to compact JSON bytes (pydantic-core fast path)"""
+        return self.model_dump_json(exclude_defaults=True).encode()
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "AuditState":
+        """Parse JSON bytes produced by ``to_json``"""
+        return cls.model_validate_json(raw)
 
 
-def create_initial_state(session_id: str) -> AuditState:
+def create_initial_state(session_id: str, tenant_id: Optional[str] = None) -> AuditState:
     """Create initial state for a new audit session"""
     now = datetime.utcnow()
     return AuditState(
         session_id=session_id,
+        tenant_id=tenant_id,
         created_at=now,
         updated_at=now,
         total_clauses=len(CLAUSE_METADATA)  # Will be imported from audit_engine
@@ -62,4 +101,4 @@ def create_initial_state(session_id: str) -> AuditState:
 
 
 # Import clause metadata
-from app.services.audit_engine import CLAUSE_METADATA 
\ No newline at end of file
+from app.services.audit_engine import CLAUSE_METADATA
@@ -0,0 +1,138 @@
+# app/agents/structured_output.py
+
+import json
+import logging
+import re
+from typing import Awaitable, Callable, List, Optional, Tuple, Type, TypeVar
+
+from langchain.schema import AIMessage, BaseMessage, HumanMessage
+from pydantic import BaseModel, ValidationError
+
+from app.services.llm_gateway import llm_gateway
+from app.services.prompts import PromptTemplate
+
+logger = logging.getLogger("uvicorn")
+
+T = TypeVar("T", bound=BaseModel)
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+class AgentReply(BaseModel):
+    """Schema for chat replies from the audit agent"""
+    response: str
+    advance_clause: bool = False
+    previous_clause: bool = False
+
+
+class JsonFieldStream:
+    """
+    Incrementally decodes one top-level string field out of a JSON reply that
+    is still being streamed, passing the decoded text to ``on_text`` as it
+    arrives. Used to stream ``AgentReply.response`` to the chat UI without
+    showing the surrounding JSON.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str, on_text: Callable[[str], Awaitable[None]]):
+        self._start = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._on_text = on_text
+        self._buffer = ""
+        self._in_value = False
+        self._done = False
+
+    async def feed(self, chunk: str) -> None:
+        if self._done:
+            return
+        self._buffer += chunk
+        if not self._in_value:
+            match = self._start.search(self._buffer)
+            if not match:
+                return
+            self._in_value = True
+            self._buffer = self._buffer[match.end():]
+        text = self._decode()
+        if text:
+            await self._on_text(text)
+
+    def _decode(self) -> str:
+        out = []
+        buf, i = self._buffer, 0
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done = True
+                i = len(buf)
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(buf):
+                break
+            if buf[i + 1] != "u":
+                out.append(self._ESCAPES.get(buf[i + 1], buf[i + 1]))
+                i += 2
+                continue
+            # \uXXXX, possibly the first half of a surrogate pair
+            code = buf[i + 2:i + 6].lower()
+            width = 12 if len(code) == 4 and "d800" <= code <= "dbff" else 6
+            if i + width > len(buf):
+                break
+            try:
+                out.append(json.loads('"%s"' % buf[i:i + width]))
+            except ValueError:
+                pass
+            i += width
+        self._buffer = buf[i:]
+        return "".join(out)
+
+
+def parse_structured(raw: str, schema: Type[T]) -> T:
+    """Validate an LLM reply against ``schema``, tolerating code fences and surrounding prose"""
+    text = _FENCE_RE.sub("", raw.strip())
+    if not text.startswith("{"):
+        start, end = text.find("{"), text.rfind("}")
+        if start != -1 and end > start:
+            text = text[start:end + 1]
+    return schema.model_validate_json(text)
+
+
+def _repair_prompt(schema: Type[BaseModel], error: Exception) -> str:
+    return (
+        f"Your previous reply did not match the required JSON schema ({error.__class__.__name__}: {error}). "
+        f"Reply again with only a JSON object that validates against this schema:\n"
+        f"{json.dumps(schema.model_json_schema())}"
+    )
+
+
+async def invoke_structured(
+    llm,
+    prompt: PromptTemplate,
+    messages: List[BaseMessage],
+    schema: Type[T],
+    max_repairs: int = 1,
+    on_token: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Tuple[Optional[T], str]:
+    """
+    Call the LLM through the gateway and validate its reply against ``schema``.
+    On failure, ask for a corrected reply at most ``max_repairs`` times.
+    Returns the parsed model (or None if it never validated) and the last raw
+    reply. With ``on_token`` the first reply is streamed through it; repairs
+    are not.
+    """
+    if on_token is not None:
+        raw = await llm_gateway.stream(llm, prompt, messages, on_token)
+    else:
+        raw = await llm_gateway.chat(llm, prompt, messages)
+    for attempt in range(max_repairs + 1):
+        try:
+            return parse_structured(raw, schema), raw
+        except (ValidationError, ValueError) as e:
+            if attempt == max_repairs:
+                logger.info(f"Structured output still invalid after {max_repairs} repair(s): {e}")
+                return None, raw
+            messages = messages + [AIMessage(content=raw), HumanMessage(content=_repair_prompt(schema, e))]
+            raw = await llm_gateway.chat(llm, prompt, messages)
+    return None, raw
@@ -8,6 +8,7 @@ from datetime import datetime
 
 from app.services.mongo_client import db
 from app.services.audit_engine import CLAUSE_METADATA
+from app.services import scoring
 
 
 class GetCurrentClauseInput(BaseModel):
@@ -135,22 +136,16 @@ class CalculateComplianceScoreTool(BaseTool):
     
     async def _arun(self, session_id: str) -> Dict[str, Any]:
         """Calculate compliance score"""
-        responses = await db.responses.find({"session_id": session_id}).to_list(length=100)
+        responses = await db.responses.find({"session_id": session_id}).sort("answered_at", 1).to_list(length=100)
         
         if not responses:
             return {"error": "No responses found for session"}
         
-        # Simple scoring logic - can be enhanced
-        total_responses = len(responses)
-        positive_keywords = ["yes", "implemented", "compliant", "adequate", "sufficient"]
-        
-        positive_count = 0
-        for response in responses:
-            answer_lower = response["answer"].lower()
-            if any(keyword in answer_lower for keyword in positive_keywords):
-                positive_count += 1
-        
-        compliance_score = (positive_count / total_responses) * 100 if total_responses > 0 else 0
+        # Latest answer per clause, scored with negation handling and clause weights
+        latest = {r["clause_index"]: r["answer"] for r in responses}
+        total_responses = len(latest)
+        compliance_score, clause_scores = scoring.score_answers(latest)
+        positive_count = sum(1 for s in clause_scores.values() if s >= 0.5)
         
         return {
             "compliance_score": compliance_score,
@@ -177,7 +172,7 @@ class GenerateRecommendationsTool(BaseTool):
     
     async def _arun(self, session_id: str, compliance_score: float) -> Dict[str, Any]:
         """Generate recommendations"""
-        responses = await db.responses.find({"session_id": session_id}).to_list(length=100)
+        responses = await db.responses.find({"session_id": session_id}).sort("answered_at", 1).to_list(length=100)
         
         recommendations = []
         
@@ -192,11 +187,8 @@ class GenerateRecommendationsTool(BaseTool):
             recommendations.append("Develop incident response procedures")
         
         # Analyze specific responses for targeted recommendations
-        for response in responses:
-            answer_lower = response["answer"].lower()
-            if "no" in answer_lower or "not implemented" in answer_lower:
-                clause = response["clause"]
-                recommendations.append(f"Address gaps in {clause}")
+        for clause in scoring.gap_clauses(responses):
+            recommendations.append(f"Address gaps in {clause}")
         
         return {
             "recommendations": recommendations,
@@ -1,4 +1,6 @@
 # app/config.py
+from typing import Any, Dict, List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,6 +9,161 @@ class Settings(BaseSettings):
     aws_region: str = "ap-east-1"
     openai_api_key: str = ""
 
+    # Session lifecycle
+    session_idle_timeout_seconds: int = 1800
+    session_sweep_interval_seconds: int = 60
+    max_in_memory_sessions: int = 10000
+    completed_archive_after_days: int = 7
+    abandoned_archive_after_days: int = 30
+    archive_ttl_days: int = 0            # 0 keeps archived sessions (and their rows) forever
+
+    # Evidence object storage: "s3" (AWS, or any S3-compatible store via
+    # s3_endpoint_url) or "local" (files under storage_dir, no network)
+    storage_backend: str = "s3"
+    storage_dir: str = "data/objects"
+    s3_endpoint_url: str = ""            # e.g. http://minio:9000; empty uses AWS in aws_region
+    s3_addressing_style: str = "path"
+
+    # Presigned S3 URLs and browser multipart uploads
+    presign_put_expiry_seconds: int = 3600
+    presign_get_expiry_seconds: int = 300
+    multipart_part_size_mb: int = 16     # S3 minimum is 5 MiB for all but the last part
+    multipart_threshold_mb: int = 32     # the UI switches to multipart above this size
+
+    # Evidence downloads through the API (/upload/download)
+    download_chunk_kb: int = 256
+    download_cache_dir: str = "data/cache"
+    download_cache_mb: int = 512         # bounded LRU disk cache for remote backends; 0 disables it
+    download_cache_max_object_mb: int = 64
+    download_cache_min_hits: int = 2     # requests before an object is copied into the cache
+    download_max_age_seconds: int = 3600
+
+    # Ingestion of completed uploads (hash, type sniffing, text extraction)
+    ingestion_workers: int = 2
+    ingestion_max_mb: int = 50           # larger files are hashed but not parsed
+    ingestion_max_text_chars: int = 2_000_000
+    ingestion_wait_seconds: float = 10.0 # how long document analysis waits for a queued ingestion
+    document_prompt_chars: int = 12000   # extracted text sent with a document analysis
+
+    # Per-session WebSocket channel (/agent/{id}/ws)
+    ws_event_queue_size: int = 100      # pending events per client before the oldest is dropped
+
+    # Session change bus between uvicorn workers: "local" (single worker) or
+    # "mongo" (change streams; needs a replica set)
+    event_bus: str = "local"
+    event_bus_collection: str = "session_changes"
+    event_bus_ttl_seconds: int = 3600
+
+    # Simulated LLM for load tests and traffic replay (no OpenAI calls)
+    fake_llm: bool = False
+    fake_llm_latency_ms: float = 400.0   # time to first token
+    fake_llm_ms_per_token: float = 5.0
+    fake_llm_reply_words: int = 80
+
+    # API request log for scripts/replay_traffic.py; empty disables recording.
+    # Logged bodies contain audit answers, so treat the file as customer data.
+    request_log_path: str = ""
+    request_log_max_body_kb: int = 64
+
+    # Request profiling, off unless a sample rate or token is set. Requests
+    # sending X-Profile: <profile_token> are always profiled and saved;
+    # sampled ones are saved when slower than profile_slow_ms.
+    profile_sample_rate: float = 0.0     # e.g. 0.01 profiles 1% of requests
+    profile_token: str = ""
+    profile_slow_ms: float = 5000.0
+    profile_interval_ms: float = 10.0
+    profile_dir: str = "data/profiles"
+
+    # LLM usage ledger (db.llm_usage), written in batches off the request path
+    usage_batch_size: int = 200
+    usage_flush_seconds: float = 2.0
+    usage_queue_size: int = 10000        # records waiting for Mongo before new ones are dropped
+    usage_retention_days: int = 0        # 0 keeps records forever
+    # USD per 1K tokens by model name prefix; "cached" defaults to half of "prompt"
+    llm_prices: Dict[str, Dict[str, float]] = {
+        "gpt-4-turbo": {"prompt": 0.01, "completion": 0.03},
+        "gpt-4o-mini": {"prompt": 0.00015, "completion": 0.0006},
+        "gpt-4o": {"prompt": 0.0025, "completion": 0.01},
+        "gpt-4": {"prompt": 0.03, "completion": 0.06},
+        "gpt-3.5-turbo": {"prompt": 0.0005, "completion": 0.0015},
+    }
+
+    # Audit campaigns (bulk session creation)
+    campaign_batch_size: int = 500       # sessions / carried responses per insert_many
+    campaign_max_units: int = 5000
+    campaign_poll_seconds: float = 30.0  # how often scheduled campaigns are checked
+    campaign_warmup: bool = True         # ask each clause's standard question once after launch
+    # A revised answer at least this similar (word diff) to the one it replaces keeps its grade
+    carry_forward_unchanged_ratio: float = 0.97
+
+    # Session export/import archives
+    transfer_batch_size: int = 1000      # NDJSON rows per insert_many on import
+
+    # Report artifacts: "local" (report_dir) or "s3" (s3_bucket, same endpoint as evidence)
+    report_storage: str = "local"
+    report_dir: str = "data"
+
+    # Local vector index for /search/similar
+    search_index_dir: str = "data/search"
+    search_embedding_dim: int = 256
+
+    # Evidence-to-clause mapping: one upload scored against every clause
+    evidence_chunk_words: int = 120
+    evidence_max_chunks: int = 2000
+    evidence_min_similarity: float = 0.12
+    evidence_max_clauses: int = 8        # clauses that get a focused LLM analysis
+    evidence_excerpt_chunks: int = 3     # best chunks sent to the LLM per clause
+    evidence_analysis_concurrency: int = 4
+
+    # Asynchronous LLM grading of recorded answers
+    grading_model: str = "gpt-4-turbo"
+    grading_batch_size: int = 8
+    grading_batch_window_ms: int = 500
+    grading_cache_size: int = 10000
+    grading_wait_seconds: float = 20.0   # how long a background report build waits for in-flight grades
+    # Answers whose grading call failed are retried by the deferred-analysis worker with backoff
+    grading_retry_seconds: float = 60.0
+    grading_retry_max_seconds: float = 3600.0
+    grading_max_attempts: int = 8
+
+    # LLM provider deadlines and circuit breaker (opens when at least
+    # breaker_failure_ratio of the calls in the window failed or were slow)
+    llm_timeout_seconds: float = 60.0
+    llm_timeouts: Dict[str, float] = {"agent_query": 20.0, "node_query": 20.0, "engine_query": 20.0, "document_analysis": 45.0}
+    llm_executor_threads: int = 16       # threads for blocking OpenAI client calls
+    breaker_window_seconds: float = 60.0
+    breaker_min_calls: int = 10
+    breaker_failure_ratio: float = 0.5
+    breaker_slow_ms: float = 15000.0     # slower calls count as failures
+    breaker_open_seconds: float = 30.0
+    # Degraded mode: cached replies and clause guidance, document analyses queued for later
+    fallback_cache_size: int = 5000
+    deferred_analysis_interval_seconds: float = 30.0
+    deferred_analysis_batch: int = 20
+
+    # Model routing of interactive turns: "on" sends simple turns to the fast
+    # model, "shadow" keeps the strong model but compares a sample of would-be
+    # fast turns against the fast model (GET /analytics/router, extra fast-model
+    # calls, opt-in), "off" disables it
+    router_mode: str = "off"
+    router_fast_model: str = "gpt-4o-mini"
+    router_fast_max_tokens: int = 400
+    router_simple_max_words: int = 6     # shorter turns without audit terms go fast
+    router_answer_max_words: int = 20    # longer turns always stay on the strong model
+    router_shadow_rate: float = 0.1
+    # Per prompt: "auto" (classify the turn), "fast" or "strong"; unlisted prompts use "strong"
+    router_policies: Dict[str, str] = {"agent_query": "auto", "node_query": "auto", "engine_query": "auto"}
+
+    # Multi-tenancy: X-Tenant-ID header, fair scheduling of LLM calls
+    default_tenant: str = "default"
+    tenants: List[str] = []              # JSON; requests naming any other tenant get 403
+    tenant_api_keys: Dict[str, str] = {}   # JSON; tenants listed here must send X-Tenant-Key
+    tenant_idle_seconds: float = 600.0   # scheduler forgets a tenant's counters after this long unused
+    llm_max_concurrency: int = 16
+    tenant_max_concurrency: int = 4
+    tenant_tokens_per_minute: int = 0    # 0 disables the token quota
+    tenant_limits: Dict[str, Dict[str, Any]] = {}   # JSON, e.g. {"acme": {"weight": 2, "max_concurrency": 8, "tokens_per_minute": 200000}}
+
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore",      # drop any env vars not declared above
@@ -1,14 +1,34 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from app.config import settings
 import logging
 from app.services.mongo_client import db
 from fastapi import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from app.routes.upload import router as upload_router
 from app.routes.audit import router as audit_router
 from app.routes.agent import router as agent_router
+from app.routes.analytics import router as analytics_router
+from app.routes.search import router as search_router
+from app.routes.tenants import router as tenants_router
+from app.routes.transfer import router as transfer_router
+from app.routes.campaigns import router as campaigns_router
+from app.services.search import search_service
+from app.services.circuit_breaker import llm_breaker
+from app.services.deferred_analysis import DeferredAnalysisWorker
+from app.services.grading import answer_grader
+from app.services.guidance_fallback import guidance_fallback
+from app.services.ingestion import ingestion_pipeline
+from app.services.profiler import RequestProfiler
+from app.services.prompts import prompt_registry
+from app.services.request_log import RequestRecorder
+from app.services.session_events import session_events
+from app.services.tenancy import TENANT_HEADER, TENANT_KEY_HEADER, TenantRejected, authorize_tenant, bind_tenant, reset_tenant
+from app.services.usage_ledger import usage_ledger, usage_scope
+from app.agents.simple_graph import simple_audit_graph
+from app.agents.campaigns import campaign_service
+from app.services.session_lifecycle import SessionSweeper, ensure_session_indexes
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -34,9 +54,87 @@ app.add_middleware(
     allow_headers=["*"],          # allow all headers (e.g. Content-Type, Authorization)
 )
 
+
+@app.middleware("http")
+async def bind_request_tenant(request: Request, call_next):
+    """Scope the request to the tenant named in X-Tenant-ID (default tenant if absent)"""
+    tenant_id = request.headers.get(TENANT_HEADER)
+    try:
+        authorize_tenant(tenant_id, request.headers.get(TENANT_KEY_HEADER))
+        token = bind_tenant(tenant_id)
+    except TenantRejected as e:
+        return JSONResponse(status_code=403, content={"detail": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    try:
+        with usage_scope(request=request.scope):
+            return await call_next(request)
+    finally:
+        reset_tenant(token)
+
+
+# Added last so they wrap the whole stack (Starlette runs the last added middleware first)
+if settings.request_log_path:
+    app.add_middleware(
+        RequestRecorder,
+        path=settings.request_log_path,
+        max_body=settings.request_log_max_body_kb * 1024
+    )
+
+if settings.profile_sample_rate > 0 or settings.profile_token:
+    app.add_middleware(
+        RequestProfiler,
+        sample_rate=settings.profile_sample_rate,
+        token=settings.profile_token,
+        slow_ms=settings.profile_slow_ms,
+        interval_ms=settings.profile_interval_ms,
+        directory=settings.profile_dir
+    )
+
+
 app.include_router(upload_router, prefix="/upload", tags=["upload"])
 app.include_router(audit_router)
 app.include_router(agent_router)
+app.include_router(analytics_router)
+app.include_router(search_router)
+app.include_router(tenants_router)
+app.include_router(transfer_router)
+app.include_router(campaigns_router)
+
+session_sweeper = SessionSweeper(simple_audit_graph)
+deferred_analysis = DeferredAnalysisWorker(simple_audit_graph)
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    versions = prompt_registry.compile()
+    logging.getLogger("uvicorn").info(f"Compiled prompt templates: {versions}")
+    try:
+        await ensure_session_indexes()
+    except Exception as e:
+        logging.getLogger("uvicorn").warning(f"Could not ensure session indexes: {e}")
+    try:
+        await search_service.startup()
+    except Exception as e:
+        logging.getLogger("uvicorn").warning(f"Search index startup failed: {e}")
+    await session_events.start()
+    session_sweeper.start()
+    answer_grader.start()
+    ingestion_pipeline.start()
+    usage_ledger.start()
+    deferred_analysis.start()
+    campaign_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await session_sweeper.stop()
+    await answer_grader.stop()
+    await ingestion_pipeline.stop()
+    await session_events.stop()
+    await usage_ledger.stop()
+    await deferred_analysis.stop()
+    await campaign_service.stop()
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -57,6 +155,11 @@ async def db_health_check():
         return {"status": "MongoDB connected"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB connection failed: {e}")
+
+@app.get("/health/llm")
+async def llm_health_check():
+    """Circuit state of the LLM provider and how often fallback replies were served"""
+    return {"circuit": llm_breaker.stats(), "fallback": guidance_fallback.stats()}
     
 logging.getLogger("uvicorn").info(f"🐘 AWS_REGION = {settings.aws_region!r}")
 
@@ -23,6 +23,7 @@ class QueryRequest(BaseModel):
 
 class QueryResponse(BaseModel):
     response: str
+    degraded: bool = False   # answered from fallback guidance while the LLM is unavailable
 
 
 # New models for agentic functionality
@@ -37,16 +38,36 @@ class AuditStatusResponse(BaseModel):
     uploaded_documents: List[str] = []
 
 
+class SetClauseRequest(BaseModel):
+    index: int
+
+
 class DocumentUploadRequest(BaseModel):
     document_key: str
 
 
+class CarryForwardRequest(BaseModel):
+    from_session_id: str
+
+
+class CarryForwardResponse(BaseModel):
+    carried: int
+    clauses: List[int] = []
+
+
 class DocumentUploadResponse(BaseModel):
     success: bool
     document_analysis: List[Dict[str, Any]] = []
     status: str
 
 
+class DocumentMapResponse(BaseModel):
+    success: bool
+    matches: List[Dict[str, Any]] = []            # clause_index, clause, score, best match first
+    document_analysis: List[Dict[str, Any]] = []  # one per matched clause
+    status: str
+
+
 class AuditReportResponse(BaseModel):
     session_id: str
     compliance_score: float
@@ -54,6 +75,7 @@ class AuditReportResponse(BaseModel):
     user_answers: Dict[int, str]
     final_report: Optional[str] = None
     generated_at: Optional[str] = None
+    artifacts: Dict[str, Dict[str, Any]] = {}
 
 
 class ConversationMessage(BaseModel):
@@ -1,20 +1,29 @@
 # app/routes/agent.py
 
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Header, Query, Response, WebSocket
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 
 from app.models.audit import (
     StartAuditResponse,
     QueryRequest,
     QueryResponse,
     AnswerRequest,
+    CarryForwardRequest,
+    CarryForwardResponse,
     AuditStatusResponse,
     DocumentUploadRequest,
     DocumentUploadResponse,
+    DocumentMapResponse,
     AuditReportResponse,
     ConversationHistoryResponse
 )
+from app.agents.session_channel import SessionChannel
 from app.agents.simple_graph import simple_audit_graph
+from app.services.report_pipeline import CONTENT_TYPES, compute_etag, etag_matches
+from app.services.tenancy import TENANT_HEADER, TENANT_KEY_HEADER, TenantRejected, authorize_tenant, bind_tenant, reset_tenant
+from app.services.tenant_scheduler import TenantQuotaExceeded
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -34,9 +43,11 @@ async def agent_query(session_id: str, req: QueryRequest):
     """Process a query through the agentic audit system"""
     try:
         result = await simple_audit_graph.process_query(session_id, req.query)
-        return QueryResponse(response=result["response"])
+        return QueryResponse(response=result["response"], degraded=result["degraded"])
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except TenantQuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process query: {str(e)}")
 
@@ -77,16 +88,70 @@ async def upload_document_to_agent(session_id: str, req: DocumentUploadRequest):
         return DocumentUploadResponse(**result)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except TenantQuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload document: {str(e)}")
 
 
+@router.post("/{session_id}/map-document", response_model=DocumentMapResponse)
+async def map_document_to_clauses(session_id: str, req: DocumentUploadRequest):
+    """Analyze an uploaded document against every clause it matches, not just the current one"""
+    try:
+        result = await simple_audit_graph.map_document(session_id, req.document_key)
+        return DocumentMapResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TenantQuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to map document: {str(e)}")
+
+
+@router.post("/{session_id}/carry-forward", response_model=CarryForwardResponse)
+async def carry_forward_answers(session_id: str, req: CarryForwardRequest):
+    """Seed unanswered clauses with another session's answers, scores and grades"""
+    try:
+        result = await simple_audit_graph.carry_forward(session_id, req.from_session_id)
+        return CarryForwardResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to carry answers forward: {str(e)}")
+
+
 @router.get("/{session_id}/report", response_model=AuditReportResponse)
-async def get_agent_report(session_id: str):
-    """Get the final audit report from the agentic system"""
+async def get_agent_report(
+    session_id: str,
+    format: str = Query("json", pattern="^(json|html|pdf)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get the final audit report from the agentic system.
+    `format=html|pdf` downloads the cached rendered artifact; all formats
+    honour If-None-Match.
+    """
     try:
         report = await simple_audit_graph.get_audit_report(session_id)
-        return AuditReportResponse(**report)
+        if format == "json":
+            body = AuditReportResponse(**report)
+            etag = compute_etag(body.model_dump_json().encode())
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+            return JSONResponse(content=jsonable_encoder(body), headers=headers)
+
+        artifact = report["artifacts"].get(format)
+        if not artifact:
+            raise HTTPException(status_code=404, detail=f"No {format} rendering available for this report")
+        headers = {"ETag": artifact["etag"], "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, artifact["etag"]):
+            return Response(status_code=304, headers=headers)
+        content = await simple_audit_graph.reports.load_artifact(artifact)
+        headers["Content-Disposition"] = f'attachment; filename="audit-report-{session_id}.{format}"'
+        return Response(content=content, media_type=CONTENT_TYPES[format], headers=headers)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -97,12 +162,13 @@ async def get_agent_report(session_id: str):
 async def get_conversation_history(session_id: str):
     """Get the conversation history for an audit session"""
     try:
-        # This would need to be implemented in the graph
-        # For now, return empty conversation
+        messages = await simple_audit_graph.get_conversation(session_id)
         return ConversationHistoryResponse(
             session_id=session_id,
-            messages=[]
+            messages=messages
         )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get conversation: {str(e)}")
 
@@ -129,4 +195,28 @@ async def set_clause_index(session_id: str, index: int = Body(..., embed=True)):
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to set clause index: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to set clause index: {str(e)}") 
+
+
+@router.websocket("/{session_id}/ws")
+async def agent_session_socket(websocket: WebSocket, session_id: str):
+    """
+    Session channel: queries with streamed replies, answers, navigation and
+    pushed state changes over one WebSocket (see ``SessionChannel``).
+    Browsers cannot set headers on a WebSocket, so the tenant and its key may
+    also be passed as ``?tenant=`` and ``?tenant_key=``.
+    """
+    tenant_id = websocket.headers.get(TENANT_HEADER) or websocket.query_params.get("tenant")
+    try:
+        authorize_tenant(tenant_id, websocket.headers.get(TENANT_KEY_HEADER) or websocket.query_params.get("tenant_key"))
+        token = bind_tenant(tenant_id)
+    except TenantRejected as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    except ValueError:
+        await websocket.close(code=1008, reason="Invalid tenant id")
+        return
+    try:
+        await SessionChannel(websocket, session_id).serve()
+    finally:
+        reset_tenant(token)
@@ -0,0 +1,54 @@
+# app/routes/analytics.py
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services import analytics
+from app.services.model_router import model_router
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/clauses")
+async def get_clause_compliance():
+    """Average compliance by clause across the calling tenant's sessions"""
+    try:
+        return {"total_sessions": await analytics.total_sessions(), "clauses": await analytics.clause_compliance()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load clause compliance: {str(e)}")
+
+
+@router.get("/skipped")
+async def get_most_skipped(limit: int = Query(10, ge=1, le=100)):
+    """Most-skipped clauses (answers of `__skip__`)"""
+    try:
+        return {"clauses": await analytics.most_skipped(limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load skipped clauses: {str(e)}")
+
+
+@router.get("/coverage")
+async def get_document_coverage():
+    """Evidence coverage per clause"""
+    try:
+        return {"clauses": await analytics.document_coverage()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load document coverage: {str(e)}")
+
+
+@router.post("/rebuild", status_code=202)
+async def rebuild_rollups():
+    """Recompute the calling tenant's rollups from its responses and documents"""
+    try:
+        await analytics.rebuild_rollups()
+        return {"success": True}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild rollups: {str(e)}")
+
+
+@router.get("/router")
+async def get_router_evaluation():
+    """Model routing decisions on this worker and shadow comparisons of fast against strong replies"""
+    try:
+        return {**model_router.stats(), "shadow": await model_router.shadow_summary()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load router evaluation: {str(e)}")
@@ -11,6 +11,7 @@ from app.models.audit import (
     QueryResponse
 )
 from app.services.audit_engine import AuditEngine
+from app.services.tenant_scheduler import TenantQuotaExceeded
 
 router = APIRouter(prefix="/audit", tags=["audit"])
 
@@ -42,6 +43,8 @@ async def query_clause(session_id: str, req: QueryRequest):
         resp = await AuditEngine.handle_query(session_id, req.query)
     except KeyError:
         raise HTTPException(404, "Session not found")
+    except TenantQuotaExceeded as e:
+        raise HTTPException(429, str(e))
     return QueryResponse(response=resp)
 
 @router.post("/{session_id}/answer", status_code=204)
@@ -0,0 +1,85 @@
+# app/routes/campaigns.py
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from app.agents.campaigns import campaign_service
+
+router = APIRouter(prefix="/campaigns", tags=["campaigns"])
+
+
+class CampaignUnit(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)   # business unit; links the unit's sessions across years
+    metadata: Dict[str, Any] = {}
+    prior_session_id: Optional[str] = None                 # session to carry answers from instead of the unit's latest
+
+
+class CampaignRequest(BaseModel):
+    name: str
+    units: List[CampaignUnit]
+    metadata: Dict[str, Any] = {}                           # shared by every session; unit metadata wins on conflicts
+    carry_forward: bool = True
+    starts_at: Optional[datetime] = None                    # launched by the scheduler when in the future (naive = UTC)
+
+
+@router.post("")
+async def create_campaign(req: CampaignRequest):
+    """Create one audit session per unit now, or schedule the campaign for ``starts_at``"""
+    try:
+        starts_at = req.starts_at
+        if starts_at is not None and starts_at.tzinfo is not None:
+            starts_at = starts_at.astimezone(timezone.utc).replace(tzinfo=None)
+        units = [unit.model_dump(exclude_none=True) for unit in req.units]
+        return await campaign_service.create(req.name, units, req.metadata, req.carry_forward, starts_at)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create campaign: {str(e)}")
+
+
+@router.get("")
+async def list_campaigns(limit: int = Query(100, ge=1, le=1000)):
+    """The calling tenant's campaigns, newest first"""
+    try:
+        return {"campaigns": await campaign_service.list_campaigns(limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list campaigns: {str(e)}")
+
+
+@router.get("/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    """A campaign with its sessions counted by status"""
+    try:
+        return await campaign_service.get(campaign_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load campaign: {str(e)}")
+
+
+@router.get("/{campaign_id}/sessions")
+async def campaign_sessions(campaign_id: str):
+    """Unit, session id, status and position of every session in a campaign"""
+    try:
+        return {"sessions": await campaign_service.sessions(campaign_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load campaign sessions: {str(e)}")
+
+
+@router.post("/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    """Cancel a scheduled campaign before it launches"""
+    try:
+        campaign = await campaign_service.cancel(campaign_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to cancel campaign: {str(e)}")
+    if campaign is None:
+        raise HTTPException(status_code=409, detail="Only scheduled campaigns can be cancelled")
+    return campaign
@@ -0,0 +1,58 @@
+# app/routes/search.py
+
+from typing import Optional, List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from app.services.search import search_service
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+class SimilarRequest(BaseModel):
+    text: str
+    kind: Optional[str] = None          # "answers" | "documents" | None for both
+    clause_index: Optional[int] = None
+    session_id: Optional[str] = None
+    limit: int = 10
+
+
+class SearchResponse(BaseModel):
+    results: List[Dict[str, Any]]
+
+
+@router.get("/text", response_model=SearchResponse)
+async def text_search(
+    q: str,
+    kind: str = Query("answers", pattern="^(answers|documents)$"),
+    clause_index: Optional[int] = None,
+    session_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200)
+):
+    """Full-text search over answers or evidence analyses"""
+    try:
+        results = await search_service.text_search(q, kind, clause_index, session_id, limit)
+        return SearchResponse(results=results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.post("/similar", response_model=SearchResponse)
+async def similar_search(req: SimilarRequest):
+    """Find answers or evidence analyses similar to a piece of text"""
+    if req.kind not in (None, "answers", "documents"):
+        raise HTTPException(status_code=400, detail="kind must be 'answers' or 'documents'")
+    try:
+        results = await search_service.similar(req.text, req.kind, req.clause_index, req.session_id, req.limit)
+        return SearchResponse(results=results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.post("/reindex", status_code=202)
+async def reindex():
+    """Rebuild the vector index from Mongo"""
+    try:
+        return {"indexed": await search_service.reindex()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reindex failed: {str(e)}")
@@ -0,0 +1,44 @@
+# app/routes/tenants.py
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.mongo_client import db
+from app.services.tenancy import current_tenant, tenant_filter
+from app.services.tenant_scheduler import tenant_scheduler
+from app.services.usage_ledger import usage_ledger
+
+router = APIRouter(prefix="/tenants", tags=["tenants"])
+
+
+@router.get("/usage")
+async def tenant_usage():
+    """LLM usage, quota and queueing counters plus stored data volume for the calling tenant"""
+    try:
+        tenant_id = current_tenant()
+        usage = tenant_scheduler.usage(tenant_id)
+        usage["sessions"] = await db.sessions.count_documents(tenant_filter(tenant_id))
+        usage["uploads"] = await db.uploads.count_documents(tenant_filter(tenant_id))
+        return usage
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load tenant usage: {str(e)}")
+
+
+@router.get("/usage/rollup")
+async def tenant_usage_rollup(
+    by: str = Query("day", description="comma-separated: session, clause, endpoint, day, prompt, model"),
+    since: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    until: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    session_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """LLM tokens, cost, cache hits and latency from the usage ledger, grouped for the calling tenant"""
+    try:
+        dimensions = [name.strip() for name in by.split(",") if name.strip()]
+        rows = await usage_ledger.rollup(current_tenant(), dimensions, since, until, session_id, limit)
+        return {"by": dimensions, "rows": rows}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load usage rollup: {str(e)}")
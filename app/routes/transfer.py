@@ -0,0 +1,37 @@
+# app/routes/transfer.py
+
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.services.session_transfer import ArchiveError, export_sessions, import_sessions
+from app.services.tenancy import current_tenant
+
+router = APIRouter(prefix="/transfer", tags=["transfer"])
+
+
+@router.get("/export")
+async def export_archive(
+    session_id: List[str] = Query([], description="Sessions to export; all of the tenant's sessions when omitted"),
+    include_evidence: bool = Query(True)
+):
+    """Stream a zip of sessions, their answers, analyses, conversations, upload records and evidence"""
+    filename = f"audit-export-{current_tenant()}-{datetime.utcnow():%Y%m%dT%H%M%S}.zip"
+    return StreamingResponse(
+        export_sessions(session_id, include_evidence),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import")
+async def import_archive(file: UploadFile = File(...)):
+    """Load an export archive into the calling tenant; rows that already exist are skipped"""
+    try:
+        return await import_sessions(file.file)
+    except ArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
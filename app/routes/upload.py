@@ -1,14 +1,60 @@
 # app/routes/upload.py
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from pydantic import BaseModel
+import asyncio
+import math
+import os
+import uuid
+from email.utils import format_datetime
+from urllib.parse import quote
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Header
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
 from datetime import datetime
-from app.services.s3_client import create_presigned_url, upload_file_to_s3
+from app.config import settings
+from app.services.ingestion import STATUS_PENDING, ingestion_pipeline
 from app.services.mongo_client import db
-from typing import List
+from app.services.object_cache import object_cache
+from app.services.report_pipeline import etag_matches
+from app.services.storage import ObjectNotFound, PresignNotSupported, content_disposition, storage
+from app.services.tenancy import current_tenant, owns_key, tenant_filter, tenant_key
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
 
 router = APIRouter()
 
+MAX_PARTS = 10000           # S3 limit per multipart upload
+MIN_PART_SIZE = 5 * 2**20   # S3 minimum for every part but the last
+
+
+def _direct_upload_unsupported() -> HTTPException:
+    return HTTPException(
+        status_code=501,
+        detail=f"The {storage.name} storage backend does not support direct uploads; use POST /upload/file"
+    )
+
+
+def _new_key(filename: str) -> str:
+    """Unique object key under the calling tenant's prefix"""
+    name = os.path.basename(filename.replace("\\", "/"))
+    if name in ("", ".", ".."):
+        name = "file"
+    return tenant_key(f"uploads/{uuid.uuid4().hex}/{name}")
+
+
+async def _record_upload(key: str, filename: str, size: Optional[int] = None) -> dict:
+    """Insert the upload record and queue the object for ingestion"""
+    doc = {
+        "tenant_id": current_tenant(),
+        "key": key,
+        "filename": filename,
+        "recorded_at": datetime.utcnow(),
+        "ingest": {"status": STATUS_PENDING}
+    }
+    if size is not None:
+        doc["size"] = size
+    await db.uploads.insert_one(doc)
+    ingestion_pipeline.submit(key)
+    return doc
+
 
 # ─── Presign Endpoint ─────────────────────────────────────────────
 
@@ -23,10 +69,13 @@ class PresignResponse(BaseModel):
 async def presign_upload(req: PresignRequest):
     """
     Generate a presigned PUT URL so the client can upload directly to S3.
+    Keys live under the calling tenant's prefix.
     """
-    key = req.filename  # store at bucket root
+    key = _new_key(req.filename)
     try:
-        url = create_presigned_url(key)
+        url = storage.presigned_put_url(key)
+    except PresignNotSupported:
+        raise _direct_upload_unsupported()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not generate presigned URL: {e}")
     return PresignResponse(upload_url=url, key=key)
@@ -42,20 +91,17 @@ class UploadCompleteResponse(BaseModel):
     key: str
     filename: str
     recorded_at: datetime
+    ingest: Optional[Dict[str, Any]] = None   # status, sha256, mime_type, page_count, ...
 
 @router.post("/complete", response_model=UploadCompleteResponse)
 async def complete_upload(req: UploadCompleteRequest):
     """
     Record the uploaded file’s metadata in MongoDB.
     """
-    recorded_time = datetime.utcnow()
-    doc = {
-        "key": req.key,
-        "filename": req.filename,
-        "recorded_at": recorded_time
-    }
+    if not owns_key(req.key):
+        raise HTTPException(status_code=403, detail="Key does not belong to this tenant")
     try:
-        await db.uploads.insert_one(doc)
+        doc = await _record_upload(req.key, req.filename)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not record upload metadata: {e}")
     return UploadCompleteResponse(**doc)
@@ -64,50 +110,337 @@ async def complete_upload(req: UploadCompleteRequest):
 @router.get("/all", response_model=List[UploadCompleteResponse])
 async def list_uploads():
     """
-    Return all uploaded-file records from MongoDB.
+    Return the calling tenant's uploaded-file records from MongoDB.
     """
-    docs = await db.uploads.find().to_list(length=100)
+    docs = await db.uploads.find(tenant_filter(), {"text_z": 0}).to_list(length=100)
     # Transform Mongo documents into the Pydantic model
     return [
         UploadCompleteResponse(
             key=d["key"],
             filename=d["filename"],
-            recorded_at=d["recorded_at"]
+            recorded_at=d["recorded_at"],
+            ingest=d.get("ingest")
         )
         for d in docs
     ]
 
 
+# ─── Multipart Upload Endpoints ──────────────────────────────────
+# The browser uploads parts in parallel straight to S3; the API only signs
+# URLs and tracks the upload id. Abandoned uploads should also be expired by
+# an AbortIncompleteMultipartUpload lifecycle rule on the bucket.
+
+class MultipartInitiateRequest(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+    content_type: Optional[str] = None
+
+class MultipartInitiateResponse(BaseModel):
+    key: str
+    upload_id: str
+    part_size: int
+    part_count: int
+
+class MultipartPartsRequest(BaseModel):
+    key: str
+    upload_id: str
+    part_numbers: List[int] = Field(..., min_length=1, max_length=MAX_PARTS)
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str
+
+class MultipartPartsResponse(BaseModel):
+    parts: List[PresignedPart]
+    expires_in: int
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class MultipartCompleteRequest(BaseModel):
+    key: str
+    upload_id: str
+    parts: List[CompletedPart] = Field(..., min_length=1)
+
+class MultipartAbortRequest(BaseModel):
+    key: str
+    upload_id: str
+
+
+async def _load_multipart(key: str, upload_id: str) -> dict:
+    record = await db.multipart_uploads.find_one({"_id": upload_id, "key": key, **tenant_filter()})
+    if not record:
+        raise HTTPException(status_code=404, detail="Multipart upload not found")
+    return record
+
+
+@router.post("/multipart/initiate", response_model=MultipartInitiateResponse)
+async def initiate_multipart(req: MultipartInitiateRequest):
+    """
+    Start an S3 multipart upload. The part size is chosen so the file fits in
+    S3's 10,000-part limit.
+    """
+    if not storage.supports_presign:
+        raise _direct_upload_unsupported()
+    part_size = max(settings.multipart_part_size_mb * 2**20, MIN_PART_SIZE, math.ceil(req.size / MAX_PARTS))
+    key = _new_key(req.filename)
+    try:
+        upload_id = await asyncio.to_thread(storage.create_multipart_upload, key, req.content_type)
+        await db.multipart_uploads.insert_one({
+            "_id": upload_id,
+            "tenant_id": current_tenant(),
+            "key": key,
+            "filename": req.filename,
+            "size": req.size,
+            "part_size": part_size,
+            "created_at": datetime.utcnow()
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not start multipart upload: {e}")
+    return MultipartInitiateResponse(
+        key=key,
+        upload_id=upload_id,
+        part_size=part_size,
+        part_count=math.ceil(req.size / part_size)
+    )
+
+
+@router.post("/multipart/parts", response_model=MultipartPartsResponse)
+async def presign_multipart_parts(req: MultipartPartsRequest):
+    """Presigned PUT URLs for a batch of part numbers (1-based)"""
+    record = await _load_multipart(req.key, req.upload_id)
+    part_count = math.ceil(record["size"] / record["part_size"])
+    if any(not 1 <= n <= part_count for n in req.part_numbers):
+        raise HTTPException(status_code=400, detail=f"Part numbers must be between 1 and {part_count}")
+    try:
+        parts = [
+            PresignedPart(part_number=n, url=storage.presign_upload_part(req.key, req.upload_id, n))
+            for n in req.part_numbers
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not presign parts: {e}")
+    return MultipartPartsResponse(parts=parts, expires_in=settings.presign_put_expiry_seconds)
+
+
+@router.post("/multipart/complete", response_model=UploadCompleteResponse)
+async def complete_multipart(req: MultipartCompleteRequest):
+    """Assemble the uploaded parts and record the upload"""
+    record = await _load_multipart(req.key, req.upload_id)
+    parts = sorted(req.parts, key=lambda p: p.part_number)
+    try:
+        await asyncio.to_thread(
+            storage.complete_multipart_upload,
+            req.key,
+            req.upload_id,
+            [{"PartNumber": p.part_number, "ETag": p.etag} for p in parts]
+        )
+        doc = await _record_upload(req.key, record["filename"], record["size"])
+        await db.multipart_uploads.delete_one({"_id": req.upload_id})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not complete multipart upload: {e}")
+    return UploadCompleteResponse(**doc)
+
+
+@router.post("/multipart/abort", status_code=204)
+async def abort_multipart(req: MultipartAbortRequest):
+    """Abort a multipart upload and discard its parts"""
+    await _load_multipart(req.key, req.upload_id)
+    try:
+        await asyncio.to_thread(storage.abort_multipart_upload, req.key, req.upload_id)
+        await db.multipart_uploads.delete_one({"_id": req.upload_id})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not abort multipart upload: {e}")
+
+
+# ─── Presigned Download Endpoint ─────────────────────────────────
+
+class DownloadUrlResponse(BaseModel):
+    key: str
+    url: str
+    expires_in: Optional[int] = None     # None for the API's own download URL
+
+@router.get("/download-url", response_model=DownloadUrlResponse)
+async def presign_download(key: str = Query(...)):
+    """
+    Short-lived presigned GET URL for an uploaded evidence file, so the bytes
+    go straight from S3 to the client. Backends that cannot presign get the
+    streaming download URL instead.
+    """
+    record = await db.uploads.find_one({"key": key, **tenant_filter()}, {"filename": 1}) if owns_key(key) else None
+    if not record:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    try:
+        url = storage.presigned_get_url(key, filename=os.path.basename(record["filename"]))
+    except PresignNotSupported:
+        return DownloadUrlResponse(key=key, url=f"/upload/download?key={quote(key)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not generate download URL: {e}")
+    return DownloadUrlResponse(key=key, url=url, expires_in=settings.presign_get_expiry_seconds)
+
+
+# ─── Streaming Download Endpoint ─────────────────────────────────
+# Serves evidence back through the API for deployments without presigned
+# URLs and for in-browser preview: chunked (constant memory per request),
+# single byte ranges so PDF viewers can fetch page by page, conditional
+# requests, and a disk cache for hot objects on remote backends.
+
+class _UnsatisfiableRange(Exception):
+    pass
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Half-open byte span for a single-range header; None means serve the whole object"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None                  # absent, unknown unit or multi-range: full body
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:                # suffix range: the last N bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise _UnsatisfiableRange()
+            return max(0, size - length), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        raise _UnsatisfiableRange()
+    return start, min(end, size)
+
+
+class _FileRangeResponse(Response):
+    """
+    Sends ``[start, end)`` of an open local file. Servers that offer the ASGI
+    ``http.response.zerocopysend`` extension get the file itself and send it
+    with ``sendfile``; otherwise it goes out in ``pread`` chunks read in a
+    worker thread. The file is closed once the response is done.
+    """
+
+    def __init__(self, file: BinaryIO, start: int, end: int, chunk_size: int, status_code: int, media_type: str, headers: Dict[str, str]):
+        super().__init__(status_code=status_code, media_type=media_type, headers=headers)
+        self.file = file
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": self.file,
+                    "offset": self.start,
+                    "count": self.end - self.start,
+                    "more_body": False,
+                })
+                return
+            fd = self.file.fileno()
+            for offset in range(self.start, self.end, self.chunk_size):
+                chunk = await asyncio.to_thread(os.pread, fd, min(self.chunk_size, self.end - offset), offset)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.file.close()
+
+
+def _open_local(key: str) -> Optional[BinaryIO]:
+    """The object opened from local disk (local backend or download cache), or None"""
+    path = object_cache.local_path(key)
+    if path is None:
+        return None
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        object_cache.forget(key)         # evicted or deleted behind the index
+        if storage.local_path(key) is not None:
+            raise ObjectNotFound(f"Object not found: {key}")
+        return None
+
+
+@router.get("/download")
+async def download(
+    key: str = Query(...),
+    attachment: bool = Query(False, description="Send as an attachment instead of inline"),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None)
+):
+    """
+    Stream an uploaded evidence file. Honours Range (single range),
+    If-Range and If-None-Match; the ETag is the ingested SHA-256 when known.
+    """
+    record = await db.uploads.find_one({"key": key, **tenant_filter()}, {"filename": 1, "ingest": 1}) if owns_key(key) else None
+    if not record:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    try:
+        info = await asyncio.to_thread(storage.head, key)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not read upload: {e}")
+
+    ingest = record.get("ingest") or {}
+    etag = f'"{ingest.get("sha256") or info.etag}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={settings.download_max_age_seconds}"
+    }
+    if info.last_modified:
+        headers["Last-Modified"] = format_datetime(info.last_modified, usegmt=True)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if if_range and if_range.strip() != etag:
+        range_header = None          # representation changed: send it whole
+    try:
+        span = _parse_range(range_header, info.size)
+    except _UnsatisfiableRange:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{info.size}"})
+    start, end = span or (0, info.size)
+
+    filename = os.path.basename(record.get("filename") or key)
+    headers["Content-Disposition"] = content_disposition("attachment" if attachment else "inline", filename)
+    headers["Content-Length"] = str(end - start)
+    if span:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{info.size}"
+
+    status_code = 206 if span else 200
+    media_type = ingest.get("mime_type") or info.content_type or "application/octet-stream"
+    chunk_size = settings.download_chunk_kb * 1024
+    object_cache.note_request(key, info.size)
+    try:
+        local = _open_local(key)
+        if local is not None:
+            return _FileRangeResponse(local, start, end, chunk_size, status_code, media_type, headers)
+        # Opens the object (a GET on remote backends) before any header is sent
+        chunks = await asyncio.to_thread(object_cache.iter_range, key, start, end, chunk_size)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return StreamingResponse(chunks, status_code=status_code, media_type=media_type, headers=headers)
+
+
 # ─── Direct Upload Endpoint ──────────────────────────────────
 
 @router.post("/file", response_model=UploadCompleteResponse)
 async def upload_file(file: UploadFile = File(...)):
     """
     Upload a file directly through the backend to avoid CORS issues.
+    The body is streamed to storage rather than read into memory.
     """
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Generate a unique key for the file
-        import uuid
+        # Generate a unique key for the file under the tenant's prefix
         file_extension = file.filename.split('.')[-1] if '.' in file.filename else ''
-        key = f"{uuid.uuid4()}.{file_extension}" if file_extension else str(uuid.uuid4())
+        name = f"{uuid.uuid4()}.{file_extension}" if file_extension else str(uuid.uuid4())
+        key = tenant_key(f"uploads/{name}")
         
-        # Upload to S3
-        success = await upload_file_to_s3(file_content, key)
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to upload file to S3")
+        # Write to the storage backend
+        info = await asyncio.to_thread(storage.put_file, key, file.file, file.content_type)
         
         # Record in MongoDB
-        recorded_time = datetime.utcnow()
-        doc = {
-            "key": key,
-            "filename": file.filename,
-            "recorded_at": recorded_time
-        }
-        
-        await db.uploads.insert_one(doc)
+        doc = await _record_upload(key, file.filename, info.size)
         
         return UploadCompleteResponse(**doc)
         
@@ -0,0 +1,242 @@
+# app/services/analytics.py
+
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.services.audit_engine import CLAUSE_METADATA
+from app.services.mongo_client import db
+from app.services.scoring import SKIP_ANSWER, score_answer
+from app.services.tenancy import current_tenant, tenant_filter
+
+# Materialized views, one set of rows per tenant:
+#   clause_rollups   {_id: {t: tenant_id, c: clause_index}, tenant_id, clause_index,
+#                     answered, skipped, score_sum, documents, sessions_with_documents}
+#   clause_coverage  {_id: {t: tenant_id, c: clause_index, s: session_id}, tenant_id}
+#                    - distinct (clause, session) pairs with evidence
+
+
+def _rollup_key(clause_index: int) -> Dict[str, Any]:
+    return {"_id": {"t": current_tenant(), "c": clause_index}}
+
+
+def _rollup_fields(clause_index: int) -> Dict[str, Any]:
+    return {"tenant_id": current_tenant(), "clause_index": clause_index}
+
+
+def _tenant_rows() -> Dict[str, Any]:
+    """
+    The calling tenant's rollup rows. Rows always carry a resolved tenant id,
+    so this is an exact match: rows from before rollups were per tenant have
+    none and counted every tenant's data (the next rebuild removes them).
+    """
+    return {"tenant_id": current_tenant()}
+
+
+def _answer_counts(answer: str, sign: int) -> Dict[str, float]:
+    return {
+        "answered": sign,
+        "skipped": sign if answer == SKIP_ANSWER else 0,
+        "score_sum": sign * score_answer(answer),
+    }
+
+
+# ─── Incremental refresh ─────────────────────────────────────────
+
+async def record_answer(clause_index: int, answer: str, previous: Optional[str] = None) -> None:
+    """Fold one answer into the calling tenant's clause rollup, replacing ``previous`` if the clause was re-answered"""
+    inc = _answer_counts(answer, 1)
+    if previous is not None:
+        for field, value in _answer_counts(previous, -1).items():
+            inc[field] += value
+    await db.clause_rollups.update_one(
+        _rollup_key(clause_index),
+        {"$inc": inc, "$set": {**_rollup_fields(clause_index), "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def record_answers(answers: Iterable[Tuple[int, str]]) -> None:
+    """Fold many first-time answers into the rollups with one bulk write (campaign pre-seeding)"""
+    totals: Dict[int, Dict[str, float]] = {}
+    for clause_index, answer in answers:
+        inc = totals.setdefault(clause_index, {"answered": 0, "skipped": 0, "score_sum": 0.0})
+        for field, value in _answer_counts(answer, 1).items():
+            inc[field] += value
+    if not totals:
+        return
+    now = datetime.utcnow()
+    await db.clause_rollups.bulk_write(
+        [
+            UpdateOne(_rollup_key(idx), {"$inc": inc, "$set": {**_rollup_fields(idx), "updated_at": now}}, upsert=True)
+            for idx, inc in totals.items()
+        ],
+        ordered=False
+    )
+
+
+async def record_document(session_id: str, clause_index: int) -> None:
+    """Fold one evidence upload into the calling tenant's clause rollup"""
+    inc = {"documents": 1}
+    tenant_id = current_tenant()
+    try:
+        await db.clause_coverage.insert_one({"_id": {"t": tenant_id, "c": clause_index, "s": session_id}, "tenant_id": tenant_id})
+        inc["sessions_with_documents"] = 1
+    except DuplicateKeyError:
+        pass
+    await db.clause_rollups.update_one(
+        _rollup_key(clause_index),
+        {"$inc": inc, "$set": {**_rollup_fields(clause_index), "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+# ─── Full rebuild ────────────────────────────────────────────────
+
+async def rebuild_rollups(tenant_id: Optional[str] = None) -> None:
+    """
+    Recompute one tenant's rollups from ``responses`` and ``documents`` with
+    aggregation pipelines. Only the latest answer per (session, clause) counts;
+    answer scores come from the stored ``score`` field (see
+    ``scripts/backfill_scores.py``).
+
+    The rows are built in temporary collections and then merged over the
+    live ones, stamped with this rebuild's id; the tenant's rows without the
+    stamp (clauses that no longer have data) are removed last. Dashboards
+    keep serving the previous numbers until then instead of going empty.
+    """
+    tenant_id = tenant_id or current_tenant()
+    match = {"$match": tenant_filter(tenant_id)}
+    stamp = uuid.uuid4().hex
+    rollups_tmp = f"clause_rollups_rebuild_{stamp}"
+    coverage_tmp = f"clause_coverage_rebuild_{stamp}"
+    tag = {"$set": {
+        "_id": {"t": tenant_id, "c": "$_id"},
+        "tenant_id": tenant_id,
+        "clause_index": "$_id",
+        "rebuild": stamp,
+        "updated_at": "$$NOW",
+    }}
+
+    try:
+        await db.responses.aggregate([
+            match,
+            {"$sort": {"answered_at": 1}},
+            {"$group": {
+                "_id": {"s": "$session_id", "c": "$clause_index"},
+                "answer": {"$last": "$answer"},
+                "score": {"$last": "$score"},
+            }},
+            {"$group": {
+                "_id": "$_id.c",
+                "answered": {"$sum": 1},
+                "skipped": {"$sum": {"$cond": [{"$eq": ["$answer", SKIP_ANSWER]}, 1, 0]}},
+                "score_sum": {"$sum": {"$ifNull": ["$score", 0]}},
+                "documents": {"$sum": 0},
+                "sessions_with_documents": {"$sum": 0},
+            }},
+            tag,
+            {"$merge": {"into": rollups_tmp, "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"}},
+        ], allowDiskUse=True).to_list(length=None)
+
+        await db.documents.aggregate([
+            match,
+            {"$group": {"_id": {"c": "$clause_index", "s": "$session_id"}}},
+            {"$set": {
+                "_id": {"t": tenant_id, "c": "$_id.c", "s": "$_id.s"},
+                "tenant_id": tenant_id,
+                "rebuild": stamp,
+            }},
+            {"$merge": {"into": coverage_tmp, "on": "_id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+        ], allowDiskUse=True).to_list(length=None)
+
+        await db.documents.aggregate([
+            match,
+            {"$group": {
+                "_id": {"c": "$clause_index", "s": "$session_id"},
+                "documents": {"$sum": 1},
+            }},
+            {"$group": {
+                "_id": "$_id.c",
+                "documents": {"$sum": "$documents"},
+                "sessions_with_documents": {"$sum": 1},
+            }},
+            tag,
+            {"$merge": {"into": rollups_tmp, "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"}},
+        ], allowDiskUse=True).to_list(length=None)
+
+        # Swap in: replace the tenant's rows, then drop the ones the rebuild did not produce
+        for tmp, live in ((rollups_tmp, "clause_rollups"), (coverage_tmp, "clause_coverage")):
+            await db[tmp].aggregate([
+                {"$merge": {"into": live, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+            ]).to_list(length=None)
+            await db[live].delete_many({**tenant_filter(tenant_id), "rebuild": {"$ne": stamp}})
+    finally:
+        await db[rollups_tmp].drop()
+        await db[coverage_tmp].drop()
+
+
+# ─── Dashboard reads (rollups only) ──────────────────────────────
+
+def _clause_label(idx: Any) -> Optional[str]:
+    if isinstance(idx, int) and 0 <= idx < len(CLAUSE_METADATA):
+        return CLAUSE_METADATA[idx]["question"]
+    return None
+
+
+async def total_sessions() -> int:
+    """The calling tenant's live plus archived session count"""
+    return (
+        await db.sessions.count_documents(tenant_filter())
+        + await db.sessions_archive.count_documents(tenant_filter())
+    )
+
+
+async def clause_compliance() -> List[Dict[str, Any]]:
+    """Average answer score (0-100) per clause"""
+    rows = await db.clause_rollups.find(_tenant_rows()).sort("clause_index", 1).to_list(length=None)
+    return [
+        {
+            "clause_index": row["clause_index"],
+            "clause": _clause_label(row["clause_index"]),
+            "answered": row.get("answered", 0),
+            "skipped": row.get("skipped", 0),
+            "average_compliance": (row.get("score_sum", 0) / row["answered"]) * 100 if row.get("answered") else None,
+        }
+        for row in rows
+    ]
+
+
+async def most_skipped(limit: int = 10) -> List[Dict[str, Any]]:
+    """Clauses ordered by how often they were skipped"""
+    rows = await db.clause_rollups.find(
+        {**_tenant_rows(), "skipped": {"$gt": 0}}
+    ).sort("skipped", DESCENDING).limit(limit).to_list(length=limit)
+    return [
+        {
+            "clause_index": row["clause_index"],
+            "clause": _clause_label(row["clause_index"]),
+            "skipped": row["skipped"],
+            "skip_rate": row["skipped"] / row["answered"] if row.get("answered") else None,
+        }
+        for row in rows
+    ]
+
+
+async def document_coverage() -> List[Dict[str, Any]]:
+    """Evidence uploads per clause and the share of sessions that provided any"""
+    sessions = await total_sessions()
+    rows = await db.clause_rollups.find(_tenant_rows()).sort("clause_index", 1).to_list(length=None)
+    return [
+        {
+            "clause_index": row["clause_index"],
+            "clause": _clause_label(row["clause_index"]),
+            "documents": row.get("documents", 0),
+            "sessions_with_documents": row.get("sessions_with_documents", 0),
+            "coverage": row.get("sessions_with_documents", 0) / sessions if sessions else None,
+        }
+        for row in rows
+    ]
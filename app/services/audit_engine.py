@@ -4,11 +4,16 @@ import os
 import uuid
 from datetime import datetime
 from typing import Optional, Dict, Any
-import asyncio
 from dotenv import load_dotenv
 from openai import OpenAI, OpenAIError
 
+from app.services.guidance_fallback import guidance_fallback
+from app.services.llm_gateway import LLMUnavailable, llm_gateway
+from app.services.model_router import model_router
 from app.services.mongo_client import db
+from app.services.prompts import ENGINE_QUERY, prompt_registry
+from app.services.tenancy import current_tenant, tenant_of
+from app.services.usage_ledger import tag_usage
 
 # -----------------------------------------------------------------------------
 # Load environment variables and initialize OpenAI client
@@ -20,7 +25,8 @@ if not api_key:
 client = OpenAI(api_key=api_key)
 
 # -----------------------------------------------------------------------------
-# Clause metadata: questions, descriptions, attributes
+# Clause metadata: questions, descriptions, attributes. An entry may set
+# "weight" to count more in the compliance score; every clause defaults to 1.0.
 # -----------------------------------------------------------------------------
 CLAUSE_METADATA = [
     {
@@ -102,6 +108,7 @@ class AuditEngine:
         session_id = str(uuid.uuid4())
         await db.sessions.insert_one({
             "_id": session_id,
+            "tenant_id": current_tenant(),
             "clause_index": 0
         })
         return session_id
@@ -113,7 +120,7 @@ class AuditEngine:
         Returns None if all clauses have been completed.
         """
         sess = await db.sessions.find_one({"_id": session_id})
-        if not sess:
+        if not sess or tenant_of(sess) != current_tenant():
             raise KeyError("Session not found")
 
         idx = sess.get("clause_index", 0)
@@ -129,7 +136,7 @@ class AuditEngine:
         then advance the session to the next clause.
         """
         sess = await db.sessions.find_one({"_id": session_id})
-        if not sess:
+        if not sess or tenant_of(sess) != current_tenant():
             raise KeyError("Session not found")
 
         idx = sess.get("clause_index", 0)
@@ -140,6 +147,7 @@ class AuditEngine:
 
         await db.responses.insert_one({
             "session_id": session_id,
+            "tenant_id": tenant_of(sess),
             "clause_index": idx,
             "clause": clause_text,
             "answer": answer,
@@ -160,23 +168,23 @@ class AuditEngine:
         if not meta:
             return "Audit complete. No active clause."
 
-        system_prompt = "You are an expert ISO 27001 internal auditor. If the query is not related to the ISO 27001, politely tell the user that you can only answer questions related to ISO 27001 clauses. At the end of each answer, ask the user if they want to submit documents related to the clause or record their answer for it"
-        user_prompt = (
-            f"Clause description: {meta['description']}\n"
-            f"Attributes: {', '.join(meta['attributes'])}\n"
-            f"User asks: {user_query}\n"
-            "Provide a clear, concise answer."
+        idx = CLAUSE_METADATA.index(meta)
+        tag_usage(session_id=session_id, clause_index=idx)
+        prompt = prompt_registry.get(ENGINE_QUERY)
+        messages = prompt.openai_messages(clause=prompt_registry.clause_block(idx), query=user_query)
+        kwargs = {"model": "gpt-4", "max_tokens": 2000, "temperature": 0}
+        route = model_router.decide(ENGINE_QUERY, user_query)
+        try:
+            reply = await llm_gateway.chat_completions(client, prompt, messages, **model_router.kwargs_for(route, kwargs))
+        except LLMUnavailable:
+            return guidance_fallback.reply(idx, user_query)
+        guidance_fallback.remember(idx, user_query, reply.strip())
+        model_router.shadow(
+            route,
+            lambda: llm_gateway.chat_completions(
+                client, prompt, messages, enforce_quota=False, **model_router.fast_kwargs(kwargs)
+            ),
+            reply
         )
 
-        response = await asyncio.to_thread(
-            client.chat.completions.create,
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=2000,
-            temperature=0
-        )
-
-        return response.choices[0].message.content.strip()
+        return reply.strip()
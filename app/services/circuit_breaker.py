@@ -0,0 +1,138 @@
+# app/services/circuit_breaker.py
+
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger("uvicorn")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker over a sliding time window.
+
+    Every guarded call is recorded as ok or failed; a call slower than
+    ``slow_ms`` counts as failed even if it succeeds. Once the window holds at
+    least ``min_calls`` calls and the failed share reaches ``failure_ratio``
+    the circuit opens and calls fail immediately with ``CircuitOpen``. After
+    ``open_seconds`` one probe call is let through (half-open): success
+    closes the circuit, failure opens it for another period. Cancelled calls
+    (a client that went away) are not counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float,
+        min_calls: int,
+        failure_ratio: float,
+        slow_ms: float,
+        open_seconds: float
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_ms = slow_ms
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def available(self) -> bool:
+        """False while open and cooling down; callers can skip work that would be rejected"""
+        return self.state != OPEN or time.monotonic() - self._opened_at >= self.open_seconds
+
+    def _allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"Circuit {self.name} half-open, sending a probe")
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Run the block as one call through the breaker"""
+        if not self._allow():
+            self.rejected += 1
+            raise CircuitOpen(f"{self.name} is unavailable (circuit open)")
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self._record(False)
+            raise
+        except BaseException:
+            self._probing = False
+            raise
+        self._record((time.perf_counter() - started) * 1000 < self.slow_ms)
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if ok:
+                self.state = CLOSED
+                self._calls.clear()
+                logger.info(f"Circuit {self.name} closed")
+            else:
+                self._open(now)
+            return
+        self._calls.append((now, ok))
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+        failures = sum(1 for _, success in self._calls if not success)
+        if self.state == CLOSED and len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_ratio:
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.opened += 1
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        failures = sum(1 for _, ok in self._calls if not ok)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "available": self.available,
+            "window_calls": len(self._calls),
+            "window_failures": failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+# Global instance
+llm_breaker = CircuitBreaker(
+    "openai",
+    settings.breaker_window_seconds,
+    settings.breaker_min_calls,
+    settings.breaker_failure_ratio,
+    settings.breaker_slow_ms,
+    settings.breaker_open_seconds
+)
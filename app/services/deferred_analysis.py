@@ -0,0 +1,52 @@
+# app/services/deferred_analysis.py
+
+import asyncio
+import logging
+from typing import Optional
+
+from app.config import settings
+from app.services.circuit_breaker import llm_breaker
+
+logger = logging.getLogger("uvicorn")
+
+
+class DeferredAnalysisWorker:
+    """
+    Background task that runs the document analyses ``upload_document``
+    queued while the LLM was unavailable and resubmits answers whose grading
+    failed. It waits while the provider's circuit is open, so a recovering
+    provider only sees one probe at a time.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.deferred_analysis_interval_seconds)
+            if not llm_breaker.available:
+                continue
+            try:
+                done = await self.graph.analyze_deferred(settings.deferred_analysis_batch)
+                if done:
+                    logger.info(f"Completed {done} deferred document analyses")
+                regrading = await self.graph.grader.resubmit_deferred(settings.deferred_analysis_batch)
+                if regrading:
+                    logger.info(f"Resubmitted {regrading} deferred answer gradings")
+            except Exception as e:
+                logger.warning(f"Deferred document analysis failed: {e}")
@@ -0,0 +1,193 @@
+# app/services/event_bus.py
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.config import settings
+from app.services.mongo_client import db
+
+logger = logging.getLogger("uvicorn")
+
+Handler = Callable[[Dict[str, Any]], None]
+
+# Server error codes meaning change streams are unavailable (standalone mongod)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 20}
+# Sent to the local handler when messages may have been missed, so cached
+# session state is dropped rather than trusted
+RESYNC = "resync"
+SEND_BATCH = 100
+RETRY_SECONDS = 2.0
+
+
+class EventBus:
+    """
+    Transport that carries session change messages between uvicorn workers.
+    ``send`` never blocks; messages from other workers are passed to the
+    handler given to ``start``. A worker never receives its own messages.
+    """
+
+    name = "none"
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self.sent = 0
+        self.received = 0
+
+    def send(self, message: Dict[str, Any]) -> None:
+        pass
+
+    async def start(self, handler: Handler) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"bus": self.name, "worker_id": self.worker_id, "sent": self.sent, "received": self.received}
+
+
+class LocalEventBus(EventBus):
+    """
+    In-process stand-in for a real bus: every ``LocalEventBus`` on the same
+    ``broker`` receives the others' messages. A single worker has no peers,
+    so sending is free; tests create several buses to play several workers.
+    """
+
+    name = "local"
+    _brokers: Dict[str, List["LocalEventBus"]] = {}
+
+    def __init__(self, broker: str = "default"):
+        super().__init__()
+        self.broker = broker
+        self._handler: Optional[Handler] = None
+
+    def send(self, message: Dict[str, Any]) -> None:
+        peers = [bus for bus in self._brokers.get(self.broker, []) if bus is not self and bus._handler]
+        if not peers:
+            return
+        self.sent += 1
+        loop = asyncio.get_running_loop()
+        for bus in peers:
+            loop.call_soon(bus._deliver, dict(message))
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        if self._handler is not None:
+            self.received += 1
+            self._handler(message)
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        peers = self._brokers.setdefault(self.broker, [])
+        if self not in peers:
+            peers.append(self)
+
+    async def stop(self) -> None:
+        self._handler = None
+        peers = self._brokers.get(self.broker, [])
+        if self in peers:
+            peers.remove(self)
+
+
+class MongoEventBus(EventBus):
+    """
+    Messages are inserted into a collection (expired by a TTL index) and each
+    worker follows it with a change stream, filtering out its own inserts.
+    Change streams need a replica set or sharded cluster; against a
+    standalone server the bus logs a warning and stays local.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection_name: str, ttl_seconds: int):
+        super().__init__()
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self._outbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self.available = True
+
+    @property
+    def collection(self):
+        return db[self.collection_name]
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if self._tasks and self.available:
+            self._outbox.put_nowait({**message, "origin": self.worker_id, "created_at": datetime.utcnow()})
+
+    async def start(self, handler: Handler) -> None:
+        if self._tasks:
+            return
+        try:
+            await self.collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=self.ttl_seconds)
+        except PyMongoError as e:
+            logger.warning(f"Could not ensure event bus TTL index: {e}")
+        self._tasks = [
+            asyncio.create_task(self._send_loop()),
+            asyncio.create_task(self._watch_loop(handler)),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _send_loop(self) -> None:
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < SEND_BATCH and not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            try:
+                # Ordered so other workers see one session's changes in sequence
+                await self.collection.insert_many(batch, ordered=True)
+                self.sent += len(batch)
+            except PyMongoError as e:
+                logger.warning(f"Event bus dropped {len(batch)} messages: {e}")
+
+    async def _watch_loop(self, handler: Handler) -> None:
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": self.worker_id}}}]
+        resume_token = None
+        started = False
+        while True:
+            try:
+                async with self.collection.watch(pipeline, resume_after=resume_token) as stream:
+                    if started and resume_token is None:
+                        handler({"event": RESYNC, "session_id": None})
+                    started = True
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self.received += 1
+                        try:
+                            handler(change["fullDocument"])
+                        except Exception as e:
+                            logger.warning(f"Event bus handler failed: {e}")
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning(
+                        "Event bus needs MongoDB change streams (a replica set); "
+                        "session changes will not reach other workers"
+                    )
+                    self.available = False
+                    return
+                logger.warning(f"Event bus change stream failed, retrying: {e}")
+                resume_token = None if e.code == 286 else resume_token    # 286: resume point expired
+            except PyMongoError as e:
+                logger.warning(f"Event bus change stream interrupted, resuming: {e}")
+            await asyncio.sleep(RETRY_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "available": self.available, "queued": self._outbox.qsize()}
+
+
+def build_event_bus(kind: str) -> EventBus:
+    if kind == "mongo":
+        return MongoEventBus(settings.event_bus_collection, settings.event_bus_ttl_seconds)
+    if kind == "local":
+        return LocalEventBus()
+    raise ValueError(f"Unknown event bus {kind!r}")
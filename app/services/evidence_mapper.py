@@ -0,0 +1,92 @@
+# app/services/evidence_mapper.py
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.search import HashingEmbedder
+
+_WORD_RE = re.compile(r"\S+")
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9]*")
+EXCERPT_GAP = "\n[...]\n"
+# Words every clause and most documents share; left in, they dominate short chunks
+STOPWORDS = frozenset(
+    "a an and are as at be been by can clause for from has have how in is it its may must not of on or our "
+    "shall should that the their them there these this those to was we were what when which who will with".split()
+)
+
+
+@dataclass
+class ClauseMatch:
+    """A clause a document provides evidence for"""
+    clause_index: int
+    score: float          # best chunk's cosine similarity to the clause
+    chunks: List[int]     # best-matching chunk positions, in document order
+    excerpt: str          # those chunks, for a focused analysis prompt
+
+
+def content_words(text: str) -> str:
+    """Lower-cased words without stopwords or numbers, as the mapper embeds them"""
+    return " ".join(word for word in _TOKEN_RE.findall(text.lower()) if word not in STOPWORDS)
+
+
+def chunk_text(text: str, words: int, limit: int) -> List[str]:
+    """Split text into windows of ``words`` words overlapping by a quarter, at most ``limit`` of them"""
+    tokens = _WORD_RE.findall(text)
+    if not tokens:
+        return []
+    step = max(1, words - words // 4)
+    starts = range(0, max(1, len(tokens) - words + step), step)
+    return [" ".join(tokens[start:start + words]) for start in starts][:limit]
+
+
+class EvidenceMapper:
+    """
+    Scores a document against every clause at once. The document is split
+    into overlapping chunks, each embedded (stopwords dropped) with the
+    search index's ``HashingEmbedder``. One matrix product against the
+    precomputed clause matrix (question, description and attributes, one
+    row per clause) gives every chunk-clause similarity. A clause's score is its
+    best chunk's. Clauses scoring at least ``evidence_min_similarity`` are
+    returned best first, at most ``evidence_max_clauses`` of them, each
+    with an excerpt of its ``evidence_excerpt_chunks`` best chunks.
+    """
+
+    def __init__(self, dim: int):
+        self.embedder = HashingEmbedder(dim)
+        self._clauses: Optional[np.ndarray] = None
+
+    @property
+    def clause_matrix(self) -> np.ndarray:
+        if self._clauses is None:
+            from app.services.audit_engine import CLAUSE_METADATA
+
+            self._clauses = self.embedder.embed_many([
+                content_words(" ".join([clause["question"], clause["description"], *clause.get("attributes", [])]))
+                for clause in CLAUSE_METADATA
+            ])
+        return self._clauses
+
+    def similarities(self, chunks: List[str]) -> np.ndarray:
+        """Chunk x clause cosine similarities (embeddings are L2-normalised)"""
+        return self.embedder.embed_many([content_words(chunk) for chunk in chunks]) @ self.clause_matrix.T
+
+    def map(self, text: Optional[str]) -> List[ClauseMatch]:
+        chunks = chunk_text(text or "", settings.evidence_chunk_words, settings.evidence_max_chunks)
+        if not chunks:
+            return []
+        scores = self.similarities(chunks)
+        best = scores.max(axis=0)
+        ranked = [int(idx) for idx in np.argsort(-best) if best[idx] >= settings.evidence_min_similarity]
+        matches = []
+        for idx in ranked[:settings.evidence_max_clauses]:
+            top = sorted(int(i) for i in np.argsort(-scores[:, idx])[:settings.evidence_excerpt_chunks])
+            matches.append(ClauseMatch(idx, round(float(best[idx]), 4), top, EXCERPT_GAP.join(chunks[i] for i in top)))
+        return matches
+
+
+# Global instance
+evidence_mapper = EvidenceMapper(settings.search_embedding_dim)
@@ -0,0 +1,101 @@
+# app/services/fake_llm.py
+
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+from app.config import settings
+from app.services.prompts import AGENT_QUERY, ANSWER_GRADING
+
+_SENTENCES = [
+    "This is a simulated reply produced without calling a model.",
+    "The clause asks for documented evidence that the control is defined, implemented and reviewed.",
+    "Records such as policies, meeting minutes and audit logs are typical evidence.",
+    "Consider who owns the control and how often its effectiveness is checked.",
+    "Gaps should be tracked in the risk treatment plan with an owner and a due date.",
+]
+STREAM_CHUNK_CHARS = 16
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+
+
+def _verdict(score: float) -> str:
+    if score >= 0.75:
+        return "compliant"
+    if score >= 0.4:
+        return "partial"
+    return "non_compliant" if score > 0 else "insufficient"
+
+
+class FakeLLM:
+    """
+    Deterministic stand-in for the OpenAI models, switched on with
+    ``FAKE_LLM=true`` for load tests and traffic replay. Every gateway call is
+    answered with a reply shaped like the real one for its prompt (agent
+    replies and grades are valid JSON, an answer always gets the same grade)
+    after ``fake_llm_latency_ms`` plus ``fake_llm_ms_per_token`` per reply
+    token, so timings stay comparable between runs.
+    """
+
+    def __init__(self, enabled: bool, latency_ms: float, ms_per_token: float, reply_words: int):
+        self.enabled = enabled
+        self.latency_ms = latency_ms
+        self.ms_per_token = ms_per_token
+        self.reply_words = reply_words
+
+    def reply(self, prompt_name: str, content: str) -> str:
+        """The canned reply for a prompt, chosen from a hash of the message"""
+        if prompt_name == ANSWER_GRADING:
+            return self._grades(content)
+        words: List[str] = []
+        i = _seed(content)
+        while len(words) < self.reply_words:
+            words.extend(_SENTENCES[i % len(_SENTENCES)].split())
+            i += 1
+        text = " ".join(words[:self.reply_words])
+        if prompt_name == AGENT_QUERY:
+            return json.dumps({"response": text, "advance_clause": False, "previous_clause": False})
+        return text
+
+    def _grades(self, content: str) -> str:
+        start = content.find("{")
+        items: List[Dict[str, Any]] = []
+        if start != -1:
+            try:
+                items = json.JSONDecoder().raw_decode(content, start)[0].get("items", [])
+            except ValueError:
+                pass
+        grades = []
+        for item in items:
+            score = round(_seed(item.get("answer") or "") % 101 / 100, 2)
+            grades.append({"id": item.get("id"), "score": score, "verdict": _verdict(score), "rationale": "Simulated grade."})
+        return json.dumps({"grades": grades})
+
+    def _delay(self, text: str) -> float:
+        return (self.latency_ms + self.ms_per_token * max(1, len(text) // 4)) / 1000
+
+    async def complete(self, prompt_name: str, content: str) -> str:
+        text = self.reply(prompt_name, content)
+        await asyncio.sleep(self._delay(text))
+        return text
+
+    async def stream(self, prompt_name: str, content: str) -> AsyncIterator[str]:
+        text = self.reply(prompt_name, content)
+        await asyncio.sleep(self.latency_ms / 1000)
+        per_chunk = self.ms_per_token * STREAM_CHUNK_CHARS / 4 / 1000
+        for i in range(0, len(text), STREAM_CHUNK_CHARS):
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            yield text[i:i + STREAM_CHUNK_CHARS]
+
+
+# Global instance
+fake_llm = FakeLLM(
+    settings.fake_llm,
+    settings.fake_llm_latency_ms,
+    settings.fake_llm_ms_per_token,
+    settings.fake_llm_reply_words
+)
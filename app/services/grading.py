@@ -0,0 +1,343 @@
+# app/services/grading.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Any, List, Literal, Optional
+
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field, ValidationError
+from pymongo import ReturnDocument, UpdateOne
+
+from app.config import settings
+from app.services.audit_engine import CLAUSE_METADATA
+from app.services.llm_gateway import llm_gateway
+from app.services.mongo_client import db
+from app.services.prompts import ANSWER_GRADING, prompt_registry
+from app.services.scoring import SKIP_ANSWER
+from app.services.session_events import SCORE_UPDATED, session_events
+from app.services.tenancy import current_tenant, tenant_scope
+from app.services.usage_ledger import usage_scope
+
+logger = logging.getLogger("uvicorn")
+
+GRADING_DEFERRED = "deferred"
+RETRY_CLAIM_MINUTES = 10   # a resubmitted answer not graded by then is retried
+
+
+class Grade(BaseModel):
+    id: str
+    score: float = Field(ge=0.0, le=1.0)
+    verdict: Literal["compliant", "partial", "non_compliant", "insufficient"]
+    rationale: str = ""
+
+
+class GradeBatch(BaseModel):
+    grades: List[Grade]
+
+
+def normalize_answer(answer: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys"""
+    return re.sub(r"\s+", " ", answer.strip().lower()).strip(" .!")
+
+
+def cache_key(clause_index: int, answer: str, prompt_version: str, model: str) -> str:
+    """Grades are reused only for the same grading prompt version and model"""
+    digest = hashlib.sha256(normalize_answer(answer).encode()).hexdigest()
+    return f"{model}:{prompt_version}:{clause_index}:{digest}"
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff before the next grading attempt"""
+    seconds = settings.grading_retry_seconds * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.grading_retry_max_seconds))
+
+
+class AnswerGrader:
+    """
+    Grades recorded answers with the LLM off the request path.
+
+    ``submit`` only enqueues. A worker drains the queue in batches of up to
+    ``grading_batch_size`` (waiting at most ``grading_batch_window_ms`` to fill
+    one), answers what it can from the (clause, normalized answer) cache, sends
+    the rest in one structured-output request, and writes the grades onto the
+    response documents. Answers the LLM could not grade (provider down,
+    malformed reply) are marked ``grading_status: deferred`` with a backoff
+    ``grading_retry_at``; the deferred-analysis worker resubmits them.
+    """
+
+    def __init__(self):
+        self.llm = ChatOpenAI(
+            model=settings.grading_model,
+            temperature=0,
+            max_tokens=1500,
+            api_key=settings.openai_api_key,
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: Dict[str, int] = {}
+        self._idle: Dict[str, asyncio.Event] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._late_handlers: List[Callable[[str], Awaitable[None]]] = []
+
+    # ─── Producer side ────────────────────────────────────────────
+
+    def on_late_grade(self, handler: Callable[[str], Awaitable[None]]) -> None:
+        """Call ``handler`` with the session id whenever a retried answer is graded"""
+        self._late_handlers.append(handler)
+
+    def submit(
+        self,
+        response_id: Any,
+        session_id: str,
+        clause_index: int,
+        answer: str,
+        attempts: int = 0
+    ) -> None:
+        """Queue an answer for grading; returns immediately"""
+        if answer == SKIP_ANSWER or not answer.strip():
+            return
+        self.start()
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self._idle.setdefault(session_id, asyncio.Event()).clear()
+        self._queue.put_nowait({
+            "response_id": response_id,
+            "session_id": session_id,
+            "tenant_id": current_tenant(),
+            "clause_index": clause_index,
+            "answer": answer,
+            "attempts": attempts,
+        })
+
+    def pending(self, session_id: str) -> bool:
+        """True while a session has answers queued or being graded"""
+        return bool(self._pending.get(session_id))
+
+    async def wait_for(self, session_id: str, timeout: float) -> bool:
+        """Wait until a session has no grades in flight; False on timeout"""
+        if not self._pending.get(session_id):
+            return True
+        try:
+            await asyncio.wait_for(self._idle[session_id].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # ─── Worker ───────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + settings.grading_batch_window_ms / 1000
+        while len(batch) < settings.grading_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._grade_batch(batch)
+            except Exception as e:
+                logger.warning(f"Answer grading failed for {len(batch)} answers: {e}")
+                try:
+                    await self._defer(batch)
+                except Exception as e:
+                    logger.warning(f"Could not defer {len(batch)} ungraded answers: {e}")
+            finally:
+                for item in batch:
+                    self._done(item["session_id"])
+
+    def _done(self, session_id: str) -> None:
+        remaining = self._pending.get(session_id, 1) - 1
+        if remaining > 0:
+            self._pending[session_id] = remaining
+            return
+        self._pending.pop(session_id, None)
+        event = self._idle.pop(session_id, None)
+        if event:
+            event.set()
+
+    # ─── Grading ──────────────────────────────────────────────────
+
+    async def _lookup(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {k: self._cache[k] for k in keys if k in self._cache}
+        missing = [k for k in keys if k not in found]
+        if missing:
+            async for doc in db.grade_cache.find({"_id": {"$in": missing}}):
+                found[doc["_id"]] = doc["grade"]
+                self._remember(doc["_id"], doc["grade"])
+        return found
+
+    def _remember(self, key: str, grade: Dict[str, Any]) -> None:
+        self._cache[key] = grade
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.grading_cache_size:
+            self._cache.popitem(last=False)
+
+    async def _grade_batch(self, batch: List[Dict[str, Any]]) -> None:
+        version = prompt_registry.get(ANSWER_GRADING).version
+        for item in batch:
+            item["key"] = cache_key(item["clause_index"], item["answer"], version, settings.grading_model)
+        grades = await self._lookup(list({item["key"] for item in batch}))
+
+        # One LLM item per distinct uncached (clause, answer)
+        to_grade: Dict[str, Dict[str, Any]] = {}
+        for item in batch:
+            if item["key"] not in grades:
+                to_grade.setdefault(item["key"], item)
+        if to_grade:
+            # One request per tenant so usage is charged to the right one
+            by_tenant: Dict[str, List[Dict[str, Any]]] = {}
+            for item in to_grade.values():
+                by_tenant.setdefault(item["tenant_id"], []).append(item)
+            fresh: Dict[str, Dict[str, Any]] = {}
+            for tenant_id, items in by_tenant.items():
+                try:
+                    with tenant_scope(tenant_id):
+                        fresh.update(await self._ask_llm(items))
+                except Exception as e:
+                    logger.warning(f"Grading {len(items)} answers failed, deferring them: {e}")
+            now = datetime.utcnow()
+            for key, grade in fresh.items():
+                grades[key] = grade
+                self._remember(key, grade)
+            if fresh:
+                await db.grade_cache.bulk_write(
+                    [UpdateOne({"_id": k}, {"$set": {"grade": g, "created_at": now}}, upsert=True) for k, g in fresh.items()],
+                    ordered=False
+                )
+
+        updates = [
+            UpdateOne(
+                {"_id": item["response_id"]},
+                {"$set": {"grade": grades[item["key"]]}, "$unset": {"grading_status": "", "grading_retry_at": ""}}
+            )
+            for item in batch if item["key"] in grades
+        ]
+        if updates:
+            await db.responses.bulk_write(updates, ordered=False)
+        await self._defer([item for item in batch if item["key"] not in grades])
+        for session_id in {item["session_id"] for item in batch if item["attempts"] and item["key"] in grades}:
+            for handler in self._late_handlers:
+                await handler(session_id)
+        for item in batch:
+            grade = grades.get(item["key"])
+            if grade:
+                session_events.publish(item["session_id"], SCORE_UPDATED, {
+                    "clause_index": item["clause_index"],
+                    "score": grade["score"],
+                    "verdict": grade["verdict"]
+                })
+
+    async def _defer(self, items: List[Dict[str, Any]]) -> None:
+        """Mark ungraded answers for a later attempt, or give up after ``grading_max_attempts``"""
+        now = datetime.utcnow()
+        updates = []
+        for item in items:
+            attempts = item["attempts"] + 1
+            if attempts >= settings.grading_max_attempts:
+                logger.warning(f"Giving up grading response {item['response_id']} after {attempts} attempts")
+                update = {"$set": {"grading_attempts": attempts}, "$unset": {"grading_status": "", "grading_retry_at": ""}}
+            else:
+                update = {"$set": {
+                    "grading_status": GRADING_DEFERRED,
+                    "grading_attempts": attempts,
+                    "grading_retry_at": now + retry_delay(attempts),
+                }}
+            updates.append(UpdateOne({"_id": item["response_id"]}, update))
+        if updates:
+            await db.responses.bulk_write(updates, ordered=False)
+
+    async def resubmit_deferred(self, limit: int) -> int:
+        """
+        Queue deferred answers whose backoff has passed, oldest first. Each is
+        claimed by moving its ``grading_retry_at`` forward, so other workers
+        skip it and it is retried if this worker stops before grading it.
+        """
+        queued = 0
+        while queued < limit:
+            now = datetime.utcnow()
+            doc = await db.responses.find_one_and_update(
+                {"grading_status": GRADING_DEFERRED, "grading_retry_at": {"$lte": now}},
+                {"$set": {"grading_retry_at": now + timedelta(minutes=RETRY_CLAIM_MINUTES)}},
+                sort=[("grading_retry_at", 1)],
+                projection={"session_id": 1, "tenant_id": 1, "clause_index": 1, "answer": 1, "grading_attempts": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                break
+            with tenant_scope(doc.get("tenant_id")):
+                self.submit(doc["_id"], doc["session_id"], doc["clause_index"], doc["answer"], doc.get("grading_attempts", 0))
+            queued += 1
+        return queued
+
+    async def _ask_llm(self, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        payload = []
+        for i, item in enumerate(items):
+            clause = CLAUSE_METADATA[item["clause_index"]] if item["clause_index"] < len(CLAUSE_METADATA) else {}
+            payload.append({
+                "id": str(i),
+                "clause": clause.get("question"),
+                "requirements": clause.get("attributes", []),
+                "answer": item["answer"],
+            })
+        prompt = prompt_registry.get(ANSWER_GRADING)
+        messages = prompt.messages(payload=json.dumps({"items": payload}, ensure_ascii=False))
+        allocations = [{"session_id": item["session_id"], "clause_index": item["clause_index"]} for item in items]
+        with usage_scope(endpoint="background:grading", allocations=allocations):
+            raw = await llm_gateway.chat(self.llm, prompt, messages, enforce_quota=False)
+        try:
+            parsed = GradeBatch.model_validate_json(raw)
+        except ValidationError as e:
+            logger.warning(f"Discarding malformed grading response: {e}")
+            return {}
+
+        results = {}
+        for grade in parsed.grades:
+            if grade.id.isdigit() and int(grade.id) < len(items):
+                results[items[int(grade.id)]["key"]] = {
+                    "score": grade.score,
+                    "verdict": grade.verdict,
+                    "rationale": grade.rationale,
+                    "model": settings.grading_model,
+                    "prompt_version": prompt.version,
+                }
+        return results
+
+
+async def load_grades(session_id: str) -> Dict[int, Dict[str, Any]]:
+    """Latest stored grade per clause for a session (ungraded clauses are omitted)"""
+    responses = await db.responses.find(
+        {"session_id": session_id},
+        {"_id": 0, "clause_index": 1, "grade": 1}
+    ).sort("answered_at", 1).to_list(length=None)
+    latest = {r["clause_index"]: r.get("grade") for r in responses}
+    return {idx: grade for idx, grade in latest.items() if grade}
+
+
+# Global instance
+answer_grader = AnswerGrader()
@@ -0,0 +1,70 @@
+# app/services/guidance_fallback.py
+
+import re
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from app.config import settings
+
+UNAVAILABLE = "The assistant is temporarily unavailable"
+CLOSING = "You can still record your answer or upload documents; uploads are analysed as soon as the assistant is back."
+
+
+def _normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower()).strip(" ?.!")
+
+
+def clause_guidance(clause_index: int) -> str:
+    """Precomputed guidance for a clause, built from its metadata"""
+    from app.services.audit_engine import CLAUSE_METADATA
+
+    if not 0 <= clause_index < len(CLAUSE_METADATA):
+        return f"{UNAVAILABLE}. The audit is complete and the final report can still be viewed."
+    clause = CLAUSE_METADATA[clause_index]
+    evidence = ", ".join(clause.get("attributes", []))
+    return (
+        f"{UNAVAILABLE}, so here is the standard guidance for this clause.\n\n"
+        f"**{clause['question']}**\n{clause['description']}\n\n"
+        + (f"Evidence usually covers: {evidence}.\n\n" if evidence else "")
+        + CLOSING
+    )
+
+
+class GuidanceFallback:
+    """
+    Replies for when the LLM cannot be reached. Successful agent replies are
+    remembered per (clause, normalized question) in a bounded LRU; a repeat
+    question gets the remembered reply, anything else the clause's
+    precomputed guidance. Both are marked as degraded for the client.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._replies: "OrderedDict[Tuple[int, str], str]" = OrderedDict()
+        self.served_cached = 0
+        self.served_guidance = 0
+
+    def remember(self, clause_index: int, query: str, reply: str) -> None:
+        key = (clause_index, _normalize(query))
+        self._replies[key] = reply
+        self._replies.move_to_end(key)
+        while len(self._replies) > self.size:
+            self._replies.popitem(last=False)
+
+    def has(self, clause_index: int, query: str) -> bool:
+        return (clause_index, _normalize(query)) in self._replies
+
+    def reply(self, clause_index: int, query: str) -> str:
+        cached = self._replies.get((clause_index, _normalize(query)))
+        if cached is not None:
+            self.served_cached += 1
+            return f"{UNAVAILABLE}; this is the earlier answer to the same question on this clause.\n\n{cached}"
+        self.served_guidance += 1
+        return clause_guidance(clause_index)
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached_replies": len(self._replies), "served_cached": self.served_cached, "served_guidance": self.served_guidance}
+
+
+# Global instance
+guidance_fallback = GuidanceFallback(settings.fallback_cache_size)
@@ -0,0 +1,346 @@
+# app/services/ingestion.py
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import re
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from bson import Binary
+
+from app.config import settings
+from app.services.mongo_client import db
+from app.services.storage import storage
+
+logger = logging.getLogger("uvicorn")
+
+try:  # pypdf is in requirements.txt; a broken install should not take uploads down with it
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - depends on the deployment
+    PdfReader = None
+    logger.warning("pypdf is not installed: PDFs will be ingested without text")
+
+STATUS_PENDING = "pending"
+STATUS_READY = "ready"
+STATUS_UNSUPPORTED = "unsupported"
+STATUS_TOO_LARGE = "too_large"
+STATUS_FAILED = "failed"
+
+CHUNK_SIZE = 1024 * 1024
+CLAIM_MINUTES = 10   # a claimed ingestion not finished by then (worker restarted) may be claimed again
+CLAIM_POLL_SECONDS = 0.5
+TEXT_MIME_TYPES = {"text/plain", "text/csv", "text/markdown", "application/json", "application/xml"}
+OOXML_MIME_TYPES = {
+    "word/": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xl/": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ppt/": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+EXTENSION_TEXT_TYPES = {".csv": "text/csv", ".md": "text/markdown", ".json": "application/json", ".xml": "application/xml"}
+
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+# ─── Sniffing and extraction ─────────────────────────────────────
+
+class _BufferReader(io.RawIOBase):
+    """Seekable file-like view over a bytes-like buffer (e.g. a memory map) without copying it"""
+
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        n = max(0, min(len(buffer), len(self._view) - self._pos))
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        self._view.release()      # a live export would keep the mapping from closing
+        super().close()
+
+
+def sniff_mime(data: bytes, filename: str = "") -> str:
+    """MIME type from the file's leading bytes; the extension only refines plain text"""
+    head = data[:8]
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with _BufferReader(data) as stream, zipfile.ZipFile(stream) as archive:
+                names = archive.namelist()
+        except zipfile.BadZipFile:
+            return "application/zip"
+        for prefix, mime in OOXML_MIME_TYPES.items():
+            if any(name.startswith(prefix) for name in names):
+                return mime
+        return "application/zip"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "application/x-ole-storage"     # legacy .doc/.xls
+    sample = data[:4096]
+    if b"\x00" in sample:
+        return "application/octet-stream"
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(sample) - 4:         # not just a multibyte char cut at the boundary
+            return "application/octet-stream"
+    return EXTENSION_TEXT_TYPES.get(os.path.splitext(filename)[1].lower(), "text/plain")
+
+
+def _pdf_text(data: bytes) -> Tuple[str, Optional[int]]:
+    if PdfReader is None:
+        return "", len(_PDF_PAGE_RE.findall(data)) or None
+    with _BufferReader(data) as stream:
+        pages = [page.extract_text() or "" for page in PdfReader(stream).pages]
+    return "\n\n".join(pages), len(pages)
+
+
+def _docx_text(data: bytes) -> Tuple[str, Optional[int]]:
+    with _BufferReader(data) as stream, zipfile.ZipFile(stream) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+        pages = None
+        if "docProps/app.xml" in archive.namelist():
+            match = re.search(rb"<Pages>(\d+)</Pages>", archive.read("docProps/app.xml"))
+            pages = int(match.group(1)) if match else None
+    paragraphs = ["".join(t.text or "" for t in p.iter(f"{_W_NS}t")) for p in root.iter(f"{_W_NS}p")]
+    return "\n".join(p for p in paragraphs if p), pages
+
+
+def _ooxml_strings(data: bytes, prefix: str) -> str:
+    """Visible text of a spreadsheet (shared strings) or a slide deck"""
+    with _BufferReader(data) as stream, zipfile.ZipFile(stream) as archive:
+        names = sorted(n for n in archive.namelist() if n.startswith(prefix) and n.endswith(".xml"))
+        parts = []
+        for name in names:
+            root = ElementTree.fromstring(archive.read(name))
+            parts.extend(el.text for el in root.iter() if el.tag.endswith("}t") and el.text)
+    return "\n".join(parts)
+
+
+def extract_text(data: bytes, mime_type: str) -> Tuple[Optional[str], Optional[int]]:
+    """(text, page_count) for a supported type; text is None when the type is unsupported"""
+    if mime_type == "application/pdf":
+        return _pdf_text(data)
+    if mime_type == OOXML_MIME_TYPES["word/"]:
+        return _docx_text(data)
+    if mime_type == OOXML_MIME_TYPES["xl/"]:
+        return _ooxml_strings(data, "xl/sharedStrings"), None
+    if mime_type == OOXML_MIME_TYPES["ppt/"]:
+        return _ooxml_strings(data, "ppt/slides/slide"), None
+    if mime_type in TEXT_MIME_TYPES:
+        return bytes(data).decode("utf-8", errors="replace"), None
+    return None, None
+
+
+def compress_text(text: str) -> Binary:
+    return Binary(zlib.compress(text.encode("utf-8"), 6))
+
+
+def decompress_text(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+# ─── Pipeline ────────────────────────────────────────────────────
+
+class IngestionPipeline:
+    """
+    Prepares uploaded evidence as soon as the upload completes.
+
+    ``submit`` enqueues the object key; ``ingestion_workers`` workers then HEAD
+    the object, stream it once to hash it (SHA-256) and sniff its type, extract
+    its text and page count, and store the results on the upload record with
+    the text zlib-compressed. Document analysis later reads the prepared text
+    instead of fetching and parsing the file on the request path.
+
+    The queue is per worker process, so each job is claimed in Mongo
+    (``ingest.claimed_at``) before it runs. A reader that finds an upload
+    still pending and not queued locally (queued on another worker, or lost
+    with a restart) claims and runs it itself; a stale claim is taken over.
+    """
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._done: Dict[str, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    # ─── Producer side ────────────────────────────────────────────
+
+    def submit(self, key: str) -> None:
+        """Queue an uploaded object for ingestion"""
+        self.start()
+        self._done.setdefault(key, asyncio.Event()).clear()
+        self._queue.put_nowait(key)
+
+    async def wait_for(self, key: str, timeout: float) -> bool:
+        """Wait until a queued key has been ingested; False on timeout"""
+        event = self._done.get(key)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # ─── Workers ──────────────────────────────────────────────────
+
+    def start(self) -> None:
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < settings.ingestion_workers:
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            key = await self._queue.get()
+            try:
+                await self.ingest(key)
+            except Exception as e:
+                logger.warning(f"Ingestion failed for {key}: {e}")
+            finally:
+                event = self._done.pop(key, None)
+                if event:
+                    event.set()
+
+    async def _claim(self, key: str) -> Optional[Dict[str, Any]]:
+        """Atomically claim a pending (or never ingested) upload; None if it is done or claimed elsewhere"""
+        now = datetime.utcnow()
+        return await db.uploads.find_one_and_update(
+            {"key": key, "$or": [
+                {"ingest": {"$exists": False}},
+                {"ingest.status": STATUS_PENDING, "ingest.claimed_at": None},
+                {"ingest.status": STATUS_PENDING, "ingest.claimed_at": {"$lt": now - timedelta(minutes=CLAIM_MINUTES)}},
+            ]},
+            {"$set": {"ingest.status": STATUS_PENDING, "ingest.claimed_at": now}},
+            projection={"filename": 1}
+        )
+
+    async def ingest(self, key: str) -> Optional[Dict[str, Any]]:
+        """Claim one object, ingest it now and store the result on its upload record; None if not claimed"""
+        record = await self._claim(key)
+        if record is None:
+            return None
+        filename = record.get("filename") or key
+        try:
+            result = await asyncio.to_thread(self._process, key, filename)
+        except Exception as e:
+            result = {"ingest": {"status": STATUS_FAILED, "error": str(e)}}
+        result["ingest"]["ingested_at"] = datetime.utcnow()
+        await db.uploads.update_one({"key": key}, {"$set": result})
+        info = result["ingest"]
+        logger.info(
+            f"ingest key={key} status={info['status']} mime={info.get('mime_type')} "
+            f"bytes={info.get('size')} pages={info.get('page_count')} chars={info.get('text_chars')}"
+        )
+        return result
+
+    def _process(self, key: str, filename: str) -> Dict[str, Any]:
+        """Blocking part of ingestion; runs in a worker thread"""
+        max_bytes = settings.ingestion_max_mb * 1024 * 1024
+        head = storage.head(key)
+        info: Dict[str, Any] = {
+            "status": STATUS_PENDING,
+            "size": head.size,
+            "etag": head.etag,
+            "declared_content_type": head.content_type,
+        }
+        if head.size > max_bytes:
+            digest = hashlib.sha256()
+            for i, chunk in enumerate(storage.iter_range(key)):
+                digest.update(chunk)
+                if i == 0:
+                    info["mime_type"] = sniff_mime(chunk, filename)
+            info["sha256"] = digest.hexdigest()
+            info["status"] = STATUS_TOO_LARGE
+            return {"ingest": info}
+
+        with storage.open_buffer(key) as data:
+            info["sha256"] = hashlib.sha256(data).hexdigest()
+            info["mime_type"] = sniff_mime(data, filename)
+            text, pages = extract_text(data, info["mime_type"])
+        info["page_count"] = pages
+        if text is None:
+            info["status"] = STATUS_UNSUPPORTED
+            return {"ingest": info}
+
+        text = text.strip()
+        info["truncated"] = len(text) > settings.ingestion_max_text_chars
+        text = text[:settings.ingestion_max_text_chars]
+        info["text_chars"] = len(text)
+        info["status"] = STATUS_READY
+        return {"ingest": info, "text_z": compress_text(text)}
+
+    # ─── Readers ──────────────────────────────────────────────────
+
+    async def document_text(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Ingestion result for an uploaded key with its text decompressed, waiting
+        up to ``ingestion_wait_seconds`` if it is still pending. None if the key
+        was never recorded as an upload.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ingestion_wait_seconds
+        await self.wait_for(key, settings.ingestion_wait_seconds)
+        record = await self._record(key)
+        if record is None:
+            return None
+        if _is_pending(record) and key not in self._done:
+            # Recorded before ingestion existed, queued on another worker, or lost
+            # with a restart: run it here unless someone else holds a live claim
+            self.submit(key)
+            await self.wait_for(key, max(0.0, deadline - loop.time()))
+            record = await self._record(key)
+        while _is_pending(record) and loop.time() < deadline:
+            await asyncio.sleep(CLAIM_POLL_SECONDS)    # claimed by another worker
+            record = await self._record(key)
+        info = dict(record.get("ingest") or {"status": STATUS_PENDING})
+        info.pop("claimed_at", None)
+        info["text"] = decompress_text(record["text_z"]) if record.get("text_z") else None
+        return info
+
+    @staticmethod
+    async def _record(key: str) -> Optional[Dict[str, Any]]:
+        return await db.uploads.find_one({"key": key}, {"ingest": 1, "text_z": 1})
+
+
+def _is_pending(record: Dict[str, Any]) -> bool:
+    return "ingest" not in record or record["ingest"].get("status") == STATUS_PENDING
+
+
+# Global instance
+ingestion_pipeline = IngestionPipeline()
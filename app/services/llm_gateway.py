@@ -0,0 +1,223 @@
+# app/services/llm_gateway.py
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain.schema import BaseMessage
+
+from app.config import settings
+from app.services import profiler
+from app.services.circuit_breaker import CircuitOpen, llm_breaker
+from app.services.fake_llm import fake_llm
+from app.services.prompts import PromptTemplate
+from app.services.tenancy import current_tenant
+from app.services.tenant_scheduler import estimate_tokens, tenant_scheduler
+from app.services.usage_ledger import usage_ledger
+
+logger = logging.getLogger("uvicorn")
+
+
+class LLMUnavailable(Exception):
+    """The provider is failing or too slow: its circuit is open or the call missed its deadline"""
+
+
+@dataclass
+class LLMCall:
+    """What the gateway records for every LLM call"""
+    tenant_id: str
+    prompt: str
+    prompt_version: str
+    model: Optional[str]
+    latency_ms: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+
+def _usage_counts(usage: Dict[str, Any]) -> Dict[str, int]:
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or 0),
+    }
+
+
+def _estimated_usage(prompt_tokens: int, text: str) -> Dict[str, int]:
+    """Usage for calls that report none (streams, the fake model)"""
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": estimate_tokens(len(text))}
+
+
+class LLMGateway:
+    """
+    Single path for LLM calls. Each call waits for a slot in the tenant fair
+    queue, is tagged with the prompt template's name and version hash, timed,
+    and its token usage (including prompt-cache hits) is logged, charged to the
+    tenant, folded into per-prompt counters and written to the usage ledger.
+    With ``FAKE_LLM=true`` the model is replaced by ``fake_llm`` behind the
+    same queueing and accounting.
+
+    ``enforce_quota=False`` is for background work (grading, report
+    narratives) that should wait for capacity rather than fail; its usage is
+    still charged.
+
+    Provider calls run under ``llm_breaker`` and a per-prompt deadline
+    (``llm_timeouts``, else ``llm_timeout_seconds``). Both failures raise
+    ``LLMUnavailable``; while the circuit is open calls fail before queueing
+    for a slot. Blocking client calls use their own thread pool so a stalled
+    provider cannot starve the default executor other endpoints rely on.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=settings.llm_executor_threads, thread_name_prefix="llm")
+
+    @staticmethod
+    def _check_available() -> None:
+        if not llm_breaker.available:
+            llm_breaker.rejected += 1
+            raise LLMUnavailable(f"{llm_breaker.name} is unavailable (circuit open)")
+
+    @staticmethod
+    async def _provider_call(prompt: PromptTemplate, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run one provider call under the circuit breaker and the prompt's deadline"""
+        timeout = settings.llm_timeouts.get(prompt.name, settings.llm_timeout_seconds)
+        try:
+            with llm_breaker.guard():
+                return await asyncio.wait_for(call(), timeout)
+        except CircuitOpen as e:
+            raise LLMUnavailable(str(e)) from None
+        except asyncio.TimeoutError:
+            raise LLMUnavailable(f"{prompt.name} missed its {timeout:g}s deadline") from None
+
+    async def chat(
+        self,
+        llm,
+        prompt: PromptTemplate,
+        messages: List[BaseMessage],
+        enforce_quota: bool = True
+    ) -> str:
+        """Call a LangChain chat model and return the reply text"""
+        tenant_id = current_tenant()
+        cost = estimate_tokens(sum(len(m.content) for m in messages))
+        self._check_available()
+        async with tenant_scheduler.slot(tenant_id, cost, enforce_quota):
+            started = time.perf_counter()
+            if fake_llm.enabled:
+                text = await self._provider_call(prompt, lambda: fake_llm.complete(prompt.name, messages[-1].content))
+                self._record(tenant_id, prompt, "fake", started, _estimated_usage(cost, text))
+                return text
+            result = await self._provider_call(prompt, lambda: llm.agenerate([messages]))
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        self._record(tenant_id, prompt, getattr(llm, "model_name", None), started, usage)
+        return result.generations[0][0].message.content
+
+    async def stream(
+        self,
+        llm,
+        prompt: PromptTemplate,
+        messages: List[BaseMessage],
+        on_token: Callable[[str], Awaitable[None]],
+        enforce_quota: bool = True
+    ) -> str:
+        """
+        Like ``chat`` but passes each token to ``on_token`` as it arrives.
+        Streamed responses carry no usage block, so tokens are estimated
+        from the text for accounting.
+        """
+        tenant_id = current_tenant()
+        cost = estimate_tokens(sum(len(m.content) for m in messages))
+        parts: List[str] = []
+
+        async def consume() -> None:
+            if fake_llm.enabled:
+                chunks = fake_llm.stream(prompt.name, messages[-1].content)
+            else:
+                chunks = (chunk.content async for chunk in llm.astream(messages))
+            async for content in chunks:
+                if content:
+                    parts.append(content)
+                    await on_token(content)
+
+        self._check_available()
+        async with tenant_scheduler.slot(tenant_id, cost, enforce_quota):
+            started = time.perf_counter()
+            await self._provider_call(prompt, consume)
+        text = "".join(parts)
+        model = "fake" if fake_llm.enabled else getattr(llm, "model_name", None)
+        self._record(tenant_id, prompt, model, started, _estimated_usage(cost, text))
+        return text
+
+    async def chat_completions(
+        self,
+        client,
+        prompt: PromptTemplate,
+        messages: List[Dict[str, str]],
+        enforce_quota: bool = True,
+        **kwargs
+    ) -> str:
+        """Call the raw OpenAI v1 client (off the event loop, in the gateway's pool) and return the reply text"""
+        tenant_id = current_tenant()
+        cost = estimate_tokens(sum(len(m["content"]) for m in messages))
+        # Let the client give up too, so a timed-out call frees its thread
+        kwargs.setdefault("timeout", settings.llm_timeouts.get(prompt.name, settings.llm_timeout_seconds))
+        create = partial(client.chat.completions.create, messages=messages, **kwargs)
+        self._check_available()
+        async with tenant_scheduler.slot(tenant_id, cost, enforce_quota):
+            started = time.perf_counter()
+            if fake_llm.enabled:
+                text = await self._provider_call(prompt, lambda: fake_llm.complete(prompt.name, messages[-1]["content"]))
+                self._record(tenant_id, prompt, "fake", started, _estimated_usage(cost, text))
+                return text
+            loop = asyncio.get_running_loop()
+            response = await self._provider_call(prompt, lambda: loop.run_in_executor(self._executor, create))
+        usage = response.usage.model_dump() if getattr(response, "usage", None) else {}
+        self._record(tenant_id, prompt, kwargs.get("model"), started, usage)
+        return response.choices[0].message.content
+
+    def _record(
+        self,
+        tenant_id: str,
+        prompt: PromptTemplate,
+        model: Optional[str],
+        started: float,
+        usage: Dict[str, Any]
+    ) -> LLMCall:
+        call = LLMCall(
+            tenant_id=tenant_id,
+            prompt=prompt.name,
+            prompt_version=prompt.version,
+            model=model,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            **_usage_counts(usage)
+        )
+        tenant_scheduler.charge(tenant_id, call.prompt_tokens, call.completion_tokens)
+        profiler.note_llm_call(prompt.label, model, call.latency_ms, call.prompt_tokens, call.completion_tokens)
+        usage_ledger.record(call)
+        stats = self._stats.setdefault(prompt.label, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "latency_ms": 0.0
+        })
+        stats["calls"] += 1
+        stats["prompt_tokens"] += call.prompt_tokens
+        stats["completion_tokens"] += call.completion_tokens
+        stats["cached_tokens"] += call.cached_tokens
+        stats["latency_ms"] += call.latency_ms
+        logger.info(
+            f"llm tenant={tenant_id} prompt={prompt.label} model={model} latency_ms={call.latency_ms:.0f} "
+            f"prompt_tokens={call.prompt_tokens} cached_tokens={call.cached_tokens} "
+            f"completion_tokens={call.completion_tokens}"
+        )
+        return call
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per prompt@version totals since process start"""
+        return {label: dict(values) for label, values in self._stats.items()}
+
+
+# Global instance
+llm_gateway = LLMGateway()
@@ -0,0 +1,242 @@
+# app/services/model_router.py
+
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from langchain_openai import ChatOpenAI
+
+from app.config import settings
+from app.services.mongo_client import db
+from app.services.usage_ledger import usage_scope
+
+logger = logging.getLogger("uvicorn")
+
+STRONG = "strong"
+FAST = "fast"
+AUTO = "auto"
+MODES = ("off", "shadow", "on")
+SHADOW_MAX_INFLIGHT = 4
+
+# Turns that need no clause expertise
+SMALLTALK = {
+    "hi", "hello", "hey", "hi there", "hello there", "good morning", "good afternoon", "good evening",
+    "thanks", "thank you", "thanks a lot", "thank you very much", "ok", "okay", "ok thanks", "cool",
+    "great", "nice", "got it", "understood", "sure", "bye", "goodbye", "how are you", "who are you",
+}
+ANSWER_PREFIXES = ("yes", "no", "we ", "our ", "not yet", "i think", "i believe", "partially", "currently")
+QUESTION_WORDS = ("what", "how", "why", "which", "who", "when", "where", "should", "can", "could", "do", "does", "is", "are")
+# Words that make a turn about the audit rather than small talk
+DOMAIN_TERMS = {
+    "clause", "control", "controls", "evidence", "policy", "policies", "risk", "risks", "isms", "audit",
+    "annex", "comply", "compliance", "compliant", "requirement", "requirements", "procedure", "procedures",
+    "asset", "assets", "incident", "incidents", "access", "supplier", "suppliers", "scope", "iso", "27001",
+    "document", "documents", "documented", "objective", "objectives", "review", "legal", "security",
+    "backup", "backups", "encryption", "soa", "statement", "applicability", "certification", "auditor",
+    "nonconformity", "corrective", "leadership", "competence", "awareness", "monitoring", "measurement",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+@dataclass
+class RouteDecision:
+    """Which model tier serves a turn, and why"""
+    prompt: str
+    tier: str
+    reason: str
+    would_route: str      # the router's own choice, before the mode is applied
+
+
+def classify_turn(text: str) -> RouteDecision:
+    """Rule-based tier for a user turn; anything that is not clearly simple goes to the strong model"""
+    words = _WORD_RE.findall(text.lower())
+    normalized = " ".join(words)
+    if len(words) > settings.router_answer_max_words:
+        return RouteDecision("", STRONG, "long", STRONG)
+    if normalized in SMALLTALK:
+        return RouteDecision("", FAST, "smalltalk", FAST)
+    about_audit = any(word in DOMAIN_TERMS for word in words)
+    is_question = "?" in text or (words and words[0] in QUESTION_WORDS)
+    if not about_audit and len(words) <= settings.router_simple_max_words:
+        return RouteDecision("", FAST, "off_topic", FAST)
+    if not is_question and normalized.startswith(ANSWER_PREFIXES):
+        return RouteDecision("", FAST, "answer", FAST)
+    return RouteDecision("", STRONG, "guidance", STRONG)
+
+
+def _reply_parts(text: str) -> Dict[str, Any]:
+    """Reply text and navigation flags of an agent reply (JSON) or plain text"""
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return {"text": text or "", "flags": None}
+    if not isinstance(data, dict):
+        return {"text": text, "flags": None}
+    return {
+        "text": str(data.get("response", "")),
+        "flags": (bool(data.get("advance_clause")), bool(data.get("previous_clause"))),
+    }
+
+
+def compare_replies(served: str, shadow: str) -> Dict[str, Any]:
+    """Word-set similarity of two replies, and whether their navigation flags agree"""
+    a, b = _reply_parts(served), _reply_parts(shadow)
+    words_a, words_b = set(_WORD_RE.findall(a["text"].lower())), set(_WORD_RE.findall(b["text"].lower()))
+    union = words_a | words_b
+    return {
+        "similarity": round(len(words_a & words_b) / len(union), 3) if union else 1.0,
+        "flags_agree": a["flags"] == b["flags"] if a["flags"] is not None and b["flags"] is not None else None,
+        "served_chars": len(a["text"]),
+        "shadow_chars": len(b["text"]),
+    }
+
+
+class ModelRouter:
+    """
+    Picks the model for interactive LLM turns. Each prompt has a policy in
+    ``router_policies``: ``strong`` (the call site's own model), ``fast``
+    (``router_fast_model`` with ``router_fast_max_tokens``) or ``auto``
+    (``classify_turn`` on the user's text: greetings, off-topic chatter and
+    plain answers go fast, clause guidance and long messages stay strong).
+    Prompts without a policy, such as document analysis, grading and report
+    narratives, always use the strong model.
+
+    ``router_mode`` applies the decisions (``on``), ignores them (``off``) or
+    only evaluates them (``shadow``). In shadow mode the strong model serves
+    every turn and a ``router_shadow_rate`` sample of the turns that would
+    have gone fast is also sent to the fast model in the background. The two
+    replies are compared and stored in ``db.router_shadow``.
+    """
+
+    def __init__(self):
+        self._fast_llm: Optional[ChatOpenAI] = None
+        self._shadow_tasks: Set[asyncio.Task] = set()
+        self.decisions: Dict[str, int] = {}
+        self.shadowed = 0
+        self.shadow_failed = 0
+
+    @property
+    def mode(self) -> str:
+        return settings.router_mode if settings.router_mode in MODES else "off"
+
+    @property
+    def fast_llm(self) -> ChatOpenAI:
+        if self._fast_llm is None:
+            self._fast_llm = ChatOpenAI(
+                model=settings.router_fast_model,
+                temperature=0,
+                max_tokens=settings.router_fast_max_tokens,
+                api_key=settings.openai_api_key
+            )
+        return self._fast_llm
+
+    def fast_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """OpenAI client arguments with the fast model swapped in"""
+        return {**kwargs, "model": settings.router_fast_model, "max_tokens": settings.router_fast_max_tokens}
+
+    def decide(self, prompt_name: str, text: str) -> RouteDecision:
+        policy = settings.router_policies.get(prompt_name, STRONG)
+        if policy == AUTO:
+            decision = classify_turn(text)
+        else:
+            decision = RouteDecision("", policy if policy in (STRONG, FAST) else STRONG, "policy", policy)
+        decision.prompt = prompt_name
+        if self.mode != "on":
+            decision.tier = STRONG
+        key = f"{prompt_name}:{decision.would_route}:{decision.reason}"
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+        return decision
+
+    def llm_for(self, decision: RouteDecision, strong_llm):
+        """LangChain model for a decision"""
+        return self.fast_llm if decision.tier == FAST else strong_llm
+
+    def kwargs_for(self, decision: RouteDecision, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """OpenAI client arguments for a decision"""
+        return self.fast_kwargs(kwargs) if decision.tier == FAST else kwargs
+
+    # ─── Shadow evaluation ────────────────────────────────────────
+
+    def shadow(self, decision: RouteDecision, run_fast: Callable[[], Awaitable[str]], served: str) -> None:
+        """In shadow mode, sometimes replay a turn the router would send fast and compare; never blocks"""
+        if (
+            self.mode != "shadow"
+            or decision.would_route != FAST
+            or len(self._shadow_tasks) >= SHADOW_MAX_INFLIGHT
+            or random.random() >= settings.router_shadow_rate
+        ):
+            return
+        task = asyncio.create_task(self._shadow(decision, run_fast, served))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+
+    async def _shadow(self, decision: RouteDecision, run_fast: Callable[[], Awaitable[str]], served: str) -> None:
+        started = time.perf_counter()
+        try:
+            with usage_scope(endpoint=f"shadow:{decision.prompt}"):
+                reply = await run_fast()
+        except Exception as e:
+            self.shadow_failed += 1
+            logger.info(f"Shadow call for {decision.prompt} failed: {e}")
+            return
+        self.shadowed += 1
+        record = {
+            "created_at": datetime.utcnow(),
+            "prompt": decision.prompt,
+            "reason": decision.reason,
+            "fast_model": settings.router_fast_model,
+            "fast_latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            **compare_replies(served, reply),
+        }
+        try:
+            await db.router_shadow.insert_one(record)
+        except Exception as e:
+            logger.warning(f"Could not store shadow comparison: {e}")
+
+    async def shadow_summary(self) -> List[Dict[str, Any]]:
+        """Shadow comparisons per prompt and reason across all workers"""
+        pipeline = [
+            {"$group": {
+                "_id": {"prompt": "$prompt", "reason": "$reason"},
+                "compared": {"$sum": 1},
+                "avg_similarity": {"$avg": "$similarity"},
+                "flags_agree": {"$sum": {"$cond": [{"$eq": ["$flags_agree", True]}, 1, 0]}},
+                "flags_compared": {"$sum": {"$cond": [{"$eq": ["$flags_agree", None]}, 0, 1]}},
+                "avg_fast_latency_ms": {"$avg": "$fast_latency_ms"},
+            }},
+            {"$sort": {"compared": -1}},
+        ]
+        rows = []
+        async for row in db.router_shadow.aggregate(pipeline):
+            group = row.pop("_id")
+            flags_compared = row.pop("flags_compared")
+            flags_agree = row.pop("flags_agree")
+            rows.append({
+                **group,
+                **row,
+                "avg_similarity": round(row["avg_similarity"] or 0.0, 3),
+                "avg_fast_latency_ms": round(row["avg_fast_latency_ms"] or 0.0, 1),
+                "flag_agreement": round(flags_agree / flags_compared, 3) if flags_compared else None,
+            })
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "fast_model": settings.router_fast_model,
+            "decisions": dict(self.decisions),
+            "shadowed": self.shadowed,
+            "shadow_failed": self.shadow_failed,
+            "shadow_inflight": len(self._shadow_tasks),
+        }
+
+
+# Global instance
+model_router = ModelRouter()
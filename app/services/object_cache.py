@@ -0,0 +1,169 @@
+# app/services/object_cache.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Set
+
+from app.config import settings
+from app.services.storage import CHUNK_SIZE, LocalStorage, ObjectNotFound, StorageBackend, storage
+
+logger = logging.getLogger("uvicorn")
+
+MAX_TRACKED_KEYS = 10000
+
+
+class ObjectCache:
+    """
+    Bounded LRU disk cache in front of a remote storage backend for evidence
+    downloads.
+
+    Object keys are immutable (every upload gets a fresh key), so entries never
+    need invalidating. An object is copied in the background once it has been
+    requested ``min_hits`` times; requests stream from the remote backend until
+    the copy lands. Least recently used files are evicted to stay under
+    ``max_bytes``. Disabled when the backend is already local disk.
+    """
+
+    def __init__(self, backend: StorageBackend, root: str, max_bytes: int, max_object_bytes: int, min_hits: int):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.min_hits = min_hits
+        self.enabled = max_bytes > 0 and not isinstance(backend, LocalStorage)
+        self._files = LocalStorage(root)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()    # cache key -> size, LRU order
+        self._hits: "OrderedDict[str, int]" = OrderedDict()
+        self._filling: Set[str] = set()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            self._load()
+
+    @staticmethod
+    def _cache_key(key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f"{digest[:2]}/{digest}"
+
+    def _load(self) -> None:
+        """Rebuild the index from files left by a previous process, oldest access first"""
+        found = []
+        for dirpath, _, filenames in os.walk(self._files.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.startswith("."):
+                    os.unlink(path)         # interrupted fill
+                    continue
+                st = os.stat(path)
+                found.append((st.st_atime, os.path.relpath(path, self._files.root), st.st_size))
+        for _, cache_key, size in sorted(found):
+            self._entries[cache_key] = size
+            self._size += size
+        self._evict()
+
+    # ─── Reads ────────────────────────────────────────────────────
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Chunks of ``[start, end)`` from the cached copy if present, else from the backend"""
+        cache_key = self._cache_key(key)
+        if self.enabled and cache_key in self._entries:
+            self._entries.move_to_end(cache_key)
+            try:
+                chunks = self._files.iter_range(cache_key, start, end, chunk_size)
+                self.hits += 1
+                return chunks
+            except ObjectNotFound:          # removed from disk behind our back
+                self._size -= self._entries.pop(cache_key)
+        self.misses += 1
+        return self.backend.iter_range(key, start, end, chunk_size)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of a file holding the object (local backend or cached copy), or None to stream from the backend"""
+        path = self.backend.local_path(key)
+        if path is not None:
+            return path
+        cache_key = self._cache_key(key)
+        if self.enabled and cache_key in self._entries:
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return self._files.local_path(cache_key)
+        return None
+
+    def forget(self, key: str) -> None:
+        """Drop a cached copy that disappeared from disk"""
+        cache_key = self._cache_key(key)
+        if cache_key in self._entries:
+            self._size -= self._entries.pop(cache_key)
+
+    def note_request(self, key: str, size: int) -> None:
+        """Count a request and start a background fill once the object is hot"""
+        if not self.enabled or size > self.max_object_bytes:
+            return
+        cache_key = self._cache_key(key)
+        if cache_key in self._entries or cache_key in self._filling:
+            return
+        hits = self._hits.pop(key, 0) + 1
+        if hits < self.min_hits:
+            self._hits[key] = hits
+            while len(self._hits) > MAX_TRACKED_KEYS:
+                self._hits.popitem(last=False)
+            return
+        self._filling.add(cache_key)
+        asyncio.create_task(self._fill(key, cache_key))
+
+    # ─── Fills and eviction ───────────────────────────────────────
+
+    async def _fill(self, key: str, cache_key: str) -> None:
+        try:
+            size = await asyncio.to_thread(self._download, key, cache_key)
+        except Exception as e:
+            logger.warning(f"Object cache fill failed for {key}: {e}")
+            return
+        finally:
+            self._filling.discard(cache_key)
+        self._entries[cache_key] = size
+        self._size += size
+        self._evict()
+
+    def _download(self, key: str, cache_key: str) -> int:
+        path = self._files.local_path(cache_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".fill-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = self.backend.copy_to(key, out)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return size
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            cache_key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._files.delete(cache_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global instance
+object_cache = ObjectCache(
+    storage,
+    settings.download_cache_dir,
+    settings.download_cache_mb * 1024 * 1024,
+    settings.download_cache_max_object_mb * 1024 * 1024,
+    settings.download_cache_min_hits
+)
@@ -0,0 +1,290 @@
+# app/services/profiler.py
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("uvicorn")
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+MAX_STACK_DEPTH = 64
+
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+def annotate(**fields: Any) -> None:
+    """Attach fields (session id, clause index, ...) to the profile of the current request, if any"""
+    profile = _active.get()
+    if profile is not None:
+        profile.annotations.update(fields)
+
+
+def note_llm_call(prompt: str, model: Optional[str], latency_ms: float, prompt_tokens: int, completion_tokens: int) -> None:
+    """Record an LLM call made while serving a profiled request"""
+    profile = _active.get()
+    if profile is not None:
+        profile.llm_calls.append({
+            "prompt": prompt,
+            "model": model,
+            "started_ms": round(profile.elapsed_ms() - latency_ms, 1),
+            "latency_ms": round(latency_ms, 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        })
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _await_chain(coro) -> List[str]:
+    """Frames of a suspended coroutine down to what it is waiting on, outermost first"""
+    labels = []
+    while coro is not None and len(labels) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            # A Future, or a coroutine that has already finished
+            labels.append(f"<{type(coro).__name__}>")
+            break
+        labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return labels
+
+
+def _thread_stack(frame, root_code) -> List[str]:
+    """Frames of the running thread from the task's coroutine inwards"""
+    frames = []
+    while frame is not None and len(frames) < 4 * MAX_STACK_DEPTH:
+        frames.append(frame)
+        if frame.f_code is root_code:
+            break
+        frame = frame.f_back
+    return [_frame_label(f) for f in reversed(frames[-MAX_STACK_DEPTH:])]
+
+
+class RequestProfile:
+    """Samples and timings collected for one request"""
+
+    def __init__(self, profile_id: str, scope, loop: asyncio.AbstractEventLoop, forced: bool):
+        self.profile_id = profile_id
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.forced = forced
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.tasks: Dict[asyncio.Task, Dict[str, Any]] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.annotations: Dict[str, Any] = {}
+        self.llm_calls: List[Dict[str, Any]] = []
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def track(self, task: asyncio.Task) -> None:
+        coro = task.get_coro()
+        self.tasks[task] = {
+            "task": task.get_name(),
+            "coroutine": getattr(coro, "__qualname__", type(coro).__name__),
+            "started_ms": round(self.elapsed_ms(), 1),
+            "ended_ms": None,
+            "running": 0,
+            "waiting": 0,
+        }
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        entry = self.tasks.get(task)
+        if entry is not None:
+            entry["ended_ms"] = round(self.elapsed_ms(), 1)
+
+    def sample(self, frames: Dict[int, Any]) -> None:
+        """One tick: the CPU stack of the task running now, the await chain of the others"""
+        self.samples += 1
+        running = asyncio.current_task(self.loop)
+        for task, entry in list(self.tasks.items()):
+            if task.done():
+                continue
+            coro = task.get_coro()
+            entry["task"] = task.get_name()
+            if task is running and self.loop_thread in frames:
+                stack = _thread_stack(frames[self.loop_thread], getattr(coro, "cr_code", None))
+                state = "running"
+            else:
+                stack = _await_chain(coro)
+                state = "waiting"
+            entry[state] += 1
+            self.stacks[";".join([state, entry["task"], *stack])] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, the input format of flamegraph.pl, inferno and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, status: Optional[int], latency_ms: float, interval_ms: float) -> Dict[str, Any]:
+        return {
+            "id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "started_at": self.started_at.isoformat(),
+            "latency_ms": round(latency_ms, 1),
+            "forced": self.forced,
+            "sample_interval_ms": interval_ms,
+            "samples": self.samples,
+            **self.annotations,
+            "llm_calls": self.llm_calls,
+            "llm_ms": round(sum(call["latency_ms"] for call in self.llm_calls), 1),
+            "tasks": sorted(self.tasks.values(), key=lambda entry: entry["started_ms"]),
+        }
+
+
+class _Sampler:
+    """Background thread sampling every active profile while at least one exists"""
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.profiles: List[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self.profiles.append(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            if profile in self.profiles:
+                self.profiles.remove(profile)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self.profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in profiles:
+                try:
+                    profile.sample(frames)
+                except Exception:
+                    # The loop mutates task state under us; skip the tick
+                    pass
+            del frames
+
+
+class RequestProfiler:
+    """
+    ASGI middleware profiling a random ``sample_rate`` of requests, plus any
+    request sending ``X-Profile: <token>``. Not installed when both are off,
+    so it costs nothing unless enabled.
+
+    While a request is profiled a thread samples, every ``interval_ms``, each
+    task serving it: the Python stack of the one holding the event loop
+    ("running", CPU time) and the await chain of the rest ("waiting", e.g. on
+    the LLM or an ingestion). Tasks the request spawns are followed through a
+    task factory. Requests slower than ``slow_ms`` (and every forced one) are
+    written to ``directory`` as ``<id>.folded`` collapsed stacks for
+    flamegraph.pl or speedscope and ``<id>.json`` with the session id, clause
+    index, LLM call timings and a per-task timeline. Forced requests get the
+    id back in ``X-Profile-Id``.
+    """
+
+    def __init__(self, app, sample_rate: float, token: str, slow_ms: float, interval_ms: float, directory: str):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+        self.slow_ms = slow_ms
+        self.interval_ms = interval_ms
+        self.directory = directory
+        self._sampler = _Sampler(interval_ms)
+        self._factory_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.saved = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        forced = bool(self.token) and dict(scope.get("headers") or []).get(PROFILE_HEADER.lower().encode()) == self.token
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        self._install_task_factory(loop)
+        profile = RequestProfile(uuid.uuid4().hex[:16], scope, loop, forced)
+        profile.track(asyncio.current_task())
+        status: Dict[str, Optional[int]] = {"code": None}
+
+        async def profiled_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if forced:
+                    headers = list(message.get("headers") or [])
+                    headers.append((PROFILE_ID_HEADER.lower().encode(), profile.profile_id.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        token = _active.set(profile)
+        self._sampler.add(profile)
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            self._sampler.remove(profile)
+            _active.reset(token)
+            latency_ms = profile.elapsed_ms()
+            if forced or latency_ms >= self.slow_ms:
+                profile.annotations.setdefault("session_id", (scope.get("path_params") or {}).get("session_id"))
+                try:
+                    await asyncio.to_thread(self._save, profile, status["code"], latency_ms)
+                except Exception as e:
+                    logger.warning(f"Could not save profile {profile.profile_id}: {e}")
+
+    def _install_task_factory(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Register tasks created while a profile is active with that profile"""
+        if self._factory_loop is loop:
+            return
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            profile = _active.get()
+            if profile is not None:
+                profile.track(task)
+            return task
+
+        loop.set_task_factory(factory)
+        self._factory_loop = loop
+
+    def _save(self, profile: RequestProfile, status: Optional[int], latency_ms: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        route = re.sub(r"[^A-Za-z0-9]+", "-", profile.path).strip("-")[:60] or "root"
+        stem = os.path.join(
+            self.directory,
+            f"{profile.started_at:%Y%m%dT%H%M%S}-{profile.method.lower()}-{route}-{profile.profile_id}"
+        )
+        with open(f"{stem}.folded", "w", encoding="utf-8") as f:
+            f.write(profile.folded())
+        with open(f"{stem}.json", "w", encoding="utf-8") as f:
+            json.dump(profile.summary(status, latency_ms, self.interval_ms), f, indent=2, default=str)
+        self.saved += 1
+        logger.info(f"Saved profile of {profile.method} {profile.path} ({latency_ms:.0f} ms) to {stem}.json")
@@ -0,0 +1,212 @@
+# app/services/prompts.py
+
+import hashlib
+from dataclasses import dataclass
+from string import Template
+from typing import Any, Dict, List
+
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+
+# Every prompt is laid out from most to least stable: the static instructions
+# (byte-identical for every call) as the system message, then the clause block
+# (identical for every call on the same clause), then the user's text. Provider
+# prompt caching matches on the longest shared prefix, so nothing dynamic may
+# precede static text. Templates and clause blocks are compiled once and each
+# prompt carries a version hash that the LLM gateway records with every call.
+
+AGENT_QUERY = "agent_query"
+DOCUMENT_ANALYSIS = "document_analysis"
+NODE_QUERY = "node_query"
+ENGINE_QUERY = "engine_query"
+REPORT_NARRATIVE = "report_narrative"
+ANSWER_GRADING = "answer_grading"
+
+
+@dataclass(frozen=True)
+class PromptSpec:
+    name: str
+    instructions: str
+    tail: str                    # string.Template source for the dynamic part; $clause comes first
+    clause_scoped: bool = True
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A compiled prompt: static system prefix plus a precompiled dynamic tail"""
+    name: str
+    prefix: str
+    tail: str                    # str.format form of the spec's $-template
+    version: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def render(self, **values: Any) -> str:
+        return self.tail.format_map(values)
+
+    def messages(self, **values: Any) -> List[BaseMessage]:
+        return [SystemMessage(content=self.prefix), HumanMessage(content=self.render(**values))]
+
+    def openai_messages(self, **values: Any) -> List[Dict[str, str]]:
+        """Same layout for the raw OpenAI v1 client"""
+        return [
+            {"role": "system", "content": self.prefix},
+            {"role": "user", "content": self.render(**values)},
+        ]
+
+
+PROMPT_SPECS = [
+    PromptSpec(
+        name=AGENT_QUERY,
+        instructions="""You are an expert ISO 27001 internal auditor chatbot. For every user message, you must return a JSON object with three fields:
+- response: your answer to the user's question (string)
+- advance_clause: true if the user wants to move to the next clause, false otherwise (boolean)
+- previous_clause: true if the user wants to move to the previous clause, false otherwise (boolean)
+
+If the user message is a request to move to the next clause (e.g., "next", "skip", "move to next clause", "advance", etc.), set advance_clause to true.
+If the user message is a request to move to the previous clause (e.g., "previous", "back", "go back", "move to previous clause", etc.), set previous_clause to true.
+If neither, set both to false.
+
+At the end of every response, always ask: "Would you like to record your answer for this clause or upload supporting documents?"
+If the user answers 'No' or expresses intent not to record or upload, respond with: "Are you facing any issues or challenges related to this clause? I can help clarify or provide guidance."
+
+Always return a valid JSON object. Example:
+{"response": "Here is my answer... Would you like to record your answer for this clause or upload supporting documents?", "advance_clause": false, "previous_clause": false}""",
+        tail="$clause\n\nUser Message: $query",
+    ),
+    PromptSpec(
+        name=DOCUMENT_ANALYSIS,
+        instructions="""You are an expert ISO 27001 auditor analyzing uploaded documents for compliance.
+
+First check if the document is related to ISO 27001. If it is not, politely tell the user that you can only analyze documents related to ISO 27001.
+
+If it is related to ISO 27001, then provide a detailed, structured analysis of how well the document addresses the current clause requirements, covering:
+
+1. **Compliance Assessment:** Does this document adequately address the current clause requirements?
+2. **Key Findings:** What specific evidence of compliance or non-compliance did you identify?
+3. **Strengths:** What aspects of the document demonstrate good compliance practices?
+4. **Gaps/Concerns:** What areas need improvement or are missing?
+5. **Recommendations:** What specific actions should be taken to improve compliance?
+6. **Confidence Level:** How confident are you in this assessment (High/Medium/Low)?
+
+Base the analysis on the extracted Document Text. If the text is unavailable, say so and limit the assessment to what the document name and type indicate.
+
+Be specific, professional, and actionable. Format your response in a clear, structured manner that an auditor would find useful.""",
+        tail="$clause\n\nDocument to Analyze: $document ($details)\n\nDocument Text:\n$text",
+    ),
+    PromptSpec(
+        name=NODE_QUERY,
+        instructions="""You are an expert ISO 27001 internal auditor. Your role is to:
+1. Answer questions about ISO 27001 clauses clearly and accurately
+2. Provide guidance on compliance requirements
+3. Help users understand what they need to implement
+4. Be helpful but maintain professional audit standards
+
+If the query is not related to ISO 27001, politely redirect the conversation. Please provide a clear, helpful response.""",
+        tail="$clause\n\nUser Query: $query",
+    ),
+    PromptSpec(
+        name=ENGINE_QUERY,
+        instructions=(
+            "You are an expert ISO 27001 internal auditor. If the query is not related to the ISO 27001, "
+            "politely tell the user that you can only answer questions related to ISO 27001 clauses. "
+            "At the end of each answer, ask the user if they want to submit documents related to the clause "
+            "or record their answer for it. Provide a clear, concise answer."
+        ),
+        tail="$clause\n\nUser asks: $query",
+    ),
+    PromptSpec(
+        name=REPORT_NARRATIVE,
+        instructions=(
+            "You are an expert ISO 27001 auditor creating a final audit report. "
+            "Create a comprehensive, professional report based on the audit findings.\n"
+            "Always write these sections: 1. Executive Summary 2. Compliance Assessment "
+            "3. Key Findings 4. Recommendations 5. Next Steps"
+        ),
+        tail=(
+            "Session ID: $session_id\n"
+            "Compliance Score: $score%\n"
+            "Total Clauses Audited: $total_clauses\n"
+            "Recommendations: $recommendations\n\n"
+            "User Answers Summary:\n$answers"
+        ),
+        clause_scoped=False,
+    ),
+    PromptSpec(
+        name=ANSWER_GRADING,
+        instructions="""You are an expert ISO 27001 lead auditor grading an organisation's answers to audit clauses.
+For each item, judge how well the answer demonstrates that the clause requirements are met.
+Return a JSON object of the form:
+{"grades": [{"id": "<item id>", "score": <0.0-1.0>, "verdict": "compliant" | "partial" | "non_compliant" | "insufficient", "rationale": "<one sentence>"}]}
+Use "insufficient" when the answer does not contain enough information to judge. Grade every item exactly once.""",
+        tail="$payload",
+        clause_scoped=False,
+    ),
+]
+
+
+def render_clause_block(clause: Dict[str, Any]) -> str:
+    return (
+        f"Current Clause: {clause['question']}\n"
+        f"Description: {clause['description']}\n"
+        f"Key Attributes: {', '.join(clause['attributes'])}"
+    )
+
+
+def _format_string(source: str) -> str:
+    """Translate a $-template into an equivalent str.format string"""
+    def convert(match) -> str:
+        if match.group("escaped") is not None:
+            return "$"
+        name = match.group("named") or match.group("braced")
+        if name is None:
+            raise ValueError(f"Invalid placeholder in prompt template: {match.group(0)!r}")
+        return "{" + name + "}"
+
+    return Template.pattern.sub(convert, source.replace("{", "{{").replace("}", "}}"))
+
+
+def compile_prompt(spec: PromptSpec, clause_blocks: List[str]) -> PromptTemplate:
+    """Build the template; clause-scoped prompts also hash the clause text they will be filled with"""
+    prefix = spec.instructions.strip()
+    hashed = [prefix, spec.tail] + (clause_blocks if spec.clause_scoped else [])
+    digest = hashlib.sha256("\x00".join(hashed).encode("utf-8")).hexdigest()
+    return PromptTemplate(name=spec.name, prefix=prefix, tail=_format_string(spec.tail), version=digest[:12])
+
+
+class PromptRegistry:
+    """Compiled prompt templates and clause blocks"""
+
+    def __init__(self, specs: List[PromptSpec]):
+        self.specs = {spec.name: spec for spec in specs}
+        self._compiled: Dict[str, PromptTemplate] = {}
+        self._clause_blocks: List[str] = []
+
+    def compile(self) -> Dict[str, str]:
+        """Compile every template (called at startup); returns name -> version"""
+        from app.services.audit_engine import CLAUSE_METADATA
+
+        self._clause_blocks = [render_clause_block(clause) for clause in CLAUSE_METADATA]
+        self._compiled = {name: compile_prompt(spec, self._clause_blocks) for name, spec in self.specs.items()}
+        return self.versions()
+
+    def get(self, name: str) -> PromptTemplate:
+        if not self._compiled:
+            self.compile()
+        return self._compiled[name]
+
+    def clause_block(self, clause_index: int) -> str:
+        """Precompiled clause text for the ``$clause`` slot"""
+        if not self._compiled:
+            self.compile()
+        if 0 <= clause_index < len(self._clause_blocks):
+            return self._clause_blocks[clause_index]
+        return "Current Clause: none (audit complete)"
+
+    def versions(self) -> Dict[str, str]:
+        return {name: prompt.version for name, prompt in self._compiled.items()}
+
+
+# Global instance
+prompt_registry = PromptRegistry(PROMPT_SPECS)
@@ -0,0 +1,315 @@
+# app/services/report_pipeline.py
+
+import asyncio
+import hashlib
+import html
+import io
+import logging
+from datetime import datetime
+from string import Template
+from typing import Dict, Any, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.services.audit_engine import CLAUSE_METADATA
+from app.services.mongo_client import db
+from app.services.grading import load_grades
+from app.services.llm_gateway import llm_gateway
+from app.services.prompts import REPORT_NARRATIVE, prompt_registry
+from app.services.scoring import recommendations_for, score_answers, weighted_score
+from app.services.session_events import REPORT_READY, session_events
+from app.services.storage import report_storage
+from app.services.tenancy import tenant_key
+from app.services.usage_ledger import usage_scope
+
+try:  # reportlab is in requirements.txt; without it only HTML is rendered
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+except ImportError:  # pragma: no cover - depends on the deployment
+    SimpleDocTemplate = None
+
+logger = logging.getLogger("uvicorn")
+
+# Builds attempted per ensure() when invalidations keep landing mid-build
+MAX_BUILD_ATTEMPTS = 3
+
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+HTML_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>ISO 27001 Audit Report - $session_id</title>
+<style>
+body { font-family: Arial, sans-serif; margin: 40px; color: #222; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 24px; }
+th, td { border: 1px solid #ccc; padding: 6px 8px; text-align: left; vertical-align: top; }
+th { background: #f3f3f3; }
+.narrative { white-space: pre-wrap; }
+</style>
+</head>
+<body>
+<h1>ISO 27001 Audit Report</h1>
+<p>Session: $session_id<br>Generated: $generated_at<br>Compliance score: $compliance_score%</p>
+<h2>Summary</h2>
+<div class="narrative">$narrative</div>
+<h2>Recommendations</h2>
+<ul>$recommendations</ul>
+<h2>Answers</h2>
+<table><tr><th>#</th><th>Clause</th><th>Answer</th><th>Score</th><th>Compliant</th></tr>$answer_rows</table>
+<h2>Document Analyses</h2>
+<table><tr><th>Clause</th><th>Document</th><th>Analysis</th></tr>$document_rows</table>
+</body>
+</html>
+""")
+
+
+def compute_etag(content: bytes) -> str:
+    """Strong ETag for an artifact body"""
+    return '"' + hashlib.sha256(content).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ReportPipeline:
+    """
+    Builds the final audit report once, renders it to HTML/PDF and caches the
+    artifacts (local disk or S3) with their ETags in ``db.reports``.
+
+    ``invalidate`` marks the cached report stale and bumps its ``generation``.
+    A build only writes back if the generation it started from is still
+    current, so a build that overlapped an invalidation is redone instead of
+    caching a report made from the old data.
+    """
+
+    def __init__(self, llm, grader=None):
+        self.llm = llm
+        self.grader = grader
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}   # callers holding or queued on each lock
+        if grader is not None:
+            grader.on_late_grade(self.invalidate)
+
+    # ─── Build ────────────────────────────────────────────────────
+
+    def schedule(self, state) -> None:
+        """Kick off report generation in the background when an audit completes"""
+        task = asyncio.create_task(self._build_when_graded(state))
+        task.add_done_callback(self._log_failure)
+
+    async def _build_when_graded(self, state) -> Dict[str, Any]:
+        # Off the request path we can afford to let in-flight grades land first
+        if self.grader is not None:
+            await self.grader.wait_for(state.session_id, settings.grading_wait_seconds)
+            # A request may have built the report before the grades landed
+            stale = await db.reports.find_one({"_id": state.session_id, "grades_complete": False}, {"_id": 1})
+            if stale and not self.grader.pending(state.session_id):
+                await self.invalidate(state.session_id)
+        return await self.ensure(state)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Report generation failed: {task.exception()}")
+
+    async def ensure(self, state) -> Dict[str, Any]:
+        """Return the cached report for a session, building it on first use"""
+        session_id = state.session_id
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._waiters[session_id] = self._waiters.get(session_id, 0) + 1
+        try:
+            async with lock:
+                for _ in range(MAX_BUILD_ATTEMPTS):
+                    cached = await db.reports.find_one({"_id": session_id})
+                    if cached and not cached.get("stale"):
+                        return cached
+                    generation = cached.get("generation", 0) if cached else 0
+                    report = {**await self._build(state), "generation": generation}
+                    try:
+                        await db.reports.replace_one({"_id": session_id, "generation": generation}, report, upsert=True)
+                        break
+                    except DuplicateKeyError:
+                        # Invalidated while building: the generation moved on
+                        logger.info(f"Report for {session_id} invalidated during build, rebuilding")
+                else:
+                    return report   # still racing invalidations; serve it uncached
+                session_events.publish(state.session_id, REPORT_READY, {
+                    "compliance_score": report["compliance_score"],
+                    "formats": sorted(report.get("artifacts", {}))
+                })
+                return report
+        finally:
+            # Drop the lock only once nobody holds it or waits on it
+            self._waiters[session_id] -= 1
+            if not self._waiters[session_id]:
+                del self._waiters[session_id]
+                self._locks.pop(session_id, None)
+
+    async def invalidate(self, session_id: str) -> None:
+        """Mark the cached report stale so the next request rebuilds it, and fence off in-flight builds"""
+        await db.reports.update_one(
+            {"_id": session_id},
+            {"$set": {"stale": True}, "$inc": {"generation": 1}},
+            upsert=True
+        )
+
+    async def _build(self, state) -> Dict[str, Any]:
+        # LLM grades where available, keyword scores for the rest
+        _, clause_scores = score_answers(state.user_answers)
+        grades = await load_grades(state.session_id)
+        for idx, grade in grades.items():
+            if idx in clause_scores:
+                clause_scores[idx] = grade["score"]
+        compliance_score = weighted_score(clause_scores)
+        recommendations = recommendations_for(compliance_score)
+
+        documents = await db.documents.find(
+            {"session_id": state.session_id},
+            {"_id": 0, "clause_index": 1, "document_key": 1, "analysis_summary": 1}
+        ).sort("clause_index", 1).to_list(length=None)
+
+        answers = []
+        for idx in sorted(state.user_answers):
+            clause = CLAUSE_METADATA[idx]["question"] if idx < len(CLAUSE_METADATA) else f"Clause {idx + 1}"
+            answers.append({
+                "clause_index": idx,
+                "clause": clause,
+                "answer": state.user_answers[idx],
+                "score": clause_scores[idx],
+                "compliant": clause_scores[idx] >= 0.5,
+                "grade": grades.get(idx)
+            })
+
+        narrative = await self._narrative(state.session_id, compliance_score, recommendations, answers)
+        now = datetime.utcnow()
+        generated_at = now.replace(microsecond=now.microsecond // 1000 * 1000)  # BSON precision, keeps ETags stable
+
+        report = {
+            "_id": state.session_id,
+            "session_id": state.session_id,
+            "compliance_score": compliance_score,
+            "recommendations": recommendations,
+            "user_answers": {str(k): v for k, v in state.user_answers.items()},
+            "answers": answers,
+            "documents": documents,
+            "narrative": narrative,
+            "generated_at": generated_at,
+            "grades_complete": self.grader is None or not self.grader.pending(state.session_id),
+        }
+
+        artifacts = {}
+        for fmt, render in (("html", render_html), ("pdf", render_pdf)):
+            try:
+                content = render(report)
+            except RuntimeError as e:
+                logger.info(f"Skipping {fmt} report: {e}")
+                continue
+            artifacts[fmt] = await self._store(state, fmt, content)
+        report["artifacts"] = artifacts
+        return report
+
+    async def _narrative(self, session_id: str, score: float, recommendations: List[str], answers: List[Dict[str, Any]]) -> str:
+        """Ask the LLM for the executive narrative; fall back to a one-liner"""
+        summary = "\n".join(f"{a['clause']}\nAnswer: {a['answer']}\n" for a in answers)
+        prompt = prompt_registry.get(REPORT_NARRATIVE)
+        messages = prompt.messages(
+            session_id=session_id,
+            score=score,
+            total_clauses=len(CLAUSE_METADATA),
+            recommendations=recommendations,
+            answers=summary
+        )
+        try:
+            with usage_scope(session_id=session_id, clause_index=None):
+                return await llm_gateway.chat(self.llm, prompt, messages, enforce_quota=False)
+        except Exception as e:
+            logger.warning(f"Report narrative generation failed for {session_id}: {e}")
+            return f"Audit completed with {score}% compliance score."
+
+    # ─── Storage ──────────────────────────────────────────────────
+
+    @staticmethod
+    def _key(state, fmt: str) -> str:
+        return tenant_key(f"reports/{state.session_id}/report.{fmt}", state.tenant_id or settings.default_tenant)
+
+    async def _store(self, state, fmt: str, content: bytes) -> Dict[str, Any]:
+        key = self._key(state, fmt)
+        await asyncio.to_thread(report_storage.put_bytes, key, content, CONTENT_TYPES[fmt])
+        return {"key": key, "etag": compute_etag(content), "size": len(content)}
+
+    async def load_artifact(self, artifact: Dict[str, Any]) -> bytes:
+        """Read a stored artifact body"""
+        return await asyncio.to_thread(report_storage.get_bytes, artifact["key"])
+
+
+# ─── Renderers ────────────────────────────────────────────────────
+
+def render_html(report: Dict[str, Any]) -> bytes:
+    esc = html.escape
+    answer_rows = "".join(
+        f"<tr><td>{a['clause_index'] + 1}</td><td>{esc(a['clause'])}</td>"
+        f"<td>{esc(a['answer'])}</td><td>{a['score']:.2f}</td><td>{'Yes' if a['compliant'] else 'No'}</td></tr>"
+        for a in report["answers"]
+    )
+    document_rows = "".join(
+        f"<tr><td>{d['clause_index'] + 1}</td><td>{esc(d.get('document_key') or '')}</td>"
+        f"<td class=\"narrative\">{esc(d.get('analysis_summary') or '')}</td></tr>"
+        for d in report["documents"]
+    )
+    return HTML_TEMPLATE.substitute(
+        session_id=esc(report["session_id"]),
+        generated_at=report["generated_at"].isoformat(),
+        compliance_score=f"{report['compliance_score']:.1f}",
+        narrative=esc(report["narrative"]),
+        recommendations="".join(f"<li>{esc(r)}</li>" for r in report["recommendations"]),
+        answer_rows=answer_rows,
+        document_rows=document_rows,
+    ).encode("utf-8")
+
+
+def render_pdf(report: Dict[str, Any]) -> bytes:
+    if SimpleDocTemplate is None:
+        raise RuntimeError("PDF rendering requires the 'reportlab' package")
+
+    styles = getSampleStyleSheet()
+    body = styles["BodyText"]
+    esc = html.escape
+
+    story = [
+        Paragraph("ISO 27001 Audit Report", styles["Title"]),
+        Paragraph(f"Session: {esc(report['session_id'])}", body),
+        Paragraph(f"Compliance score: {report['compliance_score']:.1f}%", body),
+        Spacer(1, 12),
+        Paragraph("Summary", styles["Heading2"]),
+    ]
+    story += [Paragraph(esc(line), body) for line in report["narrative"].splitlines() if line.strip()]
+    story += [Spacer(1, 12), Paragraph("Answers", styles["Heading2"])]
+    story.append(Table(
+        [["#", "Clause", "Answer", "Compliant"]] + [
+            [str(a["clause_index"] + 1), Paragraph(esc(a["clause"]), body),
+             Paragraph(esc(a["answer"]), body), "Yes" if a["compliant"] else "No"]
+            for a in report["answers"]
+        ],
+        colWidths=[24, 180, 220, 60],
+        repeatRows=1
+    ))
+    if report["documents"]:
+        story += [Spacer(1, 12), Paragraph("Document Analyses", styles["Heading2"])]
+        for d in report["documents"]:
+            story.append(Paragraph(f"Clause {d['clause_index'] + 1}: {esc(d.get('document_key') or '')}", styles["Heading4"]))
+            story += [Paragraph(esc(line), body) for line in (d.get("analysis_summary") or "").splitlines() if line.strip()]
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
@@ -0,0 +1,127 @@
+# app/services/request_log.py
+
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.services.tenancy import TENANT_HEADER
+
+logger = logging.getLogger("uvicorn")
+
+# Not API traffic: the UI shell and its assets
+SKIP_PREFIXES = ("/static",)
+SKIP_PATHS = {"/", "/ui", "/favicon.ico"}
+RESPONSE_PEEK_BYTES = 4096
+
+
+class RequestRecorder:
+    """
+    ASGI middleware appending one JSON line per API call to ``path``, in the
+    format ``scripts/replay_traffic.py`` replays: method, path and route
+    template, query string, tenant, JSON body, status and latency. Bodies that
+    are not JSON (file uploads, archives) or are larger than ``max_body``
+    bytes are left out and the line is marked ``"replayable": false``.
+
+    The ``session_id`` a call created is taken from its response so the replay
+    can map recorded sessions onto the ones it creates. WebSockets pass
+    through unrecorded. Written as plain ASGI rather than ``@app.middleware``
+    so reading the body does not consume it for the route.
+    """
+
+    def __init__(self, app, path: str, max_body: int):
+        self.app = app
+        self.path = path
+        self.max_body = max_body
+        self._file = open(path, "a", encoding="utf-8")
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path in SKIP_PATHS or path.startswith(SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        body: List[bytes] = []
+        body_size = 0
+        response: Dict[str, Any] = {"status": None, "json": False, "head": b""}
+
+        async def recording_receive():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if body_size <= self.max_body:
+                    body.append(chunk)
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = dict(message.get("headers") or [])
+                response["json"] = headers.get(b"content-type", b"").startswith(b"application/json")
+            elif message["type"] == "http.response.body" and response["json"]:
+                if len(response["head"]) < RESPONSE_PEEK_BYTES:
+                    response["head"] += message.get("body", b"")[:RESPONSE_PEEK_BYTES]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            latency_ms = (time.perf_counter() - started) * 1000
+            try:
+                self._write(scope, b"".join(body), body_size, response, latency_ms)
+            except Exception as e:
+                logger.warning(f"Could not record request {path}: {e}")
+
+    def _write(self, scope, body: bytes, body_size: int, response: Dict[str, Any], latency_ms: float) -> None:
+        headers = dict(scope.get("headers") or [])
+        parsed, replayable = _parse_body(body, body_size, self.max_body, headers.get(b"content-type", b""))
+        line = {
+            "ts": datetime.utcnow().isoformat(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route_template(scope),
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "tenant": headers.get(TENANT_HEADER.lower().encode(), b"").decode("latin-1") or None,
+            "body": parsed,
+            "replayable": replayable,
+            "status": response["status"],
+            "latency_ms": round(latency_ms, 2),
+            "session_id": _session_id(response["head"]) or scope.get("path_params", {}).get("session_id"),
+        }
+        self._file.write(json.dumps(line, default=str) + "\n")
+        self._file.flush()
+
+
+def _parse_body(body: bytes, size: int, limit: int, content_type: bytes):
+    if size == 0:
+        return None, True
+    if size > limit or not content_type.startswith(b"application/json"):
+        return None, False
+    try:
+        return json.loads(body), True
+    except ValueError:
+        return None, False
+
+
+def route_template(scope) -> str:
+    """``/agent/{session_id}/query`` for ``/agent/abc/query``, so calls group by endpoint"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = scope["path"]
+    for name, value in (scope.get("path_params") or {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+def _session_id(head: bytes) -> Optional[str]:
+    try:
+        data = json.loads(head)
+    except ValueError:
+        return None
+    value = data.get("session_id") if isinstance(data, dict) else None
+    return value if isinstance(value, str) else None
@@ -1,37 +1,75 @@
+from typing import Any, Dict, List, Optional
+
 import boto3
 from botocore.client import Config
 from app.config import settings
+from app.services.storage import content_disposition
 
-# Force the correct region and signature version
+# Force the correct region and signature version; S3-compatible stores
+# (MinIO, Ceph, ...) are reached through s3_endpoint_url
 s3 = boto3.client(
     "s3",
     region_name=settings.aws_region,
-    endpoint_url=f"https://s3.{settings.aws_region}.amazonaws.com",
+    endpoint_url=settings.s3_endpoint_url or f"https://s3.{settings.aws_region}.amazonaws.com",
     config=Config(
         signature_version="s3v4",
-        s3={"addressing_style": "path"}
+        s3={"addressing_style": settings.s3_addressing_style}
     )
 )
 
 
-def create_presigned_url(key: str, expires_in: int = 3600) -> str:
+def create_presigned_url(key: str, expires_in: Optional[int] = None) -> str:
     return s3.generate_presigned_url(
         ClientMethod="put_object",
         Params={"Bucket": settings.s3_bucket, "Key": key},
-        ExpiresIn=expires_in,
+        ExpiresIn=expires_in or settings.presign_put_expiry_seconds,
         HttpMethod="PUT"     # explicitly generate a PUT URL
     )
 
 
-async def upload_file_to_s3(file_content: bytes, key: str) -> bool:
-    """Upload file content directly to S3"""
-    try:
-        s3.put_object(
-            Bucket=settings.s3_bucket,
-            Key=key,
-            Body=file_content
-        )
-        return True
-    except Exception as e:
-        print(f"Error uploading to S3: {e}")
-        return False
\ No newline at end of file
+def create_presigned_get_url(key: str, filename: Optional[str] = None, expires_in: Optional[int] = None) -> str:
+    """Short-lived GET URL so clients download evidence straight from S3"""
+    params = {"Bucket": settings.s3_bucket, "Key": key}
+    if filename:
+        params["ResponseContentDisposition"] = content_disposition("attachment", filename)
+    return s3.generate_presigned_url(
+        ClientMethod="get_object",
+        Params=params,
+        ExpiresIn=expires_in or settings.presign_get_expiry_seconds,
+        HttpMethod="GET"
+    )
+
+
+# ─── Multipart uploads ───────────────────────────────────────────
+
+def create_multipart_upload(key: str, content_type: Optional[str] = None) -> str:
+    """Start a multipart upload and return its UploadId"""
+    params = {"Bucket": settings.s3_bucket, "Key": key}
+    if content_type:
+        params["ContentType"] = content_type
+    return s3.create_multipart_upload(**params)["UploadId"]
+
+
+def presign_upload_part(key: str, upload_id: str, part_number: int, expires_in: Optional[int] = None) -> str:
+    """PUT URL for one part; signing is local, no request is made to S3"""
+    return s3.generate_presigned_url(
+        ClientMethod="upload_part",
+        Params={"Bucket": settings.s3_bucket, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+        ExpiresIn=expires_in or settings.presign_put_expiry_seconds,
+        HttpMethod="PUT"
+    )
+
+
+def complete_multipart_upload(key: str, upload_id: str, parts: List[Dict[str, Any]]) -> None:
+    """``parts`` is a list of ``{"PartNumber": n, "ETag": etag}`` in ascending part order"""
+    s3.complete_multipart_upload(
+        Bucket=settings.s3_bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": parts}
+    )
+
+
+def abort_multipart_upload(key: str, upload_id: str) -> None:
+    s3.abort_multipart_upload(Bucket=settings.s3_bucket, Key=key, UploadId=upload_id)
+
@@ -0,0 +1,195 @@
+# app/services/scoring.py
+
+import re
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.audit_engine import CLAUSE_METADATA
+
+SCORING_VERSION = 3
+SKIP_ANSWER = "__skip__"
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?|[.,;:!?]")
+BOUNDARIES = {".", ",", ";", ":", "!", "?"}   # a negation does not reach past these
+CONTRASTS = {"but", "however", "although", "though", "whereas", "except", "yet"}   # nor past these
+
+POSITIVE_TERMS = {
+    "yes", "implemented", "compliant", "adequate", "sufficient", "documented",
+    "enforced", "established", "approved", "reviewed", "maintained", "defined",
+    "operational", "effective", "certified",
+}
+POSITIVE_BIGRAMS = {("in", "place"), ("fully", "covered")}
+NEGATIVE_TERMS = {
+    "no", "none", "never", "missing", "lacking", "lack", "absent", "gap", "gaps", "nothing",
+    "issue", "issues", "problem", "problems", "deficiency", "deficiencies", "weakness", "weaknesses",
+}
+PARTIAL_TERMS = {"partially", "partial", "planned", "ongoing", "draft", "informal", "some"}
+PARTIAL_BIGRAMS = {("in", "progress")}
+NEGATORS = {"not", "no", "never", "without", "nor", "lacks", "none", "nothing", "cannot"}
+
+# Feature columns
+POS, NEG, PARTIAL = 0, 1, 2
+
+
+def _is_negator(token: str) -> bool:
+    return token in NEGATORS or token.endswith("n't")
+
+
+@lru_cache(maxsize=65536)
+def answer_features(answer: str) -> Tuple[int, int, int]:
+    """
+    Count positive, negative and partial signals in an answer.
+
+    Terms are matched as whole words, so "know" or "now" are not read as "no".
+    A negator reverses the first term after it, up to the next punctuation
+    mark or contrast ("but", "although", ...): "not implemented" and "isn't
+    documented" count as negative, "no gaps", "no missing controls" and
+    "none of the controls are missing" as positive. "No, it is missing" and
+    "not yet; gaps remain" stay negative. A negator with nothing to negate
+    ("No.", "not really", "we cannot confirm") counts as negative on its own.
+    """
+    if answer == SKIP_ANSWER:
+        return (0, 0, 0)
+    tokens = TOKEN_RE.findall(answer.lower())
+    pos = neg = partial = 0
+    negating = False         # inside a negator's scope
+    pending_negator = False  # that negator has not reversed a term yet
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        bigram = (token, tokens[i + 1]) if i + 1 < len(tokens) else None
+
+        if token in BOUNDARIES or token in CONTRASTS:
+            if pending_negator:
+                neg += 1
+            pending_negator = negating = False
+            i += 1
+            continue
+        if bigram in PARTIAL_BIGRAMS:
+            partial += 1
+            pending_negator = False
+            i += 2
+            continue
+        if bigram in POSITIVE_BIGRAMS or token in POSITIVE_TERMS:
+            if negating:
+                neg += 1
+            else:
+                pos += 1
+            pending_negator = negating = False
+            i += 2 if bigram in POSITIVE_BIGRAMS else 1
+            continue
+        if token in PARTIAL_TERMS:
+            partial += 1
+        elif _is_negator(token):
+            if pending_negator:
+                neg += 1
+            pending_negator = negating = True
+        elif token in NEGATIVE_TERMS:
+            if negating:
+                pos += 1
+                pending_negator = negating = False
+            else:
+                neg += 1
+        i += 1
+
+    if pending_negator:
+        neg += 1
+    return (pos, neg, partial)
+
+
+def clause_weight(clause_index: int) -> float:
+    """Catalog weight for a clause (defaults to 1.0)"""
+    if 0 <= clause_index < len(CLAUSE_METADATA):
+        return float(CLAUSE_METADATA[clause_index].get("weight", 1.0))
+    return 1.0
+
+
+CLAUSE_WEIGHTS = np.array([clause_weight(i) for i in range(len(CLAUSE_METADATA))], dtype=np.float64)
+
+
+def _weights_for(clause_indexes: np.ndarray) -> np.ndarray:
+    weights = np.ones(clause_indexes.shape, dtype=np.float64)
+    known = (clause_indexes >= 0) & (clause_indexes < len(CLAUSE_WEIGHTS))
+    weights[known] = CLAUSE_WEIGHTS[clause_indexes[known]]
+    return weights
+
+
+def score_features(features: np.ndarray) -> np.ndarray:
+    """Per-answer score in [0, 1] from an (n, 3) feature matrix"""
+    features = features.astype(np.float64, copy=False)
+    signals = features.sum(axis=1)
+    credit = features[:, POS] + 0.5 * features[:, PARTIAL]
+    return np.divide(credit, signals, out=np.zeros_like(credit), where=signals > 0)
+
+
+def score_texts(answers: Sequence[str]) -> np.ndarray:
+    """Score many answers in one pass"""
+    if not answers:
+        return np.zeros(0)
+    return score_features(np.array([answer_features(a) for a in answers], dtype=np.int32))
+
+
+def score_answer(answer: str) -> float:
+    return float(score_texts([answer])[0])
+
+
+def score_answers(user_answers: Dict[int, str]) -> Tuple[float, Dict[int, float]]:
+    """Weighted compliance score (0-100) for one session, plus per-clause scores"""
+    if not user_answers:
+        return 0, {}
+    indexes = np.fromiter(user_answers.keys(), dtype=np.int64, count=len(user_answers))
+    scores = score_texts(list(user_answers.values()))
+    weights = _weights_for(indexes)
+    overall = float((scores * weights).sum() / weights.sum() * 100)
+    return overall, {int(i): float(s) for i, s in zip(indexes, scores)}
+
+
+def weighted_score(clause_scores: Dict[int, float]) -> float:
+    """Weighted compliance score (0-100) from per-clause scores in [0, 1]"""
+    if not clause_scores:
+        return 0
+    indexes = np.fromiter(clause_scores.keys(), dtype=np.int64, count=len(clause_scores))
+    scores = np.fromiter(clause_scores.values(), dtype=np.float64, count=len(clause_scores))
+    weights = _weights_for(indexes)
+    return float((scores * weights).sum() / weights.sum() * 100)
+
+
+def score_sessions(rows: Iterable[Tuple[str, int, str]]) -> Dict[str, float]:
+    """
+    Weighted compliance score (0-100) for many sessions at once from
+    ``(session_id, clause_index, answer)`` rows, aggregated with ``bincount``.
+    """
+    rows = list(rows)
+    if not rows:
+        return {}
+    session_ids, codes = np.unique([r[0] for r in rows], return_inverse=True)
+    indexes = np.array([r[1] for r in rows], dtype=np.int64)
+    scores = score_texts([r[2] for r in rows])
+    weights = _weights_for(indexes)
+    totals = np.bincount(codes, weights=scores * weights, minlength=len(session_ids))
+    norms = np.bincount(codes, weights=weights, minlength=len(session_ids))
+    return {str(sid): float(t / n * 100) for sid, t, n in zip(session_ids, totals, norms)}
+
+
+def is_gap(answer: str, threshold: float = 0.5) -> bool:
+    """True when an answer reports a compliance gap: a negative signal and a low score"""
+    return answer_features(answer)[NEG] > 0 and score_answer(answer) < threshold
+
+
+def gap_clauses(responses: List[Dict[str, Any]], threshold: float = 0.5) -> List[str]:
+    """Clause texts whose latest answer is a gap"""
+    latest: Dict[Any, Dict[str, Any]] = {}
+    for response in responses:
+        latest[response.get("clause_index", response["clause"])] = response
+    return [r["clause"] for r in latest.values() if is_gap(r["answer"], threshold)]
+
+
+def recommendations_for(score: Optional[float]) -> List[str]:
+    """Baseline recommendations for a compliance score"""
+    recommendations = []
+    if score is not None and score < 70:
+        recommendations.append("Implement comprehensive ISMS framework")
+        recommendations.append("Conduct staff training on information security")
+    return recommendations
@@ -0,0 +1,313 @@
+# app/services/search.py
+
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ASCENDING, TEXT
+
+from app.config import settings
+from app.services.mongo_client import db
+from app.services.tenancy import current_tenant, tenant_filter, tenant_of
+
+logger = logging.getLogger("uvicorn")
+
+KIND_ANSWER = 0
+KIND_DOCUMENT = 1
+KINDS = {"answers": KIND_ANSWER, "documents": KIND_DOCUMENT}
+SOURCE_COLLECTIONS = {KIND_ANSWER: "responses", KIND_DOCUMENT: "documents"}
+SOURCE_FIELDS = {KIND_ANSWER: "answer", KIND_DOCUMENT: "analysis_summary"}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SCORE_BLOCK = 1 << 16  # rows scored per matmul, bounds temporary memory
+
+
+class HashingEmbedder:
+    """
+    Local, dependency-free text embedding: signed feature hashing of unigrams
+    and bigrams with sublinear term frequency, L2-normalised.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = TOKEN_RE.findall(text.lower())
+        return tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode())
+            vec[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        vec = np.sign(vec) * np.log1p(np.abs(vec))
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        return np.vstack([self.embed(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+
+
+class VectorIndex:
+    """
+    Append-only brute-force vector index persisted to ``directory``.
+
+    Vectors are stored as float16 in ``vectors.f16`` and row metadata in
+    ``meta.jsonl``; both are appended on every insert, so updates are
+    incremental and a restart just reloads the files. Clause, session and
+    kind live in parallel NumPy arrays so filters are vectorised masks.
+    """
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        dim = self.dim
+        self._vectors = np.zeros((0, dim), dtype=np.float16)
+        self._clauses = np.zeros(0, dtype=np.int32)
+        self._sessions = np.zeros(0, dtype=np.int32)
+        self._kinds = np.zeros(0, dtype=np.int8)
+        self._refs: List[str] = []
+        self._session_codes: Dict[str, int] = {}
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _paths(self):
+        return os.path.join(self.directory, "vectors.f16"), os.path.join(self.directory, "meta.jsonl")
+
+    def load(self) -> None:
+        vec_path, meta_path = self._paths()
+        if not (os.path.exists(vec_path) and os.path.exists(meta_path)):
+            return
+        with open(meta_path) as f:
+            meta = [json.loads(line) for line in f if line.strip()]
+        vectors = np.fromfile(vec_path, dtype=np.float16).reshape(-1, self.dim)
+        n = min(len(meta), len(vectors))  # tolerate a torn final write
+        with self._lock:
+            self._reserve(n)
+            self._vectors[:n] = vectors[:n]
+            for i, row in enumerate(meta[:n]):
+                self._set_meta(i, row)
+            self._size = n
+
+    def _reserve(self, n: int) -> None:
+        capacity = len(self._vectors)
+        if n <= capacity:
+            return
+        new_capacity = max(n, capacity * 2, 1024)
+        for name in ("_vectors", "_clauses", "_sessions", "_kinds"):
+            old = getattr(self, name)
+            grown = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    def _session_code(self, session_id: str) -> int:
+        code = self._session_codes.get(session_id)
+        if code is None:
+            code = self._session_codes[session_id] = len(self._session_codes)
+        return code
+
+    def _set_meta(self, i: int, row: Dict[str, Any]) -> None:
+        self._clauses[i] = row["clause_index"] if row.get("clause_index") is not None else -1
+        self._sessions[i] = self._session_code(row["session_id"])
+        self._kinds[i] = row["kind"]
+        self._refs.append(row["ref"])
+
+    def add(self, rows: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Append rows (``ref``, ``session_id``, ``clause_index``, ``kind``) with their vectors"""
+        if not rows:
+            return
+        vectors = vectors.astype(np.float16)
+        vec_path, meta_path = self._paths()
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            start = self._size
+            self._reserve(start + len(rows))
+            self._vectors[start:start + len(rows)] = vectors
+            for i, row in enumerate(rows):
+                self._set_meta(start + i, row)
+            self._size = start + len(rows)
+            with open(vec_path, "ab") as f:
+                vectors.tofile(f)
+            with open(meta_path, "a") as f:
+                f.write("".join(json.dumps(row) + "\n" for row in rows))
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._paths():
+                if os.path.exists(path):
+                    os.remove(path)
+            self._reset()
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int = 10,
+        kind: Optional[int] = None,
+        clause_index: Optional[int] = None,
+        session_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-``limit`` rows by cosine similarity, after vectorised filtering"""
+        n = self._size
+        mask = np.ones(n, dtype=bool)
+        if kind is not None:
+            mask &= self._kinds[:n] == kind
+        if clause_index is not None:
+            mask &= self._clauses[:n] == clause_index
+        if session_id is not None:
+            code = self._session_codes.get(session_id)
+            if code is None:
+                return []
+            mask &= self._sessions[:n] == code
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+
+        query = query.astype(np.float32)
+        scores = np.empty(candidates.size, dtype=np.float32)
+        for start in range(0, candidates.size, SCORE_BLOCK):
+            block = candidates[start:start + SCORE_BLOCK]
+            scores[start:start + block.size] = self._vectors[block].astype(np.float32) @ query
+
+        k = min(limit, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"ref": self._refs[candidates[i]], "kind": int(self._kinds[candidates[i]]), "score": float(scores[i])}
+            for i in top
+        ]
+
+
+class SearchService:
+    """Full-text (Mongo ``$text``) and vector search over answers and evidence analyses"""
+
+    def __init__(self):
+        self.embedder = HashingEmbedder(settings.search_embedding_dim)
+        self.index = VectorIndex(settings.search_index_dir, settings.search_embedding_dim)
+
+    async def startup(self) -> None:
+        await db.responses.create_index([("answer", TEXT)], name="answer_text")
+        await db.documents.create_index([("analysis_summary", TEXT)], name="analysis_text")
+        await db.documents.create_index([("clause_index", ASCENDING), ("session_id", ASCENDING)])
+        self.index.load()
+        logger.info(f"Loaded search index with {self.index.size} vectors")
+
+    # ─── Incremental updates ──────────────────────────────────────
+
+    def index_text(self, kind: int, ref: Any, session_id: str, clause_index: Optional[int], text: Optional[str]) -> None:
+        if not text:
+            return
+        row = {"ref": str(ref), "session_id": session_id, "clause_index": clause_index, "kind": kind}
+        self.index.add([row], self.embedder.embed(text)[None, :])
+
+    def index_many(self, kind: int, rows: List[Dict[str, Any]], texts: List[str]) -> None:
+        """Index many texts at once; ``rows`` carry ``ref``, ``session_id`` and ``clause_index``"""
+        rows = [{**row, "ref": str(row["ref"]), "kind": kind} for row, text in zip(rows, texts) if text]
+        texts = [text for text in texts if text]
+        if rows:
+            self.index.add(rows, self.embedder.embed_many(texts))
+
+    async def reindex(self, batch_size: int = 1000) -> int:
+        """Rebuild the vector index from Mongo"""
+        self.index.clear()
+        total = 0
+        for kind, collection in SOURCE_COLLECTIONS.items():
+            field = SOURCE_FIELDS[kind]
+            cursor = db[collection].find(
+                {field: {"$nin": [None, ""]}},
+                {"session_id": 1, "clause_index": 1, field: 1}
+            ).batch_size(batch_size)
+            rows, texts = [], []
+            async for doc in cursor:
+                rows.append({"ref": str(doc["_id"]), "session_id": doc["session_id"],
+                             "clause_index": doc.get("clause_index"), "kind": kind})
+                texts.append(doc[field])
+                if len(rows) >= batch_size:
+                    self.index.add(rows, self.embedder.embed_many(texts))
+                    total += len(rows)
+                    rows, texts = [], []
+            self.index.add(rows, self.embedder.embed_many(texts))
+            total += len(rows)
+        return total
+
+    # ─── Queries ──────────────────────────────────────────────────
+
+    async def text_search(
+        self,
+        query: str,
+        kind: str = "answers",
+        clause_index: Optional[int] = None,
+        session_id: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        kind_code = KINDS[kind]
+        field = SOURCE_FIELDS[kind_code]
+        filters: Dict[str, Any] = {"$text": {"$search": query}, **tenant_filter()}
+        if clause_index is not None:
+            filters["clause_index"] = clause_index
+        if session_id is not None:
+            filters["session_id"] = session_id
+        cursor = db[SOURCE_COLLECTIONS[kind_code]].find(
+            filters,
+            {"score": {"$meta": "textScore"}, "session_id": 1, "clause_index": 1, field: 1}
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return [self._hit(doc, kind, field, doc["score"]) for doc in await cursor.to_list(length=limit)]
+
+    async def similar(
+        self,
+        text: str,
+        kind: Optional[str] = None,
+        clause_index: Optional[int] = None,
+        session_id: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        # The index is shared by all tenants; over-fetch, then keep the caller's rows
+        matches = self.index.search(
+            self.embedder.embed(text),
+            limit=limit * 4,
+            kind=KINDS[kind] if kind else None,
+            clause_index=clause_index,
+            session_id=session_id
+        )
+        hits = []
+        for kind_code, collection in SOURCE_COLLECTIONS.items():
+            refs = [ObjectId(m["ref"]) for m in matches if m["kind"] == kind_code]
+            if not refs:
+                continue
+            field = SOURCE_FIELDS[kind_code]
+            docs = await db[collection].find(
+                {"_id": {"$in": refs}},
+                {"session_id": 1, "clause_index": 1, "tenant_id": 1, field: 1}
+            ).to_list(length=len(refs))
+            tenant_id = current_tenant()
+            by_id = {str(d["_id"]): d for d in docs if tenant_of(d) == tenant_id}
+            name = next(k for k, v in KINDS.items() if v == kind_code)
+            hits += [self._hit(by_id[m["ref"]], name, field, m["score"]) for m in matches if m["ref"] in by_id]
+        return sorted(hits, key=lambda h: h["score"], reverse=True)[:limit]
+
+    @staticmethod
+    def _hit(doc: Dict[str, Any], kind: str, field: str, score: float) -> Dict[str, Any]:
+        return {
+            "id": str(doc["_id"]),
+            "kind": kind,
+            "session_id": doc.get("session_id"),
+            "clause_index": doc.get("clause_index"),
+            "text": doc.get(field),
+            "score": score,
+        }
+
+
+# Global instance
+search_service = SearchService()
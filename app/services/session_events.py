@@ -0,0 +1,114 @@
+# app/services/session_events.py
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.event_bus import EventBus, build_event_bus
+
+logger = logging.getLogger("uvicorn")
+
+# Event names pushed to session subscribers
+CLAUSE_CHANGED = "clause_changed"
+ANSWER_RECORDED = "answer_recorded"
+AUDIT_COMPLETED = "audit_completed"
+DOCUMENT_ANALYZED = "document_analyzed"
+SCORE_UPDATED = "score_updated"
+REPORT_READY = "report_ready"
+
+
+class SessionEvents:
+    """
+    Publish/subscribe of per-session state changes.
+
+    Events reach this worker's WebSocket subscribers directly and every other
+    worker through the event bus, where they are handed to the ``on_remote``
+    handlers (the audit graph patches its cached state from the ``version``
+    and ``patch`` a mutation carries) before reaching that worker's
+    subscribers.
+
+    ``publish`` never blocks: each subscriber has a bounded queue and, when a
+    slow client lets it fill up, the oldest event is dropped. Status events
+    carry a full snapshot, so a client that missed some is corrected by the
+    next one.
+    """
+
+    def __init__(self, queue_size: int, bus: EventBus):
+        self.queue_size = queue_size
+        self.bus = bus
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._remote_handlers: List[Callable[[Dict[str, Any]], None]] = []
+        self.published = 0
+        self.dropped = 0
+
+    def publish(
+        self,
+        session_id: str,
+        event: str,
+        data: Dict[str, Any],
+        version: Optional[int] = None,
+        patch: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Deliver an event to this worker's subscribers and broadcast it to the others"""
+        self._deliver(session_id, event, data)
+        self.bus.send({"session_id": session_id, "event": event, "data": data, "version": version, "patch": patch})
+
+    def on_remote(self, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Call ``handler`` with every message published by another worker"""
+        self._remote_handlers.append(handler)
+
+    def _receive(self, message: Dict[str, Any]) -> None:
+        for handler in self._remote_handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                logger.warning(f"Session event handler failed for {message.get('session_id')}: {e}")
+        if message.get("session_id"):
+            self._deliver(message["session_id"], message["event"], message.get("data") or {})
+
+    def _deliver(self, session_id: str, event: str, data: Dict[str, Any]) -> None:
+        queues = self._subscribers.get(session_id)
+        if not queues:
+            return
+        message = {"type": "event", "event": event, "session_id": session_id, "data": data}
+        self.published += 1
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue receiving the session's events until the block exits"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(session_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[session_id]
+
+    async def start(self) -> None:
+        await self.bus.start(self._receive)
+
+    async def stop(self) -> None:
+        await self.bus.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._subscribers),
+            "subscribers": sum(len(q) for q in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+            **self.bus.stats(),
+        }
+
+
+# Global instance
+session_events = SessionEvents(settings.ws_event_queue_size, build_event_bus(settings.event_bus))
@@ -0,0 +1,186 @@
+# app/services/session_lifecycle.py
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, InsertOne, DeleteMany
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.services.mongo_client import db
+
+logger = logging.getLogger("uvicorn")
+
+# Collections keyed by session_id that move to cold storage with their session
+SESSION_SCOPED_COLLECTIONS = ["responses", "documents", "conversations"]
+ARCHIVE_BATCH_SIZE = 500
+
+
+async def ensure_session_indexes() -> None:
+    """Create the indexes the live and archive collections rely on"""
+    await db.sessions.create_index([("status", ASCENDING), ("last_active_at", ASCENDING)])
+    await db.sessions.create_index([("tenant_id", ASCENDING)])
+    await db.sessions.create_index([("campaign_id", ASCENDING)], sparse=True)
+    await db.sessions.create_index([("tenant_id", ASCENDING), ("unit", ASCENDING), ("created_at", ASCENDING)], sparse=True)
+    await db.campaigns.create_index([("status", ASCENDING), ("starts_at", ASCENDING)])
+    await db.campaigns.create_index([("tenant_id", ASCENDING), ("created_at", ASCENDING)])
+    await db.uploads.create_index([("tenant_id", ASCENDING), ("recorded_at", ASCENDING)])
+    await db.uploads.create_index("key")
+    await db.responses.create_index([("session_id", ASCENDING), ("clause_index", ASCENDING)])
+    await db.responses.create_index([("grading_status", ASCENDING), ("grading_retry_at", ASCENDING)], sparse=True)
+    await db.documents.create_index([("session_id", ASCENDING), ("clause_index", ASCENDING)])
+    await db.documents.create_index([("analysis_status", ASCENDING), ("uploaded_at", ASCENDING)], sparse=True)
+    await db.documents.create_index([("clause_index", ASCENDING), ("text_fingerprint", ASCENDING)], sparse=True)
+    await db.conversations.create_index([("session_id", ASCENDING)])
+    for collection in SESSION_SCOPED_COLLECTIONS:
+        await db[f"{collection}_archive"].create_index([("session_id", ASCENDING)])
+    await db.sessions_archive.create_index([("tenant_id", ASCENDING), ("unit", ASCENDING), ("created_at", ASCENDING)], sparse=True)
+    await db.sessions_archive.create_index([("tenant_id", ASCENDING)])
+    await db.clause_rollups.create_index([("tenant_id", ASCENDING), ("clause_index", ASCENDING)])
+    await db.clause_coverage.create_index([("tenant_id", ASCENDING)])
+    await db.llm_usage.create_index([("tenant_id", ASCENDING), ("day", ASCENDING)])
+    await db.llm_usage.create_index([("tenant_id", ASCENDING), ("session_id", ASCENDING)])
+    if settings.usage_retention_days > 0:
+        await db.llm_usage.create_index(
+            [("created_at", ASCENDING)],
+            expireAfterSeconds=settings.usage_retention_days * 86400
+        )
+    if settings.archive_ttl_days > 0:
+        # Child rows carry the same archived_at, so they expire with their session
+        for collection in ["sessions", *SESSION_SCOPED_COLLECTIONS]:
+            await db[f"{collection}_archive"].create_index(
+                [("archived_at", ASCENDING)],
+                expireAfterSeconds=settings.archive_ttl_days * 86400
+            )
+
+
+async def _copy_to_archive(collection: str, docs: List[Dict]) -> None:
+    """Insert docs into ``<collection>_archive``, tolerating re-runs after a partial move"""
+    await _copy(f"{collection}_archive", docs)
+
+
+async def _copy(collection: str, docs: List[Dict]) -> None:
+    """Insert docs into ``collection``, tolerating re-runs after a partial move"""
+    if not docs:
+        return
+    try:
+        await db[collection].bulk_write(
+            [InsertOne(doc) for doc in docs],
+            ordered=False
+        )
+    except BulkWriteError as e:
+        # Duplicate keys mean an earlier run already copied these rows
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+
+
+async def archive_sessions(now: Optional[datetime] = None) -> int:
+    """
+    Move completed and abandoned sessions, with their responses, documents and
+    conversations, into the ``*_archive`` collections. Returns the number of
+    sessions archived.
+    """
+    now = now or datetime.utcnow()
+    completed_cutoff = now - timedelta(days=settings.completed_archive_after_days)
+    abandoned_cutoff = now - timedelta(days=settings.abandoned_archive_after_days)
+    query = {"$or": [
+        {"status": "completed", "last_active_at": {"$lt": completed_cutoff}},
+        {"last_active_at": {"$lt": abandoned_cutoff}},
+    ]}
+
+    archived = 0
+    while True:
+        sessions = await db.sessions.find(query).limit(ARCHIVE_BATCH_SIZE).to_list(length=ARCHIVE_BATCH_SIZE)
+        if not sessions:
+            break
+        session_ids = [s["_id"] for s in sessions]
+
+        for collection in SESSION_SCOPED_COLLECTIONS:
+            rows = await db[collection].find({"session_id": {"$in": session_ids}}).to_list(length=None)
+            for row in rows:
+                row["archived_at"] = now
+            await _copy_to_archive(collection, rows)
+            await db[collection].bulk_write([DeleteMany({"session_id": {"$in": session_ids}})])
+
+        for sess in sessions:
+            sess["archived_at"] = now
+        await _copy_to_archive("sessions", sessions)
+        await db.sessions.delete_many({"_id": {"$in": session_ids}})
+
+        archived += len(session_ids)
+
+    return archived
+
+
+async def find_archived_session(session_id: str) -> Optional[Dict]:
+    """The archived session document, if the session has been archived"""
+    return await db.sessions_archive.find_one({"_id": session_id})
+
+
+async def restore_session(session_id: str, now: Optional[datetime] = None) -> Optional[Dict]:
+    """
+    Move an archived session, with its responses, documents and conversations,
+    back into the live collections and mark it active. Returns the restored
+    session document, or None if it is not in the archive.
+    """
+    sess = await find_archived_session(session_id)
+    if sess is None:
+        return None
+    for collection in SESSION_SCOPED_COLLECTIONS:
+        rows = await db[f"{collection}_archive"].find({"session_id": session_id}).to_list(length=None)
+        for row in rows:
+            row.pop("archived_at", None)
+        await _copy(collection, rows)
+    sess.pop("archived_at", None)
+    sess["last_active_at"] = now or datetime.utcnow()
+    await _copy("sessions", [sess])
+    # Only drop the archived copies once the live ones are in place
+    for collection in SESSION_SCOPED_COLLECTIONS:
+        await db[f"{collection}_archive"].delete_many({"session_id": session_id})
+    await db.sessions_archive.delete_one({"_id": session_id})
+    logger.info(f"Restored archived audit session {session_id}")
+    return sess
+
+
+class SessionSweeper:
+    """Background task that evicts idle in-memory sessions and archives old ones"""
+
+    def __init__(self, graph, archive_every: int = 60):
+        self.graph = graph
+        self.archive_every = archive_every  # run the archive job every N sweeps
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Checkpoint everything still in memory on shutdown
+        for session_id in list(self.graph.sessions):
+            await self.graph.evict(session_id)
+
+    async def _run(self) -> None:
+        sweeps = 0
+        while True:
+            await asyncio.sleep(settings.session_sweep_interval_seconds)
+            try:
+                evicted = await self.graph.evict_idle()
+                if evicted:
+                    logger.info(f"Evicted {evicted} idle audit sessions")
+                sweeps += 1
+                if sweeps % self.archive_every == 0:
+                    archived = await archive_sessions()
+                    if archived:
+                        logger.info(f"Archived {archived} audit sessions")
+            except Exception as e:
+                logger.warning(f"Session sweep failed: {e}")
@@ -0,0 +1,279 @@
+# app/services/session_transfer.py
+
+import asyncio
+import io
+import json
+import logging
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.services.mongo_client import db
+from app.services.storage import storage
+from app.services.tenancy import TENANT_PREFIX, current_tenant, storage_prefix, tenant_filter, tenant_key
+
+logger = logging.getLogger("uvicorn")
+
+ARCHIVE_FORMAT = "iso27001-audit-export"
+ARCHIVE_VERSION = 1
+MANIFEST = "manifest.json"
+BLOB_PREFIX = "blobs/"
+
+# Collections keyed by session_id, exported after the sessions themselves
+SESSION_COLLECTIONS = ["responses", "documents", "conversations"]
+ID_BATCH = 500
+FLUSH_BYTES = 256 * 1024
+DUPLICATE_KEY = 11000
+
+_JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+
+
+class ArchiveError(ValueError):
+    """The uploaded file is not a usable export archive"""
+
+
+def _line(doc: Dict[str, Any]) -> bytes:
+    return json_util.dumps(doc, json_options=_JSON_OPTIONS).encode() + b"\n"
+
+
+class _ZipSink:
+    """
+    Write-only destination for ``zipfile`` that the export generator drains
+    after every few records, so the archive streams out with bounded memory.
+    It has no ``tell``, which makes ``zipfile`` write data descriptors instead
+    of seeking back.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.pending = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.pending = 0
+        return data
+
+
+# ─── Export ──────────────────────────────────────────────────────
+
+async def export_sessions(session_ids: Optional[List[str]] = None, include_evidence: bool = True) -> AsyncIterator[bytes]:
+    """
+    Stream a zip archive of the calling tenant's sessions (all of them when
+    ``session_ids`` is empty): one NDJSON file per collection in MongoDB
+    Extended JSON, the evidence objects the sessions reference under
+    ``blobs/``, and a manifest written last.
+    """
+    tenant_id = current_tenant()
+    query: Dict[str, Any] = dict(tenant_filter(tenant_id))
+    if session_ids:
+        query["_id"] = {"$in": session_ids}
+
+    sink = _ZipSink()
+    counts: Dict[str, int] = {}
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        ids: List[str] = []
+        with archive.open("sessions.ndjson", "w", force_zip64=True) as out:
+            async for doc in db.sessions.find(query):
+                ids.append(doc["_id"])
+                out.write(_line(doc))
+                if sink.pending >= FLUSH_BYTES:
+                    yield sink.drain()
+        counts["sessions"] = len(ids)
+
+        keys = set()
+        for collection in SESSION_COLLECTIONS:
+            count = 0
+            with archive.open(f"{collection}.ndjson", "w", force_zip64=True) as out:
+                for i in range(0, len(ids), ID_BATCH):
+                    async for doc in db[collection].find({"session_id": {"$in": ids[i:i + ID_BATCH]}}):
+                        if collection == "documents" and doc.get("document_key"):
+                            keys.add(doc["document_key"])
+                        out.write(_line(doc))
+                        count += 1
+                        if sink.pending >= FLUSH_BYTES:
+                            yield sink.drain()
+            counts[collection] = count
+
+        found_keys: List[str] = []
+        with archive.open("uploads.ndjson", "w", force_zip64=True) as out:
+            ordered = sorted(keys)
+            for i in range(0, len(ordered), ID_BATCH):
+                async for doc in db.uploads.find({"key": {"$in": ordered[i:i + ID_BATCH]}, **tenant_filter(tenant_id)}):
+                    found_keys.append(doc["key"])
+                    out.write(_line(doc))
+                    if sink.pending >= FLUSH_BYTES:
+                        yield sink.drain()
+        counts["uploads"] = len(found_keys)
+
+        blobs = 0
+        if include_evidence:
+            for key in found_keys:
+                async for chunk in _write_blob(archive, sink, key):
+                    yield chunk
+                blobs += 1
+        counts["blobs"] = blobs
+
+        archive.writestr(MANIFEST, json.dumps({
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "tenant_id": tenant_id,
+            "exported_at": datetime.utcnow().isoformat(),
+            "include_evidence": include_evidence,
+            "counts": counts,
+        }, indent=2))
+    yield sink.drain()
+
+
+async def _write_blob(archive: zipfile.ZipFile, sink: _ZipSink, key: str) -> AsyncIterator[bytes]:
+    try:
+        info = await asyncio.to_thread(storage.head, key)
+    except FileNotFoundError:
+        logger.warning(f"Export skipped missing evidence object {key}")
+        return
+    entry = zipfile.ZipInfo(BLOB_PREFIX + key, date_time=datetime.utcnow().timetuple()[:6])
+    entry.compress_type = zipfile.ZIP_STORED        # evidence is mostly already compressed
+    entry.file_size = info.size                     # lets zipfile pick zip64 up front
+    chunks = await asyncio.to_thread(storage.iter_range, key)
+    with archive.open(entry, "w") as out:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            out.write(chunk)
+            if sink.pending >= FLUSH_BYTES:
+                yield sink.drain()
+
+
+# ─── Import ──────────────────────────────────────────────────────
+
+def _read_batch(lines: Iterator[str], size: int) -> List[Dict[str, Any]]:
+    batch = []
+    for line in lines:
+        if line.strip():
+            batch.append(json_util.loads(line, json_options=_JSON_OPTIONS))
+            if len(batch) >= size:
+                break
+    return batch
+
+
+class _Retenant:
+    """Moves imported documents and object keys into the importing tenant"""
+
+    def __init__(self, source: str, target: str, blob_keys: List[str]):
+        self.target = target
+        source_prefix, target_prefix = storage_prefix(source), storage_prefix(target)
+        self.keys: Dict[str, str] = {}
+        for key in blob_keys:
+            if key.startswith(source_prefix):
+                new_key = target_prefix + key[len(source_prefix):]
+            elif not key.startswith(TENANT_PREFIX) and target != settings.default_tenant:
+                new_key = tenant_key(key, target)    # legacy root-level key
+            else:
+                new_key = key
+            if new_key != key:
+                self.keys[key] = new_key
+
+    def key(self, key: str) -> str:
+        return self.keys.get(key, key)
+
+    def _values(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self.keys.get(value, value)
+        if isinstance(value, list):
+            return [self._values(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self._values(v) for k, v in value.items()}
+        return value
+
+    def document(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if self.keys:
+            doc = self._values(doc)
+        doc["tenant_id"] = self.target
+        if isinstance(doc.get("state"), dict):
+            doc["state"]["tenant_id"] = self.target
+        return doc
+
+
+async def import_sessions(fileobj: BinaryIO) -> Dict[str, Any]:
+    """
+    Load an archive produced by ``export_sessions`` into the calling tenant.
+    NDJSON is read in batches of ``transfer_batch_size`` and written with
+    unordered ``insert_many``; rows whose ``_id`` already exists are skipped,
+    so re-running an import is safe. Evidence is streamed into storage unless
+    the object is already present.
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+        manifest = json.loads(archive.read(MANIFEST))
+    except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as e:
+        raise ArchiveError(f"Not an audit export archive: {e}")
+    if manifest.get("format") != ARCHIVE_FORMAT or manifest.get("version") != ARCHIVE_VERSION:
+        raise ArchiveError("Unsupported archive format or version")
+
+    with archive:
+        names = set(archive.namelist())
+        blob_keys = [n[len(BLOB_PREFIX):] for n in names if n.startswith(BLOB_PREFIX) and not n.endswith("/")]
+        retenant = _Retenant(manifest.get("tenant_id") or settings.default_tenant, current_tenant(), blob_keys)
+
+        result: Dict[str, Any] = {"source_tenant": manifest.get("tenant_id"), "inserted": {}, "skipped": {}}
+        for collection in ["sessions", *SESSION_COLLECTIONS, "uploads"]:
+            name = f"{collection}.ndjson"
+            if name not in names:
+                continue
+            inserted, skipped = await _import_collection(archive, name, collection, retenant)
+            result["inserted"][collection] = inserted
+            result["skipped"][collection] = skipped
+
+        copied = 0
+        for key in blob_keys:
+            copied += await asyncio.to_thread(_copy_blob, archive, key, retenant.key(key))
+        result["inserted"]["blobs"] = copied
+        result["skipped"]["blobs"] = len(blob_keys) - copied
+    return result
+
+
+async def _import_collection(archive: zipfile.ZipFile, name: str, collection: str, retenant: _Retenant):
+    inserted = skipped = 0
+    with archive.open(name) as raw:
+        lines = iter(io.TextIOWrapper(raw, encoding="utf-8"))
+        while True:
+            batch = await asyncio.to_thread(_read_batch, lines, settings.transfer_batch_size)
+            if not batch:
+                break
+            batch = [retenant.document(doc) for doc in batch]
+            try:
+                await db[collection].insert_many(batch, ordered=False)
+                inserted += len(batch)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                    raise
+                skipped += len(errors)
+                inserted += len(batch) - len(errors)
+    return inserted, skipped
+
+
+def _copy_blob(archive: zipfile.ZipFile, key: str, target_key: str) -> bool:
+    """Stream one evidence object into storage unless an identical-size copy is already there"""
+    entry = archive.getinfo(BLOB_PREFIX + key)
+    try:
+        if storage.head(target_key).size == entry.file_size:
+            return False
+    except FileNotFoundError:
+        pass
+    with archive.open(entry) as src:
+        storage.put_file(target_key, src)
+    return True
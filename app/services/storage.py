@@ -0,0 +1,390 @@
+# app/services/storage.py
+
+import io
+import mimetypes
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+from app.config import settings
+from app.services.tenancy import valid_key
+
+CHUNK_SIZE = 1024 * 1024
+_UNSAFE_FILENAME_RE = re.compile(r'[^\x20-\x7e]|["\\]')   # non-ASCII, controls, quote, backslash
+
+
+class ObjectNotFound(FileNotFoundError):
+    """The key does not exist in the backend"""
+
+
+class InvalidKey(ValueError):
+    """The key is empty or has empty, ``.`` or ``..`` segments"""
+
+
+def checked_key(key: str) -> str:
+    if not valid_key(key):
+        raise InvalidKey(f"Invalid object key: {key}")
+    return key
+
+
+class PresignNotSupported(NotImplementedError):
+    """The backend cannot hand out direct-to-storage URLs; clients go through the API"""
+
+
+def content_disposition(kind: str, filename: str) -> str:
+    """
+    ``Content-Disposition`` value for a user-supplied filename: an ASCII
+    ``filename`` fallback with anything that could end the quoted string or
+    the header replaced, plus the exact name as RFC 5987 ``filename*``.
+    """
+    fallback = _UNSAFE_FILENAME_RE.sub("_", filename).strip() or "download"
+    return f"{kind}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+@dataclass
+class ObjectInfo:
+    key: str
+    size: int
+    etag: str
+    content_type: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+
+class StorageBackend:
+    """
+    Object storage for evidence and report artifacts.
+
+    Methods are blocking (callers run them with ``asyncio.to_thread``). Ranges
+    are half-open byte offsets ``[start, end)``. Backends that cannot sign
+    direct-to-storage URLs raise ``PresignNotSupported`` from the presign and
+    multipart methods. Every backend rejects keys ``checked_key`` refuses,
+    so no key can step out of its tenant's prefix.
+    """
+
+    name = "abstract"
+    supports_presign = False
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> ObjectInfo:
+        raise NotImplementedError
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> ObjectInfo:
+        raise NotImplementedError
+
+    def head(self, key: str) -> ObjectInfo:
+        raise NotImplementedError
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def copy_to(self, key: str, fileobj: BinaryIO) -> int:
+        """Write the whole object into ``fileobj``; returns the byte count"""
+        written = 0
+        for chunk in self.iter_range(key):
+            fileobj.write(chunk)
+            written += len(chunk)
+        return written
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def get_bytes(self, key: str) -> bytes:
+        return b"".join(self.iter_range(key))
+
+    def read_range(self, key: str, start: int, end: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_range(key, start, end))
+
+    @contextmanager
+    def open_buffer(self, key: str) -> Iterator[Any]:
+        """The whole object as a read-only bytes-like, seekable buffer"""
+        yield self.get_bytes(key)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of the object when the backend is local disk"""
+        return None
+
+    # ─── Direct client access ─────────────────────────────────────
+
+    def presigned_put_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        raise PresignNotSupported(self.name)
+
+    def presigned_get_url(self, key: str, filename: Optional[str] = None, expires_in: Optional[int] = None) -> str:
+        raise PresignNotSupported(self.name)
+
+    def create_multipart_upload(self, key: str, content_type: Optional[str] = None) -> str:
+        raise PresignNotSupported(self.name)
+
+    def presign_upload_part(self, key: str, upload_id: str, part_number: int) -> str:
+        raise PresignNotSupported(self.name)
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: List[Dict[str, Any]]) -> None:
+        raise PresignNotSupported(self.name)
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        raise PresignNotSupported(self.name)
+
+
+# ─── S3 and S3-compatible ────────────────────────────────────────
+
+class S3Storage(StorageBackend):
+    """AWS S3, or any S3-compatible store (MinIO, Ceph) via ``s3_endpoint_url``"""
+
+    name = "s3"
+    supports_presign = True
+
+    def __init__(self, bucket: str):
+        from app.services import s3_client   # boto3 is only needed for this backend
+        self.bucket = bucket
+        self._s3 = s3_client
+
+    @property
+    def client(self):
+        return self._s3.s3
+
+    def _missing(self, e: Exception) -> bool:
+        code = getattr(e, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> ObjectInfo:
+        key = checked_key(key)
+        extra = {"ContentType": content_type} if content_type else {}
+        response = self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+        return ObjectInfo(key, len(data), response.get("ETag", "").strip('"'), content_type)
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> ObjectInfo:
+        key = checked_key(key)
+        # Managed transfer: streams the file and switches to multipart for large bodies
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra)
+        return self.head(key)
+
+    def head(self, key: str) -> ObjectInfo:
+        key = checked_key(key)
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if self._missing(e):
+                raise ObjectNotFound(f"Object not found: {key}") from e
+            raise
+        return ObjectInfo(
+            key=key,
+            size=response["ContentLength"],
+            etag=response.get("ETag", "").strip('"'),
+            content_type=response.get("ContentType"),
+            last_modified=response.get("LastModified")
+        )
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        # Not a generator: the GET is issued here, so a missing key raises
+        # ObjectNotFound before a caller starts a response
+        key = checked_key(key)
+        params = {"Bucket": self.bucket, "Key": key}
+        if start or end is not None:
+            if end is not None and end <= start:
+                return iter(())
+            params["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            body = self.client.get_object(**params)["Body"]
+        except Exception as e:
+            if self._missing(e):
+                raise ObjectNotFound(f"Object not found: {key}") from e
+            raise
+        return self._body_chunks(body, chunk_size)
+
+    @staticmethod
+    def _body_chunks(body, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from iter(lambda: body.read(chunk_size), b"")
+        finally:
+            body.close()
+
+    def copy_to(self, key: str, fileobj: BinaryIO) -> int:
+        key = checked_key(key)
+        self.client.download_fileobj(self.bucket, key, fileobj)
+        return fileobj.tell()
+
+    def delete(self, key: str) -> None:
+        key = checked_key(key)
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presigned_put_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        key = checked_key(key)
+        return self._s3.create_presigned_url(key, expires_in)
+
+    def presigned_get_url(self, key: str, filename: Optional[str] = None, expires_in: Optional[int] = None) -> str:
+        key = checked_key(key)
+        return self._s3.create_presigned_get_url(key, filename, expires_in)
+
+    def create_multipart_upload(self, key: str, content_type: Optional[str] = None) -> str:
+        key = checked_key(key)
+        return self._s3.create_multipart_upload(key, content_type)
+
+    def presign_upload_part(self, key: str, upload_id: str, part_number: int) -> str:
+        key = checked_key(key)
+        return self._s3.presign_upload_part(key, upload_id, part_number)
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: List[Dict[str, Any]]) -> None:
+        key = checked_key(key)
+        self._s3.complete_multipart_upload(key, upload_id, parts)
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        key = checked_key(key)
+        self._s3.abort_multipart_upload(key, upload_id)
+
+
+# ─── Local disk ──────────────────────────────────────────────────
+
+def _fileno(fileobj: BinaryIO) -> Optional[int]:
+    if isinstance(fileobj, tempfile.SpooledTemporaryFile) and not fileobj._rolled:
+        return None                      # fileno() would force it onto disk first
+    try:
+        return fileobj.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """
+    Objects as files under ``root`` for on-prem, air-gapped and benchmark
+    setups. Writes are atomic (temp file + rename), copies between real files
+    use ``sendfile``, range reads use ``pread`` and whole-object buffers are
+    memory-mapped. ETags are derived from size and mtime, like most static
+    file servers.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, checked_key(key)))
+        if not path.startswith(self.root + os.sep):
+            raise InvalidKey(f"Invalid object key: {key}")
+        return path
+
+    def _info(self, key: str, path: str) -> ObjectInfo:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError as e:
+            raise ObjectNotFound(f"Object not found: {key}") from e
+        return ObjectInfo(
+            key=key,
+            size=st.st_size,
+            etag=f"{st.st_size:x}-{st.st_mtime_ns:x}",
+            content_type=mimetypes.guess_type(key)[0],
+            last_modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+        )
+
+    def _write(self, key: str, write) -> ObjectInfo:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                write(out)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return self._info(key, path)
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> ObjectInfo:
+        return self._write(key, lambda out: out.write(data))
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> ObjectInfo:
+        return self._write(key, lambda out: _copy(fileobj, out))
+
+    def head(self, key: str) -> ObjectInfo:
+        return self._info(key, self._path(key))
+
+    def _open(self, key: str) -> BinaryIO:
+        try:
+            return open(self._path(key), "rb")
+        except FileNotFoundError as e:
+            raise ObjectNotFound(f"Object not found: {key}") from e
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        # Opened eagerly so a missing key fails before any bytes are sent, and
+        # a later unlink (cache eviction) cannot cut the stream short
+        f = self._open(key)
+        size = os.fstat(f.fileno()).st_size
+        return self._pread_chunks(f, start, size if end is None else min(end, size), chunk_size)
+
+    @staticmethod
+    def _pread_chunks(f: BinaryIO, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        # pread per chunk: no shared file position, one syscall per chunk
+        with f:
+            for offset in range(start, end, chunk_size):
+                yield os.pread(f.fileno(), min(chunk_size, end - offset), offset)
+
+    @contextmanager
+    def open_buffer(self, key: str) -> Iterator[Any]:
+        # Map the file instead of reading it: hashing and parsing work on the
+        # page cache directly, with no copy into a Python buffer
+        with self._open(key) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def copy_to(self, key: str, fileobj: BinaryIO) -> int:
+        with self._open(key) as src:
+            return _copy(src, fileobj)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+def _copy(src: BinaryIO, dst: BinaryIO) -> int:
+    """Copy ``src`` from its current position to ``dst``, in-kernel when both are real files"""
+    src_fd, dst_fd = _fileno(src), _fileno(dst)
+    if src_fd is not None and dst_fd is not None and hasattr(os, "sendfile"):
+        dst.flush()
+        offset = src.tell()
+        remaining = os.fstat(src_fd).st_size - offset
+        total = 0
+        try:
+            while remaining > 0:
+                sent = os.sendfile(dst_fd, src_fd, offset + total, min(remaining, 1 << 30))
+                if sent == 0:
+                    break
+                total += sent
+                remaining -= sent
+        except OSError:
+            if total:
+                raise
+        else:
+            src.seek(offset + total)
+            dst.seek(0, os.SEEK_END)
+            return total
+    total = 0
+    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+        dst.write(chunk)
+        total += len(chunk)
+    return total
+
+
+def build_storage(backend: str, root: str) -> StorageBackend:
+    if backend == "local":
+        return LocalStorage(root)
+    if backend == "s3":
+        return S3Storage(settings.s3_bucket)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# Global instances
+storage = build_storage(settings.storage_backend, settings.storage_dir)
+report_storage = build_storage(settings.report_storage, settings.report_dir)
@@ -0,0 +1,111 @@
+# app/services/tenancy.py
+
+import hmac
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, FrozenSet, Iterator, Optional
+
+from app.config import settings
+
+TENANT_HEADER = "X-Tenant-ID"
+TENANT_KEY_HEADER = "X-Tenant-Key"
+TENANT_PREFIX = "tenants/"
+
+_TENANT_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+# Bound per request by the tenant middleware; background workers bind it
+# explicitly with ``tenant_scope``
+_current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+
+class TenantRejected(ValueError):
+    """The request names a tenant that is not configured, or without its key"""
+
+
+def validate_tenant_id(tenant_id: str) -> str:
+    if not _TENANT_ID_RE.match(tenant_id):
+        raise ValueError("Invalid tenant id")
+    return tenant_id
+
+
+def known_tenants() -> FrozenSet[str]:
+    """The default tenant plus every tenant named in TENANTS, TENANT_LIMITS or TENANT_API_KEYS"""
+    return frozenset([settings.default_tenant, *settings.tenants, *settings.tenant_limits, *settings.tenant_api_keys])
+
+
+def authorize_tenant(tenant_id: Optional[str], api_key: Optional[str] = None) -> None:
+    """
+    Reject a client-supplied tenant unless it is configured and, when it has
+    an entry in TENANT_API_KEYS, the request carries that key. Only request
+    handlers call this; background workers bind tenants read from stored data.
+    """
+    tenant_id = validate_tenant_id(tenant_id) if tenant_id else settings.default_tenant
+    if tenant_id not in known_tenants():
+        raise TenantRejected("Unknown tenant")
+    expected = settings.tenant_api_keys.get(tenant_id)
+    if expected and not hmac.compare_digest(expected.encode(), (api_key or "").encode()):
+        raise TenantRejected("Invalid or missing tenant key")
+
+
+def current_tenant() -> str:
+    return _current_tenant.get() or settings.default_tenant
+
+
+def bind_tenant(tenant_id: Optional[str]):
+    """Set the tenant for the current context; returns a token for ``reset_tenant``"""
+    return _current_tenant.set(validate_tenant_id(tenant_id) if tenant_id else None)
+
+
+def reset_tenant(token) -> None:
+    _current_tenant.reset(token)
+
+
+@contextmanager
+def tenant_scope(tenant_id: Optional[str]) -> Iterator[str]:
+    token = bind_tenant(tenant_id)
+    try:
+        yield current_tenant()
+    finally:
+        reset_tenant(token)
+
+
+# ─── Data scoping ────────────────────────────────────────────────
+
+def tenant_of(doc: Dict[str, Any]) -> str:
+    """Tenant a stored document belongs to (documents from before tenancy belong to the default tenant)"""
+    return doc.get("tenant_id") or settings.default_tenant
+
+
+def tenant_filter(tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """Mongo filter matching one tenant's documents"""
+    tenant_id = tenant_id or current_tenant()
+    if tenant_id == settings.default_tenant:
+        return {"tenant_id": {"$in": [tenant_id, None]}}
+    return {"tenant_id": tenant_id}
+
+
+def valid_key(key: str) -> bool:
+    """True if an object key is relative and has no empty, ``.`` or ``..`` segments"""
+    if not key or "\\" in key or "\x00" in key:
+        return False
+    return all(segment not in ("", ".", "..") for segment in key.split("/"))
+
+
+def storage_prefix(tenant_id: Optional[str] = None) -> str:
+    return f"{TENANT_PREFIX}{tenant_id or current_tenant()}/"
+
+
+def tenant_key(key: str, tenant_id: Optional[str] = None) -> str:
+    """Object-storage key under the tenant's prefix"""
+    return storage_prefix(tenant_id) + key.lstrip("/")
+
+
+def owns_key(key: str, tenant_id: Optional[str] = None) -> bool:
+    """True if an object key belongs to the tenant (legacy root-level keys belong to the default tenant)"""
+    if not valid_key(key):
+        return False      # "tenants/a/../b/x" would pass the prefix test but resolve to tenant b
+    tenant_id = tenant_id or current_tenant()
+    if key.startswith(storage_prefix(tenant_id)):
+        return True
+    return tenant_id == settings.default_tenant and not key.startswith(TENANT_PREFIX)
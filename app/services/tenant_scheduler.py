@@ -0,0 +1,183 @@
+# app/services/tenant_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from app.config import settings
+
+
+class TenantQuotaExceeded(Exception):
+    """Raised when a tenant has used up its token budget for the current window"""
+
+
+class _TenantState:
+    def __init__(self, tenant_id: str):
+        limits = settings.tenant_limits.get(tenant_id, {})
+        self.tenant_id = tenant_id
+        self.weight = float(limits.get("weight", 1.0))
+        self.max_concurrency = int(limits.get("max_concurrency", settings.tenant_max_concurrency))
+        self.tokens_per_minute = int(limits.get("tokens_per_minute", settings.tenant_tokens_per_minute))
+        self.balance = float(self.tokens_per_minute)
+        self.refilled_at = time.monotonic()
+        self.used_at = self.refilled_at
+        self.last_finish = 0.0
+        self.active = 0
+        self.queued = 0
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.rejected = 0
+        self.waits = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def has_budget(self) -> bool:
+        if self.tokens_per_minute <= 0:
+            return True
+        now = time.monotonic()
+        refill = (now - self.refilled_at) * self.tokens_per_minute / 60
+        self.balance = min(float(self.tokens_per_minute), self.balance + refill)
+        self.refilled_at = now
+        return self.balance > 0
+
+    def idle(self, now: float) -> bool:
+        """Nothing running or queued, unused for ``tenant_idle_seconds`` and the bucket full again"""
+        if self.active or self.queued or now - self.used_at < settings.tenant_idle_seconds:
+            return False
+        return self.tokens_per_minute <= 0 or (self.has_budget() and self.balance >= self.tokens_per_minute)
+
+
+class FairScheduler:
+    """
+    Weighted fair queue in front of the LLM.
+
+    At most ``llm_max_concurrency`` calls run at once, and each tenant at most
+    its own ``max_concurrency``. Waiting calls are ordered by start-time fair
+    queuing: each call gets a virtual finish tag of
+    ``max(vtime, tenant's last tag) + cost / weight``, so a tenant that floods
+    the queue only delays its own later calls. Token budgets are a per-minute
+    bucket checked before a call and debited with the actual usage afterwards.
+    Idle tenants are forgotten whenever a new one is first seen, so the
+    per-tenant table only holds tenants in recent use.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._active = 0
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        self._heap: List[Tuple[float, int, str, float, asyncio.Future]] = []
+        self._tenants: Dict[str, _TenantState] = {}
+
+    def _tenant(self, tenant_id: str) -> _TenantState:
+        state = self._tenants.get(tenant_id)
+        if state is None:
+            self._evict_idle()
+            state = self._tenants[tenant_id] = _TenantState(tenant_id)
+        state.used_at = time.monotonic()
+        return state
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        for tenant_id in [tenant_id for tenant_id, state in self._tenants.items() if state.idle(now)]:
+            del self._tenants[tenant_id]
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str, cost: float = 1.0, enforce_quota: bool = True) -> AsyncIterator[None]:
+        """Hold one LLM slot for ``tenant_id`` for the duration of the block"""
+        await self.acquire(tenant_id, cost, enforce_quota)
+        try:
+            yield
+        finally:
+            self.release(tenant_id)
+
+    async def acquire(self, tenant_id: str, cost: float = 1.0, enforce_quota: bool = True) -> None:
+        tenant = self._tenant(tenant_id)
+        if enforce_quota and not tenant.has_budget():
+            tenant.rejected += 1
+            raise TenantQuotaExceeded(f"Token quota exceeded for tenant '{tenant_id}'")
+
+        start = max(self._vtime, tenant.last_finish)
+        tenant.last_finish = start + max(cost, 1.0) / tenant.weight
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (tenant.last_finish, next(self._seq), tenant_id, start, future))
+        tenant.queued += 1
+        queued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(tenant_id)     # granted, then cancelled before use
+            raise
+        finally:
+            tenant.queued -= 1
+            tenant.waits += 1
+            waited = (time.monotonic() - queued_at) * 1000
+            tenant.wait_ms_total += waited
+            tenant.wait_ms_max = max(tenant.wait_ms_max, waited)
+
+    def release(self, tenant_id: str) -> None:
+        self._tenant(tenant_id).active -= 1
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        skipped = []
+        while self._heap and self._active < self.max_concurrency:
+            entry = heapq.heappop(self._heap)
+            _, _, tenant_id, start, future = entry
+            if future.done():
+                continue
+            tenant = self._tenants[tenant_id]
+            if tenant.active >= tenant.max_concurrency:
+                skipped.append(entry)
+                continue
+            tenant.active += 1
+            self._active += 1
+            self._vtime = max(self._vtime, start)
+            future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+
+    def charge(self, tenant_id: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """Record a finished call's usage against the tenant"""
+        tenant = self._tenant(tenant_id)
+        tenant.calls += 1
+        tenant.prompt_tokens += prompt_tokens
+        tenant.completion_tokens += completion_tokens
+        if tenant.tokens_per_minute > 0:
+            tenant.balance -= prompt_tokens + completion_tokens
+
+    def usage(self, tenant_id: str) -> Dict[str, Any]:
+        """Live counters for one tenant since it was last idle (the usage ledger keeps the history)"""
+        tenant = self._tenant(tenant_id)
+        tenant.has_budget()
+        return {
+            "tenant_id": tenant_id,
+            "weight": tenant.weight,
+            "max_concurrency": tenant.max_concurrency,
+            "tokens_per_minute": tenant.tokens_per_minute or None,
+            "token_budget_remaining": max(0, int(tenant.balance)) if tenant.tokens_per_minute > 0 else None,
+            "active": tenant.active,
+            "queued": tenant.queued,
+            "calls": tenant.calls,
+            "prompt_tokens": tenant.prompt_tokens,
+            "completion_tokens": tenant.completion_tokens,
+            "rejected": tenant.rejected,
+            "avg_wait_ms": tenant.wait_ms_total / tenant.waits if tenant.waits else 0.0,
+            "max_wait_ms": tenant.wait_ms_max,
+        }
+
+
+def estimate_tokens(text_length: int) -> int:
+    """Rough pre-call token estimate used as the fair-queue cost"""
+    return max(1, text_length // 4)
+
+
+# Global instance
+tenant_scheduler = FairScheduler(settings.llm_max_concurrency)
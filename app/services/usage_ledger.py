@@ -0,0 +1,241 @@
+# app/services/usage_ledger.py
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.services.mongo_client import db
+from app.services.request_log import route_template
+
+logger = logging.getLogger("uvicorn")
+
+# Dimensions a rollup can group by, mapped to ledger fields
+ROLLUP_FIELDS = {
+    "session": "session_id",
+    "clause": "clause_index",
+    "endpoint": "endpoint",
+    "day": "day",
+    "prompt": "prompt",
+    "model": "model",
+}
+BACKGROUND = "background"
+
+# Attribution of LLM calls: the request scope (set by the tenant middleware)
+# plus fields tagged along the way (session, clause)
+_usage_tags: ContextVar[Optional[Dict[str, Any]]] = ContextVar("usage_tags", default=None)
+
+
+@contextmanager
+def usage_scope(**tags: Any) -> Iterator[Dict[str, Any]]:
+    """Attribute LLM calls made inside the block to ``tags`` (on top of the enclosing scope's)"""
+    merged = {**(_usage_tags.get() or {}), **tags}
+    token = _usage_tags.set(merged)
+    try:
+        yield merged
+    finally:
+        _usage_tags.reset(token)
+
+
+def tag_usage(**fields: Any) -> None:
+    """Add fields to the current scope, e.g. the session and clause a request turned out to be about"""
+    tags = _usage_tags.get()
+    if tags is not None:
+        tags.update(fields)
+
+
+def price_of(model: Optional[str]) -> Optional[Dict[str, float]]:
+    """USD per 1K tokens for a model, matching dated variants by their longest known prefix"""
+    if not model:
+        return None
+    matches = [name for name in settings.llm_prices if model.startswith(name)]
+    return settings.llm_prices[max(matches, key=len)] if matches else None
+
+
+def cost_usd(model: Optional[str], prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> Optional[float]:
+    price = price_of(model)
+    if price is None:
+        return None
+    cached_price = price.get("cached", price["prompt"] / 2)
+    return round((
+        (prompt_tokens - cached_tokens) * price["prompt"]
+        + cached_tokens * cached_price
+        + completion_tokens * price["completion"]
+    ) / 1000, 6)
+
+
+def _split(total: int, parts: int) -> List[int]:
+    share, extra = divmod(total, parts)
+    return [share + (1 if i < extra else 0) for i in range(parts)]
+
+
+class UsageLedger:
+    """
+    Persists one record per LLM call to ``db.llm_usage``: tenant, session,
+    clause, endpoint, prompt@version, model, tokens (prompt, completion,
+    cached), prompt-cache hit, latency and cost.
+
+    ``record`` is called by the gateway on the request path and only queues;
+    a worker writes batches of up to ``usage_batch_size`` with one unordered
+    ``insert_many`` every ``usage_flush_seconds``. When Mongo falls behind and
+    ``usage_queue_size`` records are waiting, new ones are dropped and
+    counted rather than holding up requests.
+
+    A call made on behalf of several clauses (a grading batch) carries
+    ``allocations`` and is split into one record per clause with the tokens,
+    latency and call count shared out, so per-session and per-clause rollups
+    add up.
+    """
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=settings.usage_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def collection(self):
+        return db.llm_usage
+
+    # ─── Producer side ────────────────────────────────────────────
+
+    def record(self, call) -> None:
+        """Queue the ledger records for a gateway ``LLMCall``; never blocks"""
+        tags = _usage_tags.get() or {}
+        scope = tags.get("request")
+        now = datetime.utcnow()
+        base = {
+            "created_at": now,
+            "day": now.strftime("%Y-%m-%d"),
+            "tenant_id": call.tenant_id,
+            "session_id": tags.get("session_id"),
+            "clause_index": tags.get("clause_index"),
+            "endpoint": tags.get("endpoint") or (route_template(scope) if scope else BACKGROUND),
+            "prompt": call.prompt,
+            "prompt_version": call.prompt_version,
+            "model": call.model,
+        }
+        allocations = tags.get("allocations") or [{}]
+        shares = {
+            field: _split(getattr(call, field), len(allocations))
+            for field in ("prompt_tokens", "completion_tokens", "cached_tokens")
+        }
+        for i, allocation in enumerate(allocations):
+            doc = {**base, **allocation, **{field: values[i] for field, values in shares.items()}}
+            doc["cache_hit"] = doc["cached_tokens"] > 0
+            doc["cost_usd"] = cost_usd(call.model, doc["prompt_tokens"], doc["completion_tokens"], doc["cached_tokens"])
+            doc["calls"] = 1 / len(allocations)
+            doc["latency_ms"] = round(call.latency_ms / len(allocations), 1)
+            try:
+                self._queue.put_nowait(doc)
+            except asyncio.QueueFull:
+                self.dropped += 1
+        self.start()
+
+    # ─── Worker ───────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker after writing what is queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            await self._write(self._drain(settings.usage_batch_size))
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                # Let a batch build up unless it is already full
+                if self._queue.qsize() < settings.usage_batch_size - 1:
+                    await asyncio.sleep(settings.usage_flush_seconds)
+            finally:
+                # Also on shutdown, so the record already taken is not lost
+                batch.extend(self._drain(settings.usage_batch_size - 1))
+                await self._write(batch)
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except PyMongoError as e:
+            self.dropped += len(batch)
+            logger.warning(f"Usage ledger dropped {len(batch)} records: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "queued": self._queue.qsize(), "dropped": self.dropped}
+
+    # ─── Rollups ──────────────────────────────────────────────────
+
+    async def rollup(
+        self,
+        tenant_id: str,
+        by: List[str],
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        session_id: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        Totals grouped by ``by`` (keys of ``ROLLUP_FIELDS``) for one tenant,
+        optionally limited to days ``since``..``until`` (YYYY-MM-DD,
+        inclusive) or one session; most expensive groups first.
+        """
+        unknown = [name for name in by if name not in ROLLUP_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown rollup dimension(s): {', '.join(unknown)}")
+        match: Dict[str, Any] = {"tenant_id": tenant_id}
+        if since or until:
+            match["day"] = {**({"$gte": since} if since else {}), **({"$lte": until} if until else {})}
+        if session_id:
+            match["session_id"] = session_id
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {name: f"${ROLLUP_FIELDS[name]}" for name in by},
+                "calls": {"$sum": "$calls"},
+                "prompt_tokens": {"$sum": "$prompt_tokens"},
+                "completion_tokens": {"$sum": "$completion_tokens"},
+                "cached_tokens": {"$sum": "$cached_tokens"},
+                "cost_usd": {"$sum": "$cost_usd"},
+                "latency_ms": {"$sum": "$latency_ms"},
+            }},
+            {"$sort": {"cost_usd": -1, "prompt_tokens": -1}},
+            {"$limit": limit},
+        ]
+        rows = []
+        async for row in self.collection.aggregate(pipeline):
+            group = row.pop("_id") or {}
+            latency_ms = row.pop("latency_ms")
+            rows.append({
+                **{name: group.get(name) for name in by},
+                **row,
+                "calls": round(row["calls"], 2),
+                "cost_usd": round(row["cost_usd"], 6),
+                "cache_hit_ratio": round(row["cached_tokens"] / row["prompt_tokens"], 3) if row["prompt_tokens"] else 0.0,
+                "avg_latency_ms": round(latency_ms / row["calls"], 1) if row["calls"] else 0.0,
+            })
+        return rows
+
+
+# Global instance
+usage_ledger = UsageLedger()
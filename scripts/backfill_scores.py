@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Rescore historical answers in db.responses with the current scoring engine.
+
+Answers are read in batches, scored in one vectorised pass per batch and
+written back with unordered bulk updates. Rows already scored with the
+current SCORING_VERSION are skipped unless --all is given. Every tenant's clause
+rollups are rebuilt afterwards so /analytics reflects the new scores.
+
+    python scripts/backfill_scores.py --batch-size 5000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pymongo import UpdateOne  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services import analytics  # noqa: E402
+from app.services.mongo_client import db  # noqa: E402
+from app.services.scoring import SCORING_VERSION, score_texts  # noqa: E402
+
+
+async def _flush(batch) -> int:
+    if not batch:
+        return 0
+    scores = score_texts([doc.get("answer") or "" for doc in batch])
+    await db.responses.bulk_write(
+        [
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"score": float(score), "scoring_version": SCORING_VERSION}}
+            )
+            for doc, score in zip(batch, scores)
+        ],
+        ordered=False
+    )
+    return len(batch)
+
+
+async def backfill(batch_size: int, rescore_all: bool, rebuild: bool) -> None:
+    query = {} if rescore_all else {"scoring_version": {"$ne": SCORING_VERSION}}
+    cursor = db.responses.find(query, {"answer": 1}).batch_size(batch_size)
+
+    started = time.perf_counter()
+    updated = 0
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            updated += await _flush(batch)
+            batch = []
+            print(f"rescored {updated} responses ({updated / (time.perf_counter() - started):.0f}/s)")
+    updated += await _flush(batch)
+    print(f"done: rescored {updated} responses in {time.perf_counter() - started:.1f}s")
+
+    if rebuild:
+        # The default tenant always runs, to clear rollup rows from before they were per tenant
+        tenants = {settings.default_tenant}
+        for collection in (db.responses, db.documents):
+            tenants.update(tenant_id or settings.default_tenant for tenant_id in await collection.distinct("tenant_id"))
+        for tenant_id in sorted(tenants):
+            await analytics.rebuild_rollups(tenant_id)
+        print(f"clause rollups rebuilt for {len(tenants)} tenants")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--all", action="store_true", help="rescore rows already at the current scoring version")
+    parser.add_argument("--no-rebuild", action="store_true", help="skip rebuilding the analytics rollups")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.all, not args.no_rebuild))
+
+
+if __name__ == "__main__":
+    main()
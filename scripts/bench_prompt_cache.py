@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Prompt-layout benchmark: per-call f-string prompts vs. the compiled registry.
+
+Replays a synthetic mix of clause-scoped calls (chat queries and document
+analyses across random clauses) through both layouts and reports render time,
+input tokens, the prefix each call shares with an earlier call of the same
+prompt, and how much of that a provider-side prefix cache can reuse. The cache
+model follows OpenAI's rules: a prefix is cacheable once it reaches 1024
+tokens, in 128-token increments, and cached input tokens are billed at
+--cached-discount. --pad-instructions appends N tokens of filler to the static
+instructions to show where the layouts diverge once prompts cross the
+threshold.
+
+--live sends real requests through the LLM gateway and prints the
+provider-reported cached tokens and latency per prompt version (needs
+OPENAI_API_KEY).
+
+    python scripts/bench_prompt_cache.py --calls 2000
+    python scripts/bench_prompt_cache.py --pad-instructions 1200
+    python scripts/bench_prompt_cache.py --live --calls 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/bench")
+os.environ.setdefault("S3_BUCKET", "bench")
+
+from app.services import prompts  # noqa: E402
+from app.services.audit_engine import CLAUSE_METADATA  # noqa: E402
+from app.services.llm_gateway import llm_gateway  # noqa: E402
+
+CACHE_MIN_TOKENS = 1024
+CACHE_INCREMENT = 128
+
+QUERIES = [
+    "What does this clause require from us?",
+    "Is a one-page scope statement enough?",
+    "Who should sign off on this?",
+    "What evidence would an auditor expect here?",
+    "We outsource hosting to a cloud provider, does that matter?",
+    "Can you give an example of a good answer?",
+]
+
+# Stand-in for the ingested excerpt and file details document analysis now sends
+DOCUMENT_DETAILS = "application/pdf, 12 pages"
+DOCUMENT_TEXT = (
+    "Information Security Policy. Scope: all offices, cloud hosting and remote staff. "
+    "Roles: the CISO owns the ISMS; asset owners review access quarterly. "
+) * 6
+
+
+def _document_values(document: str) -> Dict[str, str]:
+    return {"document": document, "details": DOCUMENT_DETAILS, "text": DOCUMENT_TEXT}
+
+
+def _token_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model("gpt-4")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        return lambda text: max(1, len(text) // 4)   # offline estimate
+
+
+# ─── Legacy layout (per-call f-strings), kept here for comparison only ──
+
+def _legacy_query(instructions: str, clause: Dict, query: str) -> Tuple[str, str]:
+    user = f'''
+Current Clause: {clause['question']}
+Description: {clause['description']}
+Key Attributes: {', '.join(clause['attributes'])}
+
+User Message: {query}
+'''
+    return instructions, user
+
+
+def _legacy_document(instructions: str, clause: Dict, document: str) -> Tuple[str, str]:
+    user = f"""
+            **Current Clause Analysis Request**
+
+            **Clause:** {clause['question']}
+            **Description:** {clause['description']}
+            **Key Requirements:** {', '.join(clause['attributes'])}
+
+            **Document to Analyze:** {document} ({DOCUMENT_DETAILS})
+
+            **Document Text:**
+            {DOCUMENT_TEXT}
+
+            {instructions}
+
+            .
+            """
+    return "You are an expert ISO 27001 auditor analyzing uploaded documents for compliance.", user
+
+
+# ─── Workload ────────────────────────────────────────────────────
+
+def _workload(n: int, seed: int) -> List[Tuple[str, int, str]]:
+    rng = random.Random(seed)
+    calls = []
+    for i in range(n):
+        idx = rng.randrange(len(CLAUSE_METADATA))
+        if rng.random() < 0.8:
+            calls.append((prompts.AGENT_QUERY, idx, rng.choice(QUERIES)))
+        else:
+            calls.append((prompts.DOCUMENT_ANALYSIS, idx, f"evidence/policy-{i}.pdf"))
+    return calls
+
+
+def _specs(pad_tokens: int) -> List[prompts.PromptSpec]:
+    filler = " ".join(["Follow the audit methodology."] * (pad_tokens // 5))
+    return [
+        prompts.PromptSpec(spec.name, f"{spec.instructions}\n\n{filler}".strip(), spec.tail, spec.clause_scoped)
+        for spec in prompts.PROMPT_SPECS
+    ]
+
+
+def _legacy_render(specs: List[prompts.PromptSpec]):
+    instructions = {spec.name: spec.instructions for spec in specs}
+
+    def render(name: str, idx: int, text: str) -> Tuple[str, str]:
+        if name == prompts.AGENT_QUERY:
+            return _legacy_query(instructions[name], CLAUSE_METADATA[idx], text)
+        return _legacy_document(instructions[name], CLAUSE_METADATA[idx], text)
+    return render
+
+
+def _registry_render(specs: List[prompts.PromptSpec]):
+    blocks = [prompts.render_clause_block(clause) for clause in CLAUSE_METADATA]
+    compiled = {spec.name: prompts.compile_prompt(spec, blocks) for spec in specs}
+
+    def render(name: str, idx: int, text: str) -> Tuple[str, str]:
+        prompt = compiled[name]
+        if name == prompts.AGENT_QUERY:
+            return prompt.prefix, prompt.render(clause=blocks[idx], query=text)
+        return prompt.prefix, prompt.render(clause=blocks[idx], **_document_values(text))
+    return render
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _simulate(render, calls, count_tokens) -> Dict[str, float]:
+    start = time.perf_counter()
+    rendered = [(name, render(name, idx, text)) for name, idx, text in calls]
+    render_us = (time.perf_counter() - start) / len(calls) * 1e6
+
+    # The provider keeps many prefixes warm; compare against the latest call
+    # of the same prompt and the latest call of the same prompt and clause
+    last: Dict[Tuple, str] = {}
+    token_cache: Dict[str, int] = {}
+    total = shared_total = cached = hits = 0
+    for (name, idx, _), (system, user) in zip(calls, rendered):
+        text = f"system:{system}\nuser:{user}"
+        tokens = count_tokens(text)
+        common = max(_common_prefix(text, last.get(key, "")) for key in ((name,), (name, idx)))
+        shared = 0
+        if common:
+            prefix = text[:common]
+            shared = token_cache.get(prefix)
+            if shared is None:
+                shared = token_cache[prefix] = count_tokens(prefix)
+        reusable = (shared // CACHE_INCREMENT) * CACHE_INCREMENT if shared >= CACHE_MIN_TOKENS else 0
+        total += tokens
+        shared_total += shared
+        cached += reusable
+        hits += reusable > 0
+        last[(name,)] = last[(name, idx)] = text
+    return {
+        "render_us": render_us,
+        "avg_tokens": total / len(calls),
+        "avg_shared": shared_total / len(calls),
+        "avg_cached": cached / len(calls),
+        "hit_rate": hits / len(calls),
+        "total": total,
+        "cached": cached,
+    }
+
+
+# ─── Live mode ───────────────────────────────────────────────────
+
+async def _live(calls, specs: List[prompts.PromptSpec]) -> None:
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_tokens=64)
+    blocks = [prompts.render_clause_block(clause) for clause in CLAUSE_METADATA]
+    compiled = {spec.name: prompts.compile_prompt(spec, blocks) for spec in specs}
+    for name, idx, text in calls:
+        prompt = compiled[name]
+        values = {"query": text} if name == prompts.AGENT_QUERY else _document_values(text)
+        await llm_gateway.chat(llm, prompt, prompt.messages(clause=blocks[idx], **values))
+    for label, stats in llm_gateway.stats().items():
+        print(
+            f"{label:32s} calls={stats['calls']:4.0f} prompt_tokens={stats['prompt_tokens']:8.0f} "
+            f"cached={stats['cached_tokens']:8.0f} avg_latency_ms={stats['latency_ms'] / stats['calls']:7.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--pad-instructions", type=int, default=0, help="approximate tokens of filler added to the static instructions")
+    parser.add_argument("--cached-discount", type=float, default=0.5, help="price of a cached input token relative to an uncached one")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--live", action="store_true", help="send the registry layout to the provider")
+    args = parser.parse_args()
+
+    specs = _specs(args.pad_instructions)
+    calls = _workload(args.calls, args.seed)
+    if args.live:
+        asyncio.run(_live(calls, specs))
+        return
+
+    count_tokens = _token_counter()
+    print(f"calls: {args.calls}  clauses: {len(CLAUSE_METADATA)}  instruction padding: {args.pad_instructions} tok")
+    results = {
+        "legacy": _simulate(_legacy_render(specs), calls, count_tokens),
+        "registry": _simulate(_registry_render(specs), calls, count_tokens),
+    }
+    for layout, r in results.items():
+        billed = (r["total"] - r["cached"]) + r["cached"] * args.cached_discount
+        print(
+            f"{layout:8s} render {r['render_us']:5.1f} us/op  input {r['avg_tokens']:6.0f} tok/call  "
+            f"shared prefix {r['avg_shared']:6.0f}  cached {r['avg_cached']:6.0f}  hit rate {100 * r['hit_rate']:5.1f}%  "
+            f"billed input {billed / args.calls:7.0f} tok/call"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Memory-per-session benchmark for AuditState.
+
+Builds N in-memory sessions with the legacy state layout (clause dict,
+conversation history and full analysis text held on the model) and the
+compact layout, then reports tracemalloc usage and (de)serialization timings.
+
+    python scripts/bench_state_memory.py --sessions 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/bench")
+os.environ.setdefault("S3_BUCKET", "bench")
+
+from pydantic import BaseModel  # noqa: E402
+
+from app.agents.state import AuditState, AuditStatus  # noqa: E402
+from app.services.audit_engine import CLAUSE_METADATA  # noqa: E402
+
+
+class LegacyAuditState(BaseModel):
+    """The pre-compaction state layout, kept here for comparison only"""
+
+    session_id: str
+    status: AuditStatus = AuditStatus.INITIALIZED
+    created_at: datetime
+    updated_at: datetime
+    current_clause_index: int = 0
+    total_clauses: int = 0
+    current_clause: Optional[Dict[str, Any]] = None
+    user_answers: Dict[int, str] = {}
+    audit_findings: List[Dict[str, Any]] = []
+    conversation_history: List[Dict[str, str]] = []
+    current_query: Optional[str] = None
+    agent_response: Optional[str] = None
+    pending_answer: Optional[str] = None
+    compliance_score: Optional[float] = None
+    risk_assessment: Optional[Dict[str, Any]] = None
+    recommendations: List[str] = []
+    uploaded_documents: List[str] = []
+    document_analysis: Dict[int, Any] = {}
+
+
+ANALYSIS_TEXT = "**Compliance Assessment:** The document partially addresses the clause. " * 40
+TURNS = 6
+
+
+def _legacy_payload(i: int) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    idx = i % len(CLAUSE_METADATA)
+    history = []
+    for t in range(TURNS):
+        history.append({"role": "user", "content": f"question {t} for session {i}", "timestamp": now.isoformat()})
+        history.append({"role": "assistant", "content": ANALYSIS_TEXT[:600], "timestamp": now.isoformat()})
+    return {
+        "session_id": f"session-{i}",
+        "status": AuditStatus.IN_PROGRESS,
+        "created_at": now,
+        "updated_at": now,
+        "current_clause_index": idx,
+        "total_clauses": len(CLAUSE_METADATA),
+        "current_clause": dict(CLAUSE_METADATA[idx]),
+        "user_answers": {k: f"Yes, implemented ({i}/{k})" for k in range(idx)},
+        "conversation_history": history,
+        "current_query": f"question {TURNS - 1} for session {i}",
+        "agent_response": ANALYSIS_TEXT[:600],
+        "uploaded_documents": [f"policy-{i}.pdf"],
+        "document_analysis": {idx: [{"document_key": f"policy-{i}.pdf", "analysis_summary": ANALYSIS_TEXT}]},
+    }
+
+
+def _compact_payload(i: int) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    idx = i % len(CLAUSE_METADATA)
+    return {
+        "session_id": f"session-{i}",
+        "status": AuditStatus.IN_PROGRESS,
+        "created_at": now,
+        "updated_at": now,
+        "current_clause_index": idx,
+        "total_clauses": len(CLAUSE_METADATA),
+        "user_answers": {k: f"Yes, implemented ({i}/{k})" for k in range(idx)},
+        "uploaded_documents": [f"policy-{i}.pdf"],
+    }
+
+
+def _measure(build, n: int):
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    states = [build(i) for i in range(n)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return states, (current - base) / n
+
+
+def _time(fn, items, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    args = parser.parse_args()
+    n = args.sessions
+
+    legacy, legacy_bytes = _measure(lambda i: LegacyAuditState(**_legacy_payload(i)), n)
+    compact, compact_bytes = _measure(lambda i: AuditState(**_compact_payload(i)), n)
+
+    legacy_dumps = [s.model_dump() for s in legacy[:1000]]
+    compact_snapshots = [s.to_snapshot() for s in compact[:1000]]
+    compact_json = [s.to_json() for s in compact[:1000]]
+
+    print(f"sessions: {n}")
+    print(f"legacy  bytes/session: {legacy_bytes:10.0f}  total: {legacy_bytes * n / 2**20:8.1f} MiB")
+    print(f"compact bytes/session: {compact_bytes:10.0f}  total: {compact_bytes * n / 2**20:8.1f} MiB")
+    print(f"reduction: {100 * (1 - compact_bytes / legacy_bytes):.1f}%")
+    print(f"legacy  AuditState(**dump):     {_time(lambda d: LegacyAuditState(**d), legacy_dumps):8.1f} us/op")
+    print(f"compact from_snapshot(dump):    {_time(AuditState.from_snapshot, compact_snapshots):8.1f} us/op")
+    print(f"compact to_json:                {_time(lambda s: s.to_json(), compact[:1000]):8.1f} us/op")
+    print(f"compact from_json:              {_time(AuditState.from_json, compact_json):8.1f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Evidence storage I/O benchmark against the configured storage backend.
+
+Writes --files objects of --size-mb each, then measures put (from a spooled
+upload file, as /upload/file does), head, full reads through ``iter_range``,
+random --range-kb range reads, SHA-256 over ``open_buffer`` (what ingestion
+does) and ``copy_to`` into a temp file. With --backend local no network is
+involved, so the numbers isolate disk and copy overhead; --compare-read adds
+the plain buffered equivalents: a ``read()`` loop, hashing ``get_bytes`` and a
+userspace ``copyfileobj`` next to ``sendfile``.
+
+    python scripts/bench_storage.py --backend local --files 20 --size-mb 8
+    python scripts/bench_storage.py --backend local --compare-read
+    S3_ENDPOINT_URL=http://localhost:9000 python scripts/bench_storage.py --backend s3
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/bench")
+os.environ.setdefault("S3_BUCKET", "bench")
+
+from app.services.storage import CHUNK_SIZE, StorageBackend, build_storage  # noqa: E402
+
+
+def _timed(label: str, total_bytes: int, runs: int, fn: Callable[[], None]) -> None:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    rate = total_bytes / elapsed / 2**20 if total_bytes else 0
+    per_op = elapsed / runs * 1000
+    print(f"{label:<22} {elapsed * 1000:9.1f} ms  {per_op:8.3f} ms/op  {rate:9.1f} MiB/s")
+
+
+def run(store: StorageBackend, files: int, size: int, range_kb: int, ranges: int, compare_read: bool) -> None:
+    payload = os.urandom(size)
+    keys: List[str] = [f"bench/{i:05d}.bin" for i in range(files)]
+    total = files * size
+
+    def put():
+        for key in keys:
+            with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as upload:
+                upload.write(payload)
+                upload.seek(0)
+                store.put_file(key, upload)
+
+    def head():
+        for key in keys:
+            store.head(key)
+
+    def read_all():
+        for key in keys:
+            for _ in store.iter_range(key):
+                pass
+
+    def read_plain():
+        for key in keys:
+            with open(store.local_path(key), "rb") as f:
+                for _ in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    pass
+
+    span = range_kb * 1024
+    offsets = [(random.choice(keys), random.randrange(0, max(1, size - span))) for _ in range(ranges)]
+
+    def read_ranges():
+        for key, start in offsets:
+            store.read_range(key, start, start + span)
+
+    def hash_buffer():
+        for key in keys:
+            with store.open_buffer(key) as data:
+                hashlib.sha256(data).digest()
+
+    def hash_bytes():
+        for key in keys:
+            hashlib.sha256(store.get_bytes(key)).digest()
+
+    def copy():
+        with tempfile.TemporaryFile() as out:
+            for key in keys:
+                out.seek(0)
+                out.truncate()
+                store.copy_to(key, out)
+
+    def copy_userspace():
+        with tempfile.TemporaryFile() as out:
+            for key in keys:
+                out.seek(0)
+                out.truncate()
+                with open(store.local_path(key), "rb") as f:
+                    shutil.copyfileobj(f, out, CHUNK_SIZE)
+
+    print(f"backend={store.name} files={files} size={size / 2**20:.1f} MiB")
+    _timed("put_file", total, files, put)
+    _timed("head", 0, files, head)
+    _timed("iter_range (full)", total, files, read_all)
+    if compare_read and store.local_path(keys[0]):
+        _timed("plain read()", total, files, read_plain)
+    _timed(f"read_range ({range_kb} KiB)", ranges * span, ranges, read_ranges)
+    _timed("sha256 open_buffer", total, files, hash_buffer)
+    if compare_read:
+        _timed("sha256 get_bytes", total, files, hash_bytes)
+    _timed("copy_to", total, files, copy)
+    if compare_read and store.local_path(keys[0]):
+        _timed("copyfileobj", total, files, copy_userspace)
+
+    for key in keys:
+        store.delete(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["local", "s3"], default="local")
+    parser.add_argument("--root", default=None, help="directory for the local backend (default: a temp dir)")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--range-kb", type=int, default=64)
+    parser.add_argument("--ranges", type=int, default=500)
+    parser.add_argument("--compare-read", action="store_true", help="also time the plain buffered equivalents")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="bench-storage-")
+    try:
+        store = build_storage(args.backend, root)
+        run(store, args.files, int(args.size_mb * 2**20), args.range_kb, args.ranges, args.compare_read)
+    finally:
+        if args.root is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Replay recorded API traffic against a running instance and compare latency.
+
+Reads the request log written when REQUEST_LOG_PATH is set (one JSON line per
+call, see ``app/services/request_log.py``) and re-issues the calls in order.
+--speed 1 keeps the recorded gaps between calls, 2 halves them and 0 sends
+each call as soon as the previous call of the same session has finished.
+Calls of one session always run in order; sessions run concurrently. Session
+ids are mapped onto the sessions the replay creates: a recorded ``/start``
+creates its counterpart, and a session whose start was not recorded is
+created on first use (unless that use was a 404).
+
+Run the target with FAKE_LLM=true so model latency is simulated and
+repeatable (--spawn starts one on --port that way, with local storage and
+--mongodb-uri). Per endpoint the report shows calls, status mismatches
+against the recording, and p50/p95/mean client-side latency next to the
+recorded server-side p50 and the --baseline. Exits 1 when an endpoint's
+--metric is more than --fail-over percent (and --min-delta-ms) slower than
+the baseline.
+
+    python scripts/replay_traffic.py requests.log --spawn --speed 0 --save-baseline base.json
+    python scripts/replay_traffic.py requests.log --spawn --speed 0 --baseline base.json --fail-over 20
+    python scripts/replay_traffic.py requests.log --base-url http://localhost:8000 --speed 2 --limit 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+START_SUFFIX = "/start"
+SESSION_PARAM = "{session_id}"
+
+
+def load_calls(path: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+    calls = []
+    skipped = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            call = json.loads(line)
+            if not call.get("replayable", True):
+                skipped += 1
+                continue
+            calls.append(call)
+            if limit and len(calls) >= limit:
+                break
+    if skipped:
+        print(f"skipping {skipped} calls with unrecorded bodies (uploads, archives)")
+    return calls
+
+
+def endpoint(call: Dict[str, Any]) -> str:
+    return f"{call['method']} {call.get('route') or call['path']}"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarise(values: List[float]) -> Dict[str, float]:
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95), "mean": statistics.fmean(values)}
+
+
+class Replayer:
+    def __init__(self, base_url: str, speed: float, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.speed = speed
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.sessions: Dict[str, asyncio.Future] = {}
+        self.locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.recorded: Dict[str, List[float]] = defaultdict(list)
+        self.mismatches: Dict[str, int] = defaultdict(int)
+
+    async def run(self, calls: List[Dict[str, Any]]) -> None:
+        async with aiohttp.ClientSession(timeout=self.timeout) as http:
+            self.http = http
+            first = _timestamp(calls[0]) if calls else 0.0
+            started = time.perf_counter()
+            tasks = []
+            for call in calls:
+                if self.speed > 0:
+                    delay = (_timestamp(call) - first) / self.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self._replay(call)))
+                # Let the task take its session lock before the next call queues behind it
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+
+    async def _replay(self, call: Dict[str, Any]) -> None:
+        recorded_id = call.get("session_id")
+        creates = call["method"] == "POST" and (call.get("route") or "").endswith(START_SUFFIX)
+        if creates and recorded_id:
+            future = self.sessions.setdefault(recorded_id, asyncio.get_running_loop().create_future())
+            _, data = await self._send(call, call["path"], call.get("query", ""))
+            new_id = data.get("session_id") if isinstance(data, dict) else None
+            if not future.done():
+                future.set_result(new_id)
+            return
+
+        path, query = call["path"], call.get("query", "")
+        if recorded_id and (SESSION_PARAM in (call.get("route") or "") or recorded_id in query):
+            async with self.locks[recorded_id]:
+                new_id = await self._session(recorded_id, call)
+                if new_id is None:
+                    self.mismatches[endpoint(call)] += 1
+                    return
+                await self._send(call, path.replace(recorded_id, new_id), query.replace(recorded_id, new_id))
+            return
+        await self._send(call, path, query)
+
+    async def _session(self, recorded_id: str, call: Dict[str, Any]) -> Optional[str]:
+        """The replay's session for a recorded one, created if its start was not recorded"""
+        future = self.sessions.get(recorded_id)
+        if future is None:
+            future = self.sessions[recorded_id] = asyncio.get_running_loop().create_future()
+            if call.get("status") == 404:
+                # It did not exist when recorded either; replay the miss
+                future.set_result(recorded_id)
+                return await future
+            prefix = (call.get("route") or call["path"]).split("/")[1]
+            headers = {"X-Tenant-ID": call["tenant"]} if call.get("tenant") else {}
+            try:
+                async with self.http.post(f"{self.base_url}/{prefix}{START_SUFFIX}", headers=headers) as resp:
+                    future.set_result((await resp.json()).get("session_id"))
+            except (aiohttp.ClientError, ValueError, asyncio.TimeoutError):
+                future.set_result(None)
+        return await future
+
+    async def _send(self, call: Dict[str, Any], path: str, query: str):
+        url = f"{self.base_url}{path}" + (f"?{query}" if query else "")
+        headers = {"X-Tenant-ID": call["tenant"]} if call.get("tenant") else {}
+        kwargs = {"json": call["body"]} if call.get("body") is not None else {}
+        name = endpoint(call)
+        started = time.perf_counter()
+        status: Optional[int] = None
+        data: Any = None
+        try:
+            async with self.http.request(call["method"], url, headers=headers, **kwargs) as resp:
+                status = resp.status
+                body = await resp.read()
+            if resp.content_type == "application/json":
+                data = json.loads(body or b"null")
+        except (aiohttp.ClientError, ValueError, asyncio.TimeoutError):
+            pass
+        self.latencies[name].append((time.perf_counter() - started) * 1000)
+        if call.get("latency_ms") is not None:
+            self.recorded[name].append(call["latency_ms"])
+        if status != call.get("status"):
+            self.mismatches[name] += 1
+        return status, data
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {name: {**summarise(values), "count": len(values)} for name, values in self.latencies.items() if values}
+
+
+def _timestamp(call: Dict[str, Any]) -> float:
+    return datetime.fromisoformat(call["ts"]).timestamp()
+
+
+def print_report(replayer: Replayer, results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], metric: str,
+                 fail_over: Optional[float], min_delta_ms: float) -> List[str]:
+    regressions = []
+    print(f"{'endpoint':<44} {'n':>5} {'bad':>4} {'p50':>8} {'p95':>8} {'mean':>8} {'rec p50':>8} {'base':>8} {'diff':>7}")
+    for name in sorted(results):
+        row = results[name]
+        recorded = replayer.recorded.get(name)
+        rec_p50 = f"{percentile(recorded, 50):8.1f}" if recorded else f"{'-':>8}"
+        base = (baseline.get(name) or {}).get(metric)
+        base_col = f"{base:8.1f}" if base else f"{'-':>8}"
+        diff = ""
+        if base:
+            change = (row[metric] - base) / base * 100
+            diff = f"{change:+6.1f}%"
+            if fail_over is not None and change > fail_over and row[metric] - base > min_delta_ms:
+                regressions.append(name)
+                diff += " !"
+        print(
+            f"{name[:44]:<44} {int(row['count']):>5} {replayer.mismatches.get(name, 0):>4} "
+            f"{row['p50']:8.1f} {row['p95']:8.1f} {row['mean']:8.1f} {rec_p50} {base_col} {diff}"
+        )
+    return regressions
+
+
+def spawn_server(port: int, mongodb_uri: str, storage_dir: str) -> subprocess.Popen:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    env = {
+        **os.environ,
+        "FAKE_LLM": "true",
+        "STORAGE_BACKEND": "local",
+        "STORAGE_DIR": storage_dir,
+        "MONGODB_URI": mongodb_uri,
+        "REQUEST_LOG_PATH": "",
+    }
+    env.setdefault("OPENAI_API_KEY", "replay")
+    env.setdefault("S3_BUCKET", "replay")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=root,
+        env=env
+    )
+
+
+async def wait_ready(base_url: str, seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    async with aiohttp.ClientSession() as http:
+        while True:
+            try:
+                async with http.get(f"{base_url}/health/db") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"{base_url} did not become ready within {seconds:.0f}s")
+            await asyncio.sleep(0.5)
+
+
+async def main_async(args) -> int:
+    calls = load_calls(args.log, args.limit)
+    if not calls:
+        print("no replayable calls")
+        return 0
+    server = None
+    base_url = args.base_url
+    if args.spawn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = spawn_server(args.port, args.mongodb_uri, args.storage_dir)
+    try:
+        await wait_ready(base_url, args.ready_timeout)
+        replayer = Replayer(base_url, args.speed, args.timeout)
+        started = time.perf_counter()
+        await replayer.run(calls)
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = replayer.report()
+    print(f"replayed {len(calls)} calls in {elapsed:.1f}s against {base_url} (speed {args.speed:g})")
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = print_report(replayer, results, baseline, args.metric, args.fail_over, args.min_delta_ms)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save_baseline}")
+    if regressions:
+        print(f"{len(regressions)} endpoint(s) regressed more than {args.fail_over:g}% on {args.metric}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="request log written with REQUEST_LOG_PATH")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="time multiplier; 0 sends calls back to back")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N calls")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-call timeout in seconds")
+    parser.add_argument("--baseline", default=None, help="JSON report of an earlier run to compare against")
+    parser.add_argument("--save-baseline", default=None, help="write this run's report as a baseline")
+    parser.add_argument("--metric", choices=["p50", "p95", "mean"], default="p95")
+    parser.add_argument("--fail-over", type=float, default=None, help="exit 1 on a regression above this percent")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore regressions smaller than this")
+    parser.add_argument("--spawn", action="store_true", help="start a local FAKE_LLM instance to replay against")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mongodb-uri", default="mongodb://localhost:27017/replay")
+    parser.add_argument("--storage-dir", default="data/replay-objects")
+    parser.add_argument("--ready-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+
+# app.config reads these at import time; unit tests never reach the services
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/test")
+os.environ.setdefault("S3_BUCKET", "test")
@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents import campaigns
+from app.agents.campaigns import ACTIVE, CANCELLED, FAILED, LAUNCHING, SCHEDULED, CampaignService
+from app.config import settings
+
+
+class Campaigns:
+    """Just enough of a Mongo collection for the campaign status transitions"""
+
+    def __init__(self):
+        self.docs = {}
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, want in query.items():
+            if isinstance(want, dict) and "$lte" in want:
+                if field not in doc or doc[field] > want["$lte"]:
+                    return False
+            elif doc.get(field) != want:
+                return False
+        return True
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def find_one(self, query):
+        return next((dict(doc) for doc in self.docs.values() if self._matches(doc, query)), None)
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        matches = [doc for doc in self.docs.values() if self._matches(doc, query)]
+        if sort:
+            matches.sort(key=lambda doc: doc[sort[0][0]])
+        if not matches:
+            return None
+        matches[0].update(update["$set"])
+        return dict(matches[0])
+
+    async def update_one(self, query, update):
+        for doc in self.docs.values():
+            if self._matches(doc, query):
+                doc.update(update["$set"])
+                return
+
+
+class NoSessions:
+    def aggregate(self, pipeline):
+        return self._empty()
+
+    async def _empty(self):
+        return
+        yield
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = Campaigns()
+    monkeypatch.setattr(campaigns, "db", SimpleNamespace(campaigns=store, sessions=NoSessions()))
+    monkeypatch.setattr(settings, "campaign_warmup", False)
+    return store
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = CampaignService(graph=None)
+    service.launched = []
+
+    async def create_sessions(campaign):
+        if campaign["name"] == "broken":
+            raise RuntimeError("insert failed")
+        service.launched.append(campaign["_id"])
+        return len(campaign["units"]), 0, []
+
+    monkeypatch.setattr(service, "_create_sessions", create_sessions)
+    return service
+
+
+def later(seconds=3600):
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+def test_immediate_campaign_launches(store, service):
+    campaign = asyncio.run(service.create("FY25", [{"name": "a"}, {"name": "b"}]))
+    assert campaign["status"] == ACTIVE
+    assert campaign["session_count"] == 2
+    assert store.docs[campaign["campaign_id"]]["status"] == ACTIVE
+
+
+def test_scheduled_campaign_waits_until_due(store, service):
+    campaign = asyncio.run(service.create("FY26", [{"name": "a"}], starts_at=later()))
+    campaign_id = campaign["campaign_id"]
+    assert campaign["status"] == SCHEDULED
+    assert asyncio.run(service.launch_due()) == 0
+    assert service.launched == []
+
+    store.docs[campaign_id]["starts_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert asyncio.run(service.launch_due()) == 1
+    assert service.launched == [campaign_id]
+    assert store.docs[campaign_id]["status"] == ACTIVE
+    assert asyncio.run(service.launch_due()) == 0       # launched once only
+
+
+def test_cancel_only_while_scheduled(store, service):
+    campaign_id = asyncio.run(service.create("FY26", [{"name": "a"}], starts_at=later()))["campaign_id"]
+    assert asyncio.run(service.cancel(campaign_id))["status"] == CANCELLED
+    assert asyncio.run(service.cancel(campaign_id)) is None
+
+    store.docs[campaign_id]["starts_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert asyncio.run(service.launch_due()) == 0
+    assert store.docs[campaign_id]["status"] == CANCELLED
+
+
+def test_failed_launch_does_not_block_the_queue(store, service):
+    broken = asyncio.run(service.create("broken", [{"name": "a"}], starts_at=later(1)))["campaign_id"]
+    fine = asyncio.run(service.create("fine", [{"name": "a"}], starts_at=later(2)))["campaign_id"]
+    for campaign_id in (broken, fine):
+        store.docs[campaign_id]["starts_at"] -= timedelta(seconds=10)
+    assert asyncio.run(service.launch_due()) == 1
+    assert store.docs[broken]["status"] == FAILED
+    assert store.docs[broken]["error"] == "insert failed"
+    assert store.docs[fine]["status"] == ACTIVE
+
+
+def test_claimed_campaign_is_not_launched_twice(store, service):
+    campaign_id = asyncio.run(service.create("FY26", [{"name": "a"}], starts_at=later()))["campaign_id"]
+    store.docs[campaign_id].update(status=LAUNCHING, starts_at=datetime.utcnow() - timedelta(seconds=1))
+    assert asyncio.run(service.launch_due()) == 0
+
+
+@pytest.mark.parametrize("units,message", [
+    ([], "at least one unit"),
+    ([{"name": "a"}, {"name": "a"}], "unique"),
+])
+def test_invalid_units(store, service, units, message):
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(service.create("bad", units))
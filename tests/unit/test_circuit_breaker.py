@@ -0,0 +1,107 @@
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", window_seconds=60, min_calls=4, failure_ratio=0.5, slow_ms=10_000, open_seconds=30)
+
+
+def call(breaker, fail=False):
+    with breaker.guard():
+        if fail:
+            raise RuntimeError("boom")
+
+
+def fail(breaker, times=1):
+    for _ in range(times):
+        with pytest.raises(RuntimeError):
+            call(breaker, fail=True)
+
+
+def test_stays_closed_below_min_calls(breaker):
+    fail(breaker, 3)
+    assert breaker.state == CLOSED
+    assert breaker.available
+
+
+def test_opens_at_failure_ratio(breaker):
+    call(breaker)
+    call(breaker)
+    fail(breaker, 2)
+    assert breaker.state == OPEN
+    assert not breaker.available
+    with pytest.raises(CircuitOpen):
+        call(breaker)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_old_calls_leave_the_window(breaker, clock):
+    fail(breaker, 3)
+    clock.now += 61
+    call(breaker)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
+
+
+def test_probe_success_closes(breaker, clock):
+    fail(breaker, 4)
+    clock.now += 30
+    assert breaker.available
+    call(breaker)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_probe_failure_reopens(breaker, clock):
+    fail(breaker, 4)
+    clock.now += 30
+    fail(breaker)
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    with pytest.raises(CircuitOpen):
+        call(breaker)
+
+
+def test_half_open_allows_one_probe(breaker, clock):
+    fail(breaker, 4)
+    clock.now += 30
+    with breaker.guard():
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpen):
+            call(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_probe_is_not_counted(breaker, clock):
+    fail(breaker, 4)
+    clock.now += 30
+    with pytest.raises(KeyboardInterrupt):
+        with breaker.guard():
+            raise KeyboardInterrupt
+    assert breaker.state == HALF_OPEN
+    call(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_slow_success_counts_as_failure(clock):
+    breaker = CircuitBreaker("slow", window_seconds=60, min_calls=1, failure_ratio=1.0, slow_ms=0, open_seconds=30)
+    call(breaker)
+    assert breaker.state == OPEN
@@ -0,0 +1,87 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from app.routes.upload import _FileRangeResponse, _parse_range, _UnsatisfiableRange
+from app.services.storage import ObjectNotFound, S3Storage
+
+
+def _send(path, scope, start, end, chunk_size=4):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    f = open(path, "rb")
+    response = _FileRangeResponse(f, start, end, chunk_size, 206, "text/plain", {"Content-Length": str(end - start)})
+    asyncio.run(response(scope, None, send))
+    assert f.closed
+    return messages
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "object.txt"
+    path.write_bytes(b"0123456789abcdef")
+    return path
+
+
+def test_range_in_pread_chunks(path):
+    messages = _send(path, {"type": "http"}, 3, 13)
+    assert messages[0]["status"] == 206
+    assert b"".join(m["body"] for m in messages[1:]) == b"3456789abc"
+    assert [len(m["body"]) for m in messages[1:]] == [4, 4, 2, 0]
+    assert not messages[-1]["more_body"]
+
+
+def test_zero_copy_send_when_offered(path):
+    scope = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+    messages = _send(path, scope, 3, 13)
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert (messages[1]["offset"], messages[1]["count"]) == (3, 10)
+
+
+def test_parse_range():
+    assert _parse_range(None, 16) is None
+    assert _parse_range("bytes=2-5", 16) == (2, 6)
+    assert _parse_range("bytes=-4", 16) == (12, 16)
+    assert _parse_range("bytes=10-", 16) == (10, 16)
+    with pytest.raises(_UnsatisfiableRange):
+        _parse_range("bytes=16-", 16)
+
+
+class _Missing(Exception):
+    response = {"Error": {"Code": "NoSuchKey"}}
+
+
+class _Client:
+    def __init__(self):
+        self.gets = []
+
+    def get_object(self, **params):
+        self.gets.append(params)
+        if params["Key"].endswith("missing.pdf"):
+            raise _Missing()
+        return {"Body": io.BytesIO(b"0123456789")}
+
+
+@pytest.fixture
+def s3():
+    backend = S3Storage.__new__(S3Storage)
+    backend.bucket = "bucket"
+    backend._s3 = SimpleNamespace(s3=_Client())
+    return backend
+
+
+def test_s3_missing_object_fails_before_streaming(s3):
+    with pytest.raises(ObjectNotFound):
+        s3.iter_range("tenants/acme/missing.pdf", 0, 10)
+
+
+def test_s3_range_is_requested_up_front(s3):
+    chunks = s3.iter_range("tenants/acme/x.pdf", 2, 6, chunk_size=4)
+    assert s3.client.gets == [{"Bucket": "bucket", "Key": "tenants/acme/x.pdf", "Range": "bytes=2-5"}]
+    assert list(chunks) == [b"0123", b"4567", b"89"]   # the fake ignores Range
+    assert list(s3.iter_range("tenants/acme/x.pdf", 5, 5)) == []
@@ -0,0 +1,55 @@
+import pytest
+
+from app.config import settings
+from app.services.evidence_mapper import EXCERPT_GAP, EvidenceMapper, chunk_text, content_words
+
+
+def test_chunk_text_windows_overlap_by_a_quarter():
+    words = [f"w{i}" for i in range(20)]
+    chunks = chunk_text(" ".join(words), 8, 100)
+    assert chunks[0].split() == words[0:8]
+    assert chunks[1].split() == words[6:14]
+    assert chunks[-1].split()[-1] == "w19"
+    assert all(len(chunk.split()) <= 8 for chunk in chunks)
+
+
+def test_chunk_text_edges():
+    assert chunk_text("", 8, 10) == []
+    assert chunk_text("   \n ", 8, 10) == []
+    assert chunk_text("one two three", 8, 10) == ["one two three"]
+    assert len(chunk_text(" ".join(["x"] * 1000), 8, 5)) == 5
+
+
+def test_content_words_drops_stopwords_and_numbers():
+    assert content_words("The scope of the ISMS, version 2.1") == "scope isms version"
+
+
+@pytest.fixture
+def mapper():
+    return EvidenceMapper(settings.search_embedding_dim)
+
+
+def test_map_empty_document(mapper):
+    assert mapper.map(None) == []
+    assert mapper.map("") == []
+
+
+def test_map_finds_the_matching_clause(mapper, monkeypatch):
+    monkeypatch.setattr(settings, "evidence_chunk_words", 20)
+    scope = (
+        "ISMS scope statement: the scope covers all offices and cloud hosting. "
+        "Interfaces and dependencies with suppliers are listed; excluded areas are the retail shops."
+    )
+    filler = " ".join(["lorem ipsum dolor sit amet"] * 12)
+    matches = mapper.map(f"{filler} {scope} {filler}")
+    assert matches, "the scope chunk should clear evidence_min_similarity"
+    best = matches[0]
+    assert best.clause_index == 0
+    assert best.chunks == sorted(best.chunks)
+    assert "scope" in best.excerpt
+    assert len(best.excerpt.split(EXCERPT_GAP)) == len(best.chunks) <= settings.evidence_excerpt_chunks
+    assert [m.score for m in matches] == sorted((m.score for m in matches), reverse=True)
+
+
+def test_map_ignores_unrelated_text(mapper):
+    assert mapper.map(" ".join(["lorem ipsum dolor sit amet"] * 50)) == []
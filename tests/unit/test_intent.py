@@ -0,0 +1,57 @@
+import pytest
+
+from app.agents.intent import INTENT_NEXT, INTENT_OTHER, INTENT_PREVIOUS, classify
+
+
+@pytest.mark.parametrize("message", [
+    "explain the previous clause",
+    "what was the last clause",
+    "is the previous one mandatory",
+    "go back to the risk section",
+    "back up",
+    "the next one is hard",
+    "we skip this control",
+    "what happens next?",
+    "can we go back?",
+    "our previous auditor said this was fine",
+])
+def test_questions_and_statements_do_not_navigate(message):
+    result = classify(message)
+    assert not result.is_navigation
+    assert result.intent == INTENT_OTHER
+
+
+@pytest.mark.parametrize("message,intent", [
+    ("next", INTENT_NEXT),
+    ("Skip this clause.", INTENT_NEXT),
+    ("go back", INTENT_PREVIOUS),
+    ("previous clause", INTENT_PREVIOUS),
+])
+def test_exact_commands(message, intent):
+    result = classify(message)
+    assert (result.intent, result.source) == (intent, "rule")
+
+
+@pytest.mark.parametrize("message,intent", [
+    ("next please", INTENT_NEXT),
+    ("ok lets move on", INTENT_NEXT),
+    ("take me back", INTENT_PREVIOUS),
+    ("go back please", INTENT_PREVIOUS),
+])
+def test_bare_commands_use_the_model(message, intent):
+    result = classify(message)
+    assert result.is_navigation
+    assert (result.intent, result.source) == (intent, "model")
+
+
+@pytest.mark.parametrize("message", [
+    "last clause",
+    "the last one",
+    "go to the last one",
+    "return to the last clause",
+    "show me that clause",
+    "show me this clause again",
+    "show me the clause",
+])
+def test_last_and_redisplay_requests_do_not_navigate(message):
+    assert classify(message).intent == INTENT_OTHER
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.agents import simple_graph
+from app.agents.intent import INTENT_NEXT
+from app.agents.simple_graph import SimpleAuditGraph
+from app.agents.state import AuditStatus, create_initial_state
+from app.services.audit_engine import CLAUSE_METADATA
+from app.services.scoring import SKIP_ANSWER
+
+CARRIED = "Yes, the ISMS scope is documented and approved"
+GRADE = {"score": 0.9, "verdict": "compliant"}
+
+
+class Reports:
+    def __init__(self):
+        self.scheduled = []
+
+    async def invalidate(self, session_id):
+        pass
+
+    def schedule(self, state):
+        self.scheduled.append(state.session_id)
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = SimpleAuditGraph.__new__(SimpleAuditGraph)
+    graph.reports = Reports()
+    graph.state = create_initial_state("s1", "acme")
+    graph.state.user_answers = {0: CARRIED}
+    # The stored response the carried answer came with, as record_answer would overwrite it
+    graph.responses = {0: {"answer": CARRIED, "grade": GRADE}}
+
+    async def get_state(session_id):
+        return graph.state
+
+    async def record_answer(session_id, answer):
+        idx = graph.state.current_clause_index
+        graph.state.user_answers[idx] = answer
+        graph.responses[idx] = {"answer": answer}
+        graph.state.current_clause_index += 1
+
+    async def set_clause_index(session_id, index):
+        graph.state.current_clause_index = index
+
+    async def commit(state, update):
+        return state.version + 1
+
+    async def nothing(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(graph, "_get_state", get_state, raising=False)
+    monkeypatch.setattr(graph, "record_answer", record_answer, raising=False)
+    monkeypatch.setattr(graph, "set_clause_index", set_clause_index, raising=False)
+    monkeypatch.setattr(graph, "_commit", commit, raising=False)
+    monkeypatch.setattr(graph, "checkpoint", nothing, raising=False)
+    monkeypatch.setattr(graph, "_publish_status", lambda *args, **kwargs: None, raising=False)
+    monkeypatch.setattr(simple_graph.side_store, "append_messages", nothing)
+    return graph
+
+
+def test_next_keeps_a_carried_answer_and_its_grade(graph):
+    result = asyncio.run(graph._navigate("s1", "next", INTENT_NEXT))
+    assert result["advance_clause"]
+    assert graph.state.current_clause_index == 1
+    assert graph.state.user_answers == {0: CARRIED}
+    assert graph.responses[0] == {"answer": CARRIED, "grade": GRADE}
+
+
+def test_next_skips_an_unanswered_clause(graph):
+    graph.state.current_clause_index = 1
+    asyncio.run(graph._navigate("s1", "next", INTENT_NEXT))
+    assert graph.state.current_clause_index == 2
+    assert graph.state.user_answers[1] == SKIP_ANSWER
+
+
+def test_next_past_an_answered_last_clause_completes_the_audit(graph):
+    last = len(CLAUSE_METADATA) - 1
+    graph.state.current_clause_index = last
+    graph.state.user_answers[last] = CARRIED
+    result = asyncio.run(graph._navigate("s1", "next", INTENT_NEXT))
+    assert graph.state.status is AuditStatus.COMPLETED
+    assert graph.state.current_clause_index == len(CLAUSE_METADATA)
+    assert graph.state.user_answers[last] == CARRIED
+    assert graph.reports.scheduled == ["s1"]
+    assert result["current_clause"] is None
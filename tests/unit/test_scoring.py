@@ -0,0 +1,61 @@
+import pytest
+
+from app.services.scoring import SKIP_ANSWER, answer_features, is_gap, score_answer
+
+
+@pytest.mark.parametrize("answer", [
+    "We have no gaps",
+    "There are no missing controls",
+    "Nothing is missing",
+    "We don't have any gaps",
+    "None of the controls are missing",
+    "We cannot find any gaps in the access reviews",
+])
+def test_negated_negative_terms_are_positive(answer):
+    assert score_answer(answer) == 1.0
+    assert not is_gap(answer)
+
+
+def test_positive_answer_with_no_issues_scores_full():
+    assert score_answer("Implemented, no issues") == 1.0
+
+
+@pytest.mark.parametrize("answer", [
+    "not implemented",
+    "The policy isn't documented",
+    "There are gaps in backups",
+    "The policy is missing",
+    "No.",
+    "Nothing.",
+    "not really",
+    "We cannot confirm",
+    "We can't confirm that",
+])
+def test_negative_answers_are_gaps(answer):
+    assert score_answer(answer) == 0.0
+    assert is_gap(answer)
+
+
+def test_negator_before_punctuation_does_not_flip():
+    # The comma ends the scope of "No", so "missing" keeps its polarity
+    assert answer_features("No, the policy is missing") == (0, 2, 0)
+
+
+def test_contrast_ends_negation():
+    assert answer_features("No formal policy exists but access reviews are documented") == (1, 1, 0)
+    assert answer_features("We have no gaps although some reviews are missing") == (1, 1, 1)
+
+
+@pytest.mark.parametrize("answer", ["No, missing", "No, it's missing", "Not yet; gaps remain"])
+def test_punctuation_ends_negation(answer):
+    assert score_answer(answer) == 0.0
+    assert is_gap(answer)
+
+
+def test_whole_words_only():
+    assert score_answer("I know it is implemented now") == 1.0
+
+
+def test_partial_and_skip():
+    assert score_answer("Work is in progress") == 0.5
+    assert answer_features(SKIP_ANSWER) == (0, 0, 0)
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from app.agents.state import AuditState, AuditStatus, create_initial_state
+from app.services.audit_engine import CLAUSE_METADATA
+
+
+def _state() -> AuditState:
+    state = create_initial_state("s1", "acme")
+    state.status = AuditStatus.IN_PROGRESS
+    state.current_clause_index = 2
+    state.user_answers = {0: "Yes, documented", 1: "__skip__"}
+    state.uploaded_documents = ["tenants/acme/uploads/policy.pdf"]
+    state.compliance_score = 72.5
+    state.version = 7
+    return state
+
+
+def test_snapshot_round_trip():
+    state = _state()
+    snapshot = state.to_snapshot()
+    assert snapshot["status"] == "in_progress"
+    assert snapshot["user_answers"] == {"0": "Yes, documented", "1": "__skip__"}
+    assert "version" not in snapshot
+    assert "audit_findings" not in snapshot         # defaults are omitted
+
+    restored = AuditState.from_snapshot(snapshot)
+    assert restored.status is AuditStatus.IN_PROGRESS
+    assert restored.user_answers == state.user_answers
+    assert restored.model_dump(exclude={"version"}) == state.model_dump(exclude={"version"})
+    assert restored.current_clause == CLAUSE_METADATA[2]
+
+
+def test_snapshot_ignores_unknown_fields():
+    snapshot = {**_state().to_snapshot(), "_id": "s1", "state_version": 7, "archived_at": datetime.utcnow()}
+    restored = AuditState.from_snapshot(snapshot)
+    assert restored.session_id == "s1"
+    assert not hasattr(restored, "state_version")
+
+
+def test_json_round_trip():
+    state = _state()
+    restored = AuditState.from_json(state.to_json())
+    assert restored == state
+    assert restored.user_answers == {0: "Yes, documented", 1: "__skip__"}
+
+
+def test_current_clause_after_last():
+    state = create_initial_state("s2")
+    state.current_clause_index = len(CLAUSE_METADATA)
+    assert state.current_clause is None
+    assert AuditState.from_snapshot(state.to_snapshot()).tenant_id is None
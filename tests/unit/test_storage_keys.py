@@ -0,0 +1,70 @@
+import pytest
+
+from app.config import settings
+from app.services.storage import InvalidKey, LocalStorage, ObjectNotFound, content_disposition
+from app.services.tenancy import owns_key, tenant_key, valid_key
+
+
+TRAVERSALS = [
+    "tenants/acme/../beta/uploads/x.pdf",
+    "tenants/acme/./uploads/x.pdf",
+    "tenants/acme//uploads/x.pdf",
+    "/tenants/acme/uploads/x.pdf",
+    "tenants/acme/uploads/",
+    "tenants/acme/..\\beta\\x.pdf",
+    "..",
+    "",
+]
+
+
+@pytest.mark.parametrize("key", TRAVERSALS)
+def test_invalid_keys(key):
+    assert not valid_key(key)
+    assert not owns_key(key, "acme")
+
+
+def test_owns_key():
+    assert owns_key("tenants/acme/uploads/x.pdf", "acme")
+    assert not owns_key("tenants/beta/uploads/x.pdf", "acme")
+    assert owns_key("uploads/legacy.pdf", settings.default_tenant)
+    assert not owns_key("uploads/legacy.pdf", "acme")
+    assert owns_key(tenant_key("/uploads/x.pdf", "acme"), "acme")
+
+
+@pytest.fixture
+def local(tmp_path):
+    return LocalStorage(str(tmp_path / "objects"))
+
+
+def test_local_round_trip(local):
+    info = local.put_bytes("tenants/acme/uploads/a.txt", b"hello world")
+    assert info.size == 11
+    assert local.get_bytes("tenants/acme/uploads/a.txt") == b"hello world"
+    assert local.read_range("tenants/acme/uploads/a.txt", 6, 11) == b"world"
+    local.delete("tenants/acme/uploads/a.txt")
+    with pytest.raises(ObjectNotFound):
+        local.head("tenants/acme/uploads/a.txt")
+
+
+@pytest.mark.parametrize("key", TRAVERSALS)
+def test_local_rejects_invalid_keys(local, key):
+    with pytest.raises(InvalidKey):
+        local.put_bytes(key, b"x")
+    with pytest.raises(InvalidKey):
+        local.head(key)
+
+
+def test_local_cannot_reach_another_tenant(local):
+    local.put_bytes("tenants/beta/uploads/secret.txt", b"secret")
+    with pytest.raises(InvalidKey):
+        local.get_bytes("tenants/acme/../beta/uploads/secret.txt")
+
+
+def test_content_disposition_escapes_user_filenames():
+    header = content_disposition("attachment", 'rapport "final"\r\nX-Injected: 1; é.pdf')
+    fallback, encoded = header.split("; filename*=")
+    assert fallback == 'attachment; filename="rapport _final___X-Injected: 1; _.pdf"'
+    assert encoded == "UTF-8''rapport%20%22final%22%0D%0AX-Injected%3A%201%3B%20%C3%A9.pdf"
+    assert content_disposition("inline", "policy.pdf") == "inline; filename=\"policy.pdf\"; filename*=UTF-8''policy.pdf"
+    assert content_disposition("inline", "é").startswith('inline; filename="_"')
+    assert content_disposition("inline", "\n").startswith('inline; filename="_"')
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services import tenant_scheduler
+from app.services.tenancy import TenantRejected, authorize_tenant
+from app.services.tenant_scheduler import FairScheduler
+
+
+@pytest.fixture
+def tenants(monkeypatch):
+    monkeypatch.setattr(settings, "tenants", ["acme"])
+    monkeypatch.setattr(settings, "tenant_limits", {"beta": {"weight": 2}})
+    monkeypatch.setattr(settings, "tenant_api_keys", {"secure": "s3cret"})
+
+
+def test_configured_tenants_are_accepted(tenants):
+    for tenant_id in (None, settings.default_tenant, "acme", "beta"):
+        authorize_tenant(tenant_id)
+    authorize_tenant("secure", "s3cret")
+
+
+@pytest.mark.parametrize("tenant_id,key", [("mallory", None), ("secure", None), ("secure", "guess")])
+def test_unknown_tenants_and_bad_keys_are_rejected(tenants, tenant_id, key):
+    with pytest.raises(TenantRejected):
+        authorize_tenant(tenant_id, key)
+
+
+def test_malformed_tenant_id_is_a_plain_value_error(tenants):
+    with pytest.raises(ValueError) as e:
+        authorize_tenant("../acme")
+    assert not isinstance(e.value, TenantRejected)
+
+
+class Clock:
+    now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_tenants_are_evicted(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tenant_scheduler.time, "monotonic", clock)
+    monkeypatch.setattr(settings, "tenant_idle_seconds", 60)
+    scheduler = FairScheduler(4)
+
+    async def use(tenant_id):
+        async with scheduler.slot(tenant_id):
+            pass
+
+    asyncio.run(use("a"))
+    clock.now += 30
+    asyncio.run(use("b"))
+    assert set(scheduler._tenants) == {"a", "b"}
+
+    clock.now += 45            # a idle for 75s, b for 45s
+    asyncio.run(use("c"))
+    assert set(scheduler._tenants) == {"b", "c"}
+
+
+def test_busy_or_over_budget_tenants_are_kept(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tenant_scheduler.time, "monotonic", clock)
+    monkeypatch.setattr(settings, "tenant_idle_seconds", 60)
+    monkeypatch.setattr(settings, "tenant_tokens_per_minute", 600)
+    scheduler = FairScheduler(4)
+
+    scheduler.charge("spender", 6000, 0)       # 10 minutes of budget in debt
+    asyncio.run(scheduler.acquire("holder"))   # never released
+    clock.now += 120
+    scheduler.usage("newcomer")
+    assert {"spender", "holder"} <= set(scheduler._tenants)
+    clock.now += 600
+    scheduler.usage("another")
+    assert "spender" not in scheduler._tenants
+    assert "holder" in scheduler._tenants